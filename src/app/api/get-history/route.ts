@@ -1,15 +1,20 @@
-import { MongoClient, WithId, Document } from 'mongodb';
 import { NextResponse } from 'next/server';
 
-// Define the shape of a Resume document
-interface Resume extends Document {
-  _id: string; // or ObjectId if you want
-  userId: string;
+// One entry of a user's resume history, as listed by the backend
+interface ResumeHistoryItem {
+  resumeId: string;
   filename: string;
-  content: string;
-  uploadedAt: Date;
-  createdAt?: Date;
-  updatedAt?: Date;
+  uploadedAt: string;
+  contentHash?: string;
+  skills: string[];
+  previousId: string | null;
+  changes?: Record<string, string[]> | null;
+  summary?: string | null;
+}
+
+interface ResumeHistoryPage {
+  items: ResumeHistoryItem[];
+  nextCursor: string | null;
 }
 
 // Standard error interface
@@ -26,24 +31,27 @@ export async function GET(req: Request) {
       return NextResponse.json({ error: 'Missing userId' }, { status: 400 });
     }
 
-    const uri = process.env.MONGO_URI ?? "";
-
-    if (!uri || !uri.startsWith("mongodb")) {
-      console.error('[❌ MONGO ERROR] Invalid or missing MONGO_URI');
-      return NextResponse.json({ error: 'MongoDB URI not configured' }, { status: 500 });
+    // Paged and projected by the backend: pass `cursor` (the previous page's nextCursor) for more
+    const params = new URLSearchParams();
+    for (const name of ['limit', 'cursor', 'summary']) {
+      const value = searchParams.get(name);
+      if (value) params.set(name, value);
     }
 
-    const client = await MongoClient.connect(uri);
-    const db = client.db('skillbridge');
-    const collection = db.collection<Resume>('resumes');
+    const response = await fetch(
+      `http://localhost:8000/api/history/${encodeURIComponent(userId)}?${params.toString()}`
+    );
 
-    console.log(`[🔍 QUERY] Searching for resumes of userId: ${userId}`);
+    if (!response.ok) {
+      const err = await response.text();
+      return NextResponse.json({ error: 'History request failed', details: err }, { status: response.status });
+    }
 
-    const results: WithId<Resume>[] = await collection.find({ userId }).sort({ uploadedAt: -1 }).toArray();
+    const page: ResumeHistoryPage = await response.json();
 
-    console.log(`[✅ FOUND] ${results.length} resumes for user ${userId}`);
+    console.log(`[✅ FOUND] ${page.items.length} resumes for user ${userId}`);
 
-    return NextResponse.json(results);
+    return NextResponse.json(page);
   } catch (err: unknown) {
     const error = err as ErrorWithMessage;
     console.error('[❌ HISTORY API ERROR]', error.message);
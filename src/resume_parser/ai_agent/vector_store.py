@@ -1,25 +1,34 @@
 import os
 from dotenv import load_dotenv
-from weaviate import connect_to_weaviate_cloud as connect_to_wcs
-from weaviate.auth import AuthApiKey
 
-load_dotenv()
+_client = None
 
-WEAVIATE_URL = os.getenv("WEAVIATE_URL")
-WEAVIATE_API_KEY = os.getenv("WEAVIATE_API_KEY")
 
-if not WEAVIATE_URL or not WEAVIATE_API_KEY:
-    raise ValueError("[❌] Missing Weaviate credentials in .env")
+def get_client():
+    # Connected (and the schema checked) on first use rather than at import,
+    # so importing this module never touches the network
+    global _client
+    if _client is None:
+        from weaviate import connect_to_weaviate_cloud as connect_to_wcs
+        from weaviate.auth import AuthApiKey
 
-# Connect to Weaviate Cloud
-client = connect_to_wcs(
-    cluster_url=WEAVIATE_URL,
-    auth_credentials=AuthApiKey(WEAVIATE_API_KEY),
-)
+        load_dotenv()
+        weaviate_url = os.getenv("WEAVIATE_URL")
+        weaviate_api_key = os.getenv("WEAVIATE_API_KEY")
+        if not weaviate_url or not weaviate_api_key:
+            raise ValueError("[❌] Missing Weaviate credentials in .env")
+
+        # Connect to Weaviate Cloud
+        _client = connect_to_wcs(
+            cluster_url=weaviate_url,
+            auth_credentials=AuthApiKey(weaviate_api_key),
+        )
+        print("[✅] Connected to Weaviate successfully.")
+        init_schema(_client)
+    return _client
 
-print("[✅] Connected to Weaviate successfully.")
 
-def init_schema():
+def init_schema(client):
     schema = client.collections.list_all()
     if "Feedback" not in schema:
         client.collections.create(
@@ -33,14 +42,12 @@ def init_schema():
     else:
         print("[ℹ️] 'Feedback' class already exists.")
 
-init_schema()
-
 
 # Store feedback vector
 def store_feedback_vector(user_id: str, resume_text: str, feedback: str):
     combined_text = f"Resume:\n{resume_text}\n\nFeedback:\n{feedback}"
     
-    collection = client.collections.get("Feedback")
+    collection = get_client().collections.get("Feedback")
     collection.data.insert(
         properties={
             "user_id": user_id,
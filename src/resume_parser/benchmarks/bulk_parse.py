@@ -0,0 +1,101 @@
+# benchmarks/bulk_parse.py
+# Parse throughput of the single-file path (one pool.parse per PDF, as one
+# /api/parse-resume call per file does) against the bulk path (batched
+# parse_many with one nlp.pipe pass per batch). Uses synthetic PDFs; Mongo
+# and the parse cache are not involved.
+#
+#   python benchmarks/bulk_parse.py --files 200 --workers 4
+#   python benchmarks/bulk_parse.py --model blank:en   # without en_core_web_sm
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # PyMuPDF
+
+from parse_pool import SPACY_MODEL, ResumeParsePool
+
+WORDS = ["Python", "FastAPI", "MongoDB", "Docker", "Kubernetes", "React", "Google", "Microsoft",
+         "engineer", "built", "led", "services", "pipeline", "latency", "reduced", "team", "Amazon"]
+
+
+def synthetic_pdf(rng: random.Random, lines: int = 60) -> bytes:
+    doc = fitz.open()
+    page = doc.new_page()
+    y = 40
+    for _ in range(lines):
+        page.insert_text((40, y), " ".join(rng.choice(WORDS) for _ in range(10)), fontsize=9)
+        y += 12
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+async def single_file(pool, pdfs, concurrency: int) -> float:
+    # Equivalent of `concurrency` clients each uploading one file at a time
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(pdf):
+        async with slots:
+            return await pool.parse(pdf)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(pdf) for pdf in pdfs))
+    return time.perf_counter() - started
+
+
+async def bulk(pool, pdfs, batch_size: int) -> float:
+    started = time.perf_counter()
+    parsed = 0
+    async for batch in pool.parse_many(pdfs, batch_size=batch_size):
+        parsed += len(batch)
+    assert parsed == len(pdfs)
+    return time.perf_counter() - started
+
+
+async def main_async(args):
+    rng = random.Random(args.seed)
+    pdfs = [synthetic_pdf(rng) for _ in range(args.files)]
+    pool = ResumeParsePool(mode=args.mode, workers=args.workers, max_pending=args.workers * 4,
+                           model_name=args.model)
+    await pool.warm_up()
+    try:
+        sequential = await single_file(pool, pdfs, 1)
+        concurrent = await single_file(pool, pdfs, args.workers)
+        batched = await bulk(pool, pdfs, args.batch_size)
+    finally:
+        pool.shutdown()
+
+    rate = lambda seconds: round(args.files / seconds, 1)
+    print(json.dumps({
+        "files": args.files,
+        "mode": args.mode,
+        "workers": args.workers,
+        "model": args.model,
+        "batch_size": args.batch_size,
+        "single_sequential_files_per_s": rate(sequential),
+        "single_concurrent_files_per_s": rate(concurrent),
+        "bulk_files_per_s": rate(batched),
+        "bulk_vs_sequential": round(sequential / batched, 2),
+        "bulk_vs_concurrent": round(concurrent / batched, 2),
+    }, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Single-file vs bulk resume parsing throughput")
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--mode", choices=("process", "thread"), default="process")
+    parser.add_argument("--model", default=SPACY_MODEL, help="spaCy model, e.g. blank:en")
+    parser.add_argument("--seed", type=int, default=3)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# benchmarks/cold_start.py
+# Cold-start time of the API: spawns `uvicorn main:app` repeatedly against
+# the offline stand-ins (fake LLM, local vectors, MONGO_URI=memory://) and
+# measures process start -> /healthz answering (listening) and -> /readyz
+# answering 200 (every required dependency up), plus the per-component
+# timings /readyz reports and the bare `import main` time. Track the JSON
+# across commits like the load test's.
+#
+#   python benchmarks/cold_start.py --runs 5 --out cold_start.json
+#   LLM_BACKEND= python benchmarks/cold_start.py   # include the Gemini SDK import
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+OFFLINE_ENV = {
+    "LLM_BACKEND": "fake",
+    "VECTOR_BACKEND": "local",
+    "VECTOR_STORE_DIR": "",
+    "MONGO_URI": "memory://",
+    "JOB_STORE": "memory",
+    "LOG_LEVEL": "WARNING",
+}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def import_time(env: dict) -> float:
+    code = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=APP_DIR, env=env, capture_output=True, text=True,
+                            check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def one_start(env: dict, timeout_s: float) -> dict:
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    listening = ready = None
+    report = {}
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=1.0) as client:
+            while ready is None:
+                if time.perf_counter() - started > timeout_s:
+                    raise RuntimeError(f"Not ready after {timeout_s}s: {report}")
+                if process.poll() is not None:
+                    raise RuntimeError(f"Server exited during startup:\n{process.stderr.read().decode()}")
+                try:
+                    if listening is None and client.get("/healthz").status_code == 200:
+                        listening = time.perf_counter() - started
+                    response = client.get("/readyz")
+                except httpx.TransportError:
+                    time.sleep(0.01)
+                    continue
+                report = response.json()
+                if response.status_code == 200:
+                    ready = time.perf_counter() - started
+                else:
+                    time.sleep(0.01)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    return {
+        "listening_s": round(listening, 3),
+        "ready_s": round(ready, 3),
+        "components_s": {name: c.get("seconds") for name, c in report["components"].items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API cold-start time")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--spacy-model", default=os.getenv("SPACY_MODEL", "en_core_web_sm"))
+    parser.add_argument("--parse-mode", default="process", choices=["process", "thread"])
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--out", help="Write the JSON report here (default: stdout)")
+    args = parser.parse_args()
+
+    # Explicit settings in the caller's environment win, e.g. LLM_BACKEND= for the real SDK
+    env = {**os.environ, "SPACY_MODEL": args.spacy_model, "PARSE_POOL_MODE": args.parse_mode}
+    for name, value in OFFLINE_ENV.items():
+        env.setdefault(name, value)
+
+    imports = [import_time(env) for _ in range(args.runs)]
+    starts = [one_start(env, args.timeout) for _ in range(args.runs)]
+    median = lambda values: round(statistics.median(values), 3)
+    report = {
+        "runs": args.runs,
+        "parse_mode": args.parse_mode,
+        "spacy_model": args.spacy_model,
+        "llm_backend": env["LLM_BACKEND"] or "gemini",
+        "import_s": median(imports),
+        "listening_s": median([s["listening_s"] for s in starts]),
+        "ready_s": median([s["ready_s"] for s in starts]),
+        "components_s": {
+            name: median([s["components_s"][name] for s in starts if s["components_s"].get(name) is not None])
+            for name in starts[0]["components_s"]
+        },
+        "samples": starts,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
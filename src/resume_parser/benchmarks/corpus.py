@@ -0,0 +1,105 @@
+# benchmarks/corpus.py
+# Synthetic resume PDFs for load tests: headed sections (Summary,
+# Experience, Projects, Education, Skills) with gazetteer skills sprinkled
+# through them, so extraction, NER and section diffing all do real work.
+# Deterministic for a given seed; `revise()` gives the next version of a
+# resume with one section edited, for the incremental-analysis paths.
+#
+#   python benchmarks/corpus.py --count 50 --out /tmp/resumes
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # PyMuPDF
+
+from skill_extractor import load_gazetteer
+
+VERBS = ["Built", "Led", "Designed", "Shipped", "Migrated", "Automated", "Scaled", "Owned", "Refactored"]
+OBJECTS = ["a payments API", "the data pipeline", "an internal dashboard", "search ranking", "CI/CD",
+           "the mobile checkout", "observability tooling", "a recommendation service"]
+RESULTS = ["cutting latency by {n}%", "serving {n}k daily users", "reducing costs by {n}%",
+           "raising conversion {n}%", "with {n} engineers"]
+COMPANIES = ["Acme Corp", "Globex", "Initech", "Umbrella", "Hooli", "Stark Industries", "Wayne Enterprises"]
+SCHOOLS = ["State University", "Institute of Technology", "City College"]
+
+
+def _bullet(rng: random.Random, skills: list) -> str:
+    used = ", ".join(rng.sample(skills, 2))
+    return (f"- {rng.choice(VERBS)} {rng.choice(OBJECTS)} with {used}, "
+            f"{rng.choice(RESULTS).format(n=rng.randint(5, 90))}")
+
+
+def resume_sections(rng: random.Random, bullets: int = 4) -> list:
+    """[(heading, [lines])] for one synthetic candidate."""
+    skills = [terms[0].lstrip("=") for _, terms in load_gazetteer()]
+    name = f"Candidate {rng.randint(1000, 9999)}"
+    sections = [
+        ("SUMMARY", [f"{name}, software engineer with {rng.randint(1, 12)} years of experience."]),
+    ]
+    for company in rng.sample(COMPANIES, 2):
+        sections.append(("EXPERIENCE", [f"{company}, {rng.randint(2015, 2024)} - present"]
+                         + [_bullet(rng, skills) for _ in range(bullets)]))
+    sections.append(("PROJECTS", [_bullet(rng, skills) for _ in range(2)]))
+    sections.append(("EDUCATION", [f"BSc Computer Science, {rng.choice(SCHOOLS)}, {rng.randint(2010, 2020)}"]))
+    sections.append(("SKILLS", [", ".join(rng.sample(skills, 12))]))
+    return sections
+
+
+def revise(rng: random.Random, sections: list) -> list:
+    """The next upload of the same resume: one section gains a bullet."""
+    skills = [terms[0].lstrip("=") for _, terms in load_gazetteer()]
+    revised = [(heading, list(lines)) for heading, lines in sections]
+    heading, lines = rng.choice(revised[1:])
+    lines.append(_bullet(rng, skills))
+    return revised
+
+
+def render_pdf(sections: list) -> bytes:
+    doc = fitz.open()
+    page = doc.new_page()
+    y = 50
+    for heading, lines in sections:
+        if y > 760:
+            page, y = doc.new_page(), 50
+        page.insert_text((50, y), heading, fontsize=11)
+        y += 16
+        for line in lines:
+            if y > 790:
+                page, y = doc.new_page(), 50
+            page.insert_text((56, y), line, fontsize=9)
+            y += 12
+        y += 8
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def synthetic_resume_pdf(rng: random.Random, bullets: int = 4) -> bytes:
+    return render_pdf(resume_sections(rng, bullets))
+
+
+def build_corpus(count: int, seed: int = 7, bullets: int = 4) -> list:
+    rng = random.Random(seed)
+    return [synthetic_resume_pdf(rng, bullets) for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a corpus of synthetic resume PDFs")
+    parser.add_argument("--count", type=int, default=50)
+    parser.add_argument("--bullets", type=int, default=4, help="Bullets per experience entry")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    for i, pdf in enumerate(build_corpus(args.count, args.seed, args.bullets)):
+        with open(os.path.join(args.out, f"resume_{i:04d}.pdf"), "wb") as f:
+            f.write(pdf)
+    print(f"Wrote {args.count} PDFs to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# benchmarks/history.py
+# Bytes and time to load a user's resume history: the old Next.js
+# get-history route (every `resumes` document in full, embedded PDF and
+# parsedText included) against one page of /api/history (projected listing
+# fields plus the optional summary). Sizes are the BSON the driver would
+# receive. Runs on the in-memory Mongo stand-in by default, so only the byte
+# counts carry over; pass --mongo-uri for server-side timings (it writes a
+# throwaway user's documents to a bench_resumes collection there and deletes
+# them afterwards).
+#
+#   python benchmarks/history.py --uploads 100 --pdf-kb 150
+#   python benchmarks/history.py --mongo-uri mongodb://localhost:27017
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import bson
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import resume_versions
+from corpus import resume_sections
+from mongo_store import connect_mongo
+
+USER_ID = "bench-history-user"
+
+
+def legacy_doc(rng: random.Random, uploaded_at: datetime, pdf_kb: int) -> dict:
+    # Shape written before PDFs moved to GridFS: PDF bytes and full text inline
+    # (plus the stored summary, so both Mongo backends return the same page)
+    text = "\n".join(f"{heading}\n" + "\n".join(lines) for heading, lines in resume_sections(rng))
+    return {
+        "userId": USER_ID,
+        "filename": f"resume_{uploaded_at:%Y%m%d%H%M%S}.pdf",
+        "file_data": rng.randbytes(pdf_kb * 1024),
+        "parsedText": text,
+        "summary": resume_versions.summary_excerpt(text),
+        "skills": rng.sample(["Python", "FastAPI", "MongoDB", "Docker", "React", "AWS", "SQL", "Go"], 5),
+        "uploadedAt": uploaded_at,
+    }
+
+
+async def timed(fetch, runs: int):
+    best, docs = None, None
+    for _ in range(runs):
+        started = time.perf_counter()
+        docs = await fetch()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return docs, best
+
+
+async def main_async(args):
+    rng = random.Random(args.seed)
+    client, db = await connect_mongo(args.mongo_uri)
+    collection = db[args.collection]
+    await resume_versions.ensure_indexes(collection)
+    await collection.delete_many({"userId": USER_ID})
+    started_at = datetime(2026, 1, 1)
+    for i in range(args.uploads):
+        await collection.insert_one(legacy_doc(rng, started_at + timedelta(hours=i), args.pdf_kb))
+
+    try:
+        async def full_history():
+            return await collection.find({"userId": USER_ID}).sort("uploadedAt", -1).to_list(None)
+
+        async def first_page():
+            items, _ = await resume_versions.history_page(collection, USER_ID, args.page_size, summary=True)
+            return items
+
+        async def first_page_raw():
+            # The documents as they come off the wire, before the route reshapes them
+            projection = {**resume_versions.HISTORY_FIELDS, "summary": resume_versions.SUMMARY_PROJECTION}
+            return await collection.find({"userId": USER_ID}, projection).sort(
+                [("uploadedAt", -1), ("_id", -1)]).limit(args.page_size + 1).to_list(None)
+
+        full, full_s = await timed(full_history, args.runs)
+        _, page_s = await timed(first_page, args.runs)
+        raw = await first_page_raw()
+    finally:
+        await collection.delete_many({"userId": USER_ID})
+        await client.close()
+
+    size_kb = lambda docs: round(sum(len(bson.encode(d)) for d in docs) / 1024, 1)
+    return {
+        "backend": "memory" if args.mongo_uri.startswith("memory://") else "mongodb",
+        "uploads": args.uploads,
+        "pdf_kb": args.pdf_kb,
+        "page_size": args.page_size,
+        "full_history_kb": size_kb(full),
+        "history_page_kb": size_kb(raw),
+        "reduction": round(size_kb(full) / max(size_kb(raw), 0.1), 1),
+        "full_history_ms": round(full_s * 1000, 2),
+        "history_page_ms": round(page_s * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resume history: full documents vs a projected keyset page")
+    parser.add_argument("--uploads", type=int, default=100, help="Resumes stored for the user")
+    parser.add_argument("--pdf-kb", type=int, default=150, help="Embedded PDF size per legacy document")
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--mongo-uri", default="memory://")
+    parser.add_argument("--collection", default="bench_resumes")
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--out", help="Write the JSON report here (default: stdout)")
+    args = parser.parse_args()
+
+    report = asyncio.run(main_async(args))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
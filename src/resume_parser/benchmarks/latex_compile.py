@@ -0,0 +1,155 @@
+# benchmarks/latex_compile.py
+# Latency and throughput of the LaTeX compile service (latex_compile.py) on
+# synthetic resume sources: cold compiles at a given concurrency, repeats
+# served from the in-memory cache and from Mongo + GridFS (a fresh compiler
+# on the same database, as after a restart or on another worker), a burst of
+# identical requests that must share one compile, and the rejections once
+# the queue is full. Mongo is the in-memory stand-in (memory://).
+#
+#   python benchmarks/latex_compile.py --sources 20 --concurrency 2
+#   python benchmarks/latex_compile.py --stub-engine 0.3   # no TeX installed: fake 300 ms compiles
+import argparse
+import asyncio
+import json
+import os
+import random
+import stat
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from corpus import resume_sections
+from latex_compile import COMPILED_BUCKET, CompilePoolSaturated, LatexCompiler
+from load_test import percentile
+from mongo_store import connect_mongo
+from resume_files import ResumeFileStore
+
+STUB_ENGINE = """#!/bin/sh
+# Stand-in for pdflatex: same CLI shape, sleeps instead of typesetting
+[ "$1" = "--version" ] && {{ echo "stub-pdflatex 0.0"; exit 0; }}
+for source; do :; done
+sleep {seconds}
+cp "$source" "${{source%.tex}}.pdf"
+echo "Output written on ${{source%.tex}}.pdf" > "${{source%.tex}}.log"
+"""
+
+
+def escape(text: str) -> str:
+    for char, replacement in (("\\", r"\textbackslash{}"), ("&", r"\&"), ("%", r"\%"), ("$", r"\$"),
+                              ("#", r"\#"), ("_", r"\_"), ("{", r"\{"), ("}", r"\}")):
+        text = text.replace(char, replacement)
+    return text
+
+
+def resume_tex(rng: random.Random) -> str:
+    body = []
+    for heading, lines in resume_sections(rng):
+        body.append(rf"\section*{{{heading.title()}}}")
+        body.append(r"\begin{itemize}")
+        body.extend(rf"  \item {escape(line.lstrip('- '))}" for line in lines)
+        body.append(r"\end{itemize}")
+    return "\n".join([r"\documentclass[11pt]{article}", r"\usepackage[margin=1in]{geometry}",
+                      r"\begin{document}", *body, r"\end{document}", ""])
+
+
+def stub_engine(seconds: float) -> str:
+    fd, path = tempfile.mkstemp(prefix="stub-pdflatex-")
+    with os.fdopen(fd, "w") as f:
+        f.write(STUB_ENGINE.format(seconds=seconds))
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR)
+    return path
+
+
+async def timed(compiler, sources: list, concurrency: int) -> dict:
+    latencies, tiers = [], {}
+    queue = iter(sources)
+
+    async def worker():
+        for tex in queue:
+            started = time.perf_counter()
+            _, _, tier = await compiler.compile(tex)
+            latencies.append(time.perf_counter() - started)
+            tiers[tier or "miss"] = tiers.get(tier or "miss", 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "per_s": round(len(latencies) / wall, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "tiers": tiers,
+    }
+
+
+async def burst(compiler, tex: str, requests: int) -> dict:
+    started = time.perf_counter()
+    results = await asyncio.gather(*(compiler.compile(tex) for _ in range(requests)))
+    tiers = [tier or "miss" for _, _, tier in results]
+    return {"requests": requests, "compiles": tiers.count("miss"), "coalesced": tiers.count("inflight"),
+            "wall_ms": round((time.perf_counter() - started) * 1000, 2)}
+
+
+async def overload(compiler, sources: list) -> dict:
+    results = await asyncio.gather(*(compiler.compile(tex) for tex in sources), return_exceptions=True)
+    rejected = sum(isinstance(r, CompilePoolSaturated) for r in results)
+    return {"requests": len(sources), "rejected": rejected, "max_pending": compiler.max_pending}
+
+
+async def main_async(args):
+    engine = stub_engine(args.stub_engine) if args.stub_engine is not None else args.engine
+    rng = random.Random(args.seed)
+    sources = [resume_tex(rng) for _ in range(args.sources)]
+    _, db = await connect_mongo("memory://")
+
+    def new_compiler():
+        return LatexCompiler(db["compiled_resumes"], ResumeFileStore(db, COMPILED_BUCKET), engine=engine,
+                             max_concurrency=args.concurrency, timeout_s=args.timeout)
+
+    compiler = new_compiler()
+    await asyncio.gather(compiler.probe(), compiler.ensure_indexes())
+    report = {"engine": compiler.engine_version, "sources": args.sources, "concurrency": args.concurrency}
+    try:
+        report["cold"] = await timed(compiler, sources, args.concurrency * 2)
+        report["memory_hits"] = await timed(compiler, sources, args.concurrency * 2)
+
+        restarted = new_compiler()
+        await restarted.probe()
+        report["mongo_hits"] = await timed(restarted, sources, args.concurrency * 2)
+
+        report["identical_burst"] = await burst(compiler, resume_tex(rng), args.burst)
+        report["overload"] = await overload(
+            compiler, [resume_tex(rng) for _ in range(compiler.max_pending + args.concurrency * 4)]
+        )
+    finally:
+        if args.stub_engine is not None:
+            os.unlink(engine)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LaTeX compile latency, cache tiers and back-pressure")
+    parser.add_argument("--sources", type=int, default=20, help="Distinct resume sources")
+    parser.add_argument("--concurrency", type=int, default=2, help="Concurrent compiles (LATEX_MAX_CONCURRENCY)")
+    parser.add_argument("--burst", type=int, default=20, help="Simultaneous requests for one source")
+    parser.add_argument("--engine", default=os.getenv("LATEX_ENGINE", "pdflatex"))
+    parser.add_argument("--stub-engine", type=float, metavar="SECONDS",
+                        help="Use a fake engine taking SECONDS per pass (hosts without TeX)")
+    parser.add_argument("--timeout", type=float, default=20.0)
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--out", help="Write the JSON report here (default: stdout)")
+    args = parser.parse_args()
+
+    report = asyncio.run(main_async(args))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,417 @@
+# benchmarks/load_test.py
+# End-to-end load test of the real FastAPI app, fully offline: main.app is
+# served by uvicorn in this process against local stand-ins (fake Gemini via
+# LLM_BACKEND=fake, the local vector engine, in-memory Mongo via
+# MONGO_URI=memory://, in-memory job store), and each route is driven at a
+# fixed concurrency with synthetic resumes from corpus.py. Writes a JSON
+# report (p50/p95/p99 latency, RPS, errors, time-to-first-token for the
+# streams, per-stage means from /metrics) that can be diffed across commits.
+#
+#   python benchmarks/load_test.py --requests 200 --concurrency 16 --out bench.json
+#   python benchmarks/load_test.py --out new.json --compare bench.json --tolerance 0.15
+#
+# Exits 1 when --compare finds a route whose p95 rose, or RPS fell, by more
+# than the tolerance. Pass --mongo-uri to measure against a real mongod.
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ROUTES = ["parse-resume", "download-resume", "get-feedback", "get-feedback-stream", "rewrite-resume",
+          "rewrite-resume-stream", "section-feedback", "job-feedback"]
+
+
+def configure_env(args):
+    # Must run before main is imported: backends are chosen from the environment
+    os.environ.update({
+        "LLM_BACKEND": "fake",
+        "FAKE_LLM_LATENCY_MS": str(args.llm_latency_ms),
+        "FAKE_LLM_TOKEN_DELAY_MS": str(args.token_delay_ms),
+        "VECTOR_BACKEND": "local",
+        "VECTOR_STORE_DIR": "",
+        "MONGO_URI": args.mongo_uri,
+        "JOB_STORE": "memory",
+        "PARSE_POOL_MODE": args.parse_mode,
+        "SPACY_MODEL": args.spacy_model,
+        "LOG_LEVEL": "ERROR",
+    })
+    if args.llm_rate:
+        # The scheduler's token bucket otherwise caps every LLM route at LLM_RATE_PER_SEC
+        os.environ["LLM_RATE_PER_SEC"] = os.environ["LLM_BURST"] = str(args.llm_rate)
+    if args.parse_workers:
+        os.environ["PARSE_POOL_WORKERS"] = str(args.parse_workers)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# ----------------- STATS -----------------
+def percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples: list, wall_s: float) -> dict:
+    ok = sorted(s["latency"] for s in samples if s["ok"])
+    statuses = {}
+    for s in samples:
+        statuses[str(s["status"])] = statuses.get(str(s["status"]), 0) + 1
+    report = {
+        "requests": len(samples),
+        "errors": sum(1 for s in samples if not s["ok"]),
+        "statuses": statuses,
+        "wall_s": round(wall_s, 3),
+        "rps": round(len(ok) / wall_s, 2) if wall_s else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(ok, 50) * 1000, 2),
+            "p95": round(percentile(ok, 95) * 1000, 2),
+            "p99": round(percentile(ok, 99) * 1000, 2),
+            "mean": round(sum(ok) / len(ok) * 1000, 2) if ok else 0.0,
+            "max": round(ok[-1] * 1000, 2) if ok else 0.0,
+        },
+    }
+    ttfb = sorted(s["ttfb"] for s in samples if s["ok"] and s.get("ttfb") is not None)
+    if ttfb:
+        report["ttfb_ms"] = {
+            "p50": round(percentile(ttfb, 50) * 1000, 2),
+            "p95": round(percentile(ttfb, 95) * 1000, 2),
+            "p99": round(percentile(ttfb, 99) * 1000, 2),
+        }
+    return report
+
+
+def stage_totals(metrics_text: str) -> dict:
+    """{(route, stage): [sum_s, count]} from skillbridge_stage_seconds."""
+    from prometheus_client.parser import text_string_to_metric_families
+    totals = {}
+    for family in text_string_to_metric_families(metrics_text):
+        if family.name != "skillbridge_stage_seconds":
+            continue
+        for sample in family.samples:
+            key = (sample.labels.get("route"), sample.labels.get("stage"))
+            if sample.name.endswith("_sum"):
+                totals.setdefault(key, [0.0, 0.0])[0] = sample.value
+            elif sample.name.endswith("_count"):
+                totals.setdefault(key, [0.0, 0.0])[1] = sample.value
+    return totals
+
+
+def stage_means(before: dict, after: dict, route: str) -> dict:
+    means = {}
+    for (label, stage), (total, count) in after.items():
+        if label != route:
+            continue
+        prev_total, prev_count = before.get((label, stage), (0.0, 0.0))
+        if count > prev_count:
+            means[stage] = round((total - prev_total) / (count - prev_count) * 1000, 2)
+    return means
+
+
+# ----------------- SCENARIOS -----------------
+class Scenario:
+    """One route: `path` is the route template used as the metrics label."""
+
+    path = None
+
+    def __init__(self, state: dict):
+        self.state = state
+
+    async def call(self, client, i: int) -> dict:
+        raise NotImplementedError
+
+
+def _resume(state: dict, i: int) -> dict:
+    return state["resumes"][i % len(state["resumes"])]
+
+
+class ParseResume(Scenario):
+    path = "/api/parse-resume"
+
+    async def call(self, client, i):
+        pdfs = self.state["pdfs"]
+        response = await client.post(self.path, data={"userId": f"bench-user-{i % self.state['users']}"},
+                                     files={"file": (f"resume_{i}.pdf", pdfs[i % len(pdfs)], "application/pdf")})
+        if response.status_code == 200:
+            body = response.json()
+            self.state["resumes"].append({"id": body["resumeId"], "userId": f"bench-user-{i % self.state['users']}",
+                                          "text": body["summary"]})
+        return {"status": response.status_code}
+
+
+class DownloadResume(Scenario):
+    path = "/api/download-resume/{resume_id}"
+
+    async def call(self, client, i):
+        response = await client.get(f"/api/download-resume/{_resume(self.state, i)['id']}")
+        return {"status": response.status_code}
+
+
+class GetFeedback(Scenario):
+    path = "/api/get-feedback"
+
+    async def call(self, client, i):
+        payload = {"resumeText": _resume(self.state, i)["text"], "noCache": self.state["no_cache"]}
+        return {"status": (await client.post(self.path, json=payload)).status_code}
+
+
+class RewriteResume(Scenario):
+    path = "/api/rewrite-resume"
+
+    async def call(self, client, i):
+        resume = _resume(self.state, i)
+        payload = {"userId": resume["userId"], "resumeText": resume["text"], "noCache": self.state["no_cache"]}
+        return {"status": (await client.post(self.path, json=payload)).status_code}
+
+
+class StreamScenario(Scenario):
+    # Latency is the full stream; ttfb is the first event carrying generated text
+    text_events = ("event: token", "event: section_delta")
+
+    def payload(self, i: int) -> dict:
+        resume = _resume(self.state, i)
+        return {"userId": resume["userId"], "resumeText": resume["text"], "noCache": self.state["no_cache"]}
+
+    async def call(self, client, i):
+        started = time.perf_counter()
+        ttfb, failed = None, False
+        async with client.stream("POST", self.path, json=self.payload(i)) as response:
+            async for line in response.aiter_lines():
+                if line.startswith(self.text_events) and ttfb is None:
+                    ttfb = time.perf_counter() - started
+                elif line.startswith("event: error"):
+                    failed = True
+        status = response.status_code
+        return {"status": "stream-error" if failed else status, "ttfb": ttfb}
+
+
+class GetFeedbackStream(StreamScenario):
+    path = "/api/get-feedback/stream"
+
+
+class RewriteResumeStream(StreamScenario):
+    path = "/api/rewrite-resume/stream"
+
+
+class SectionFeedback(Scenario):
+    path = "/api/resumes/{resume_id}/feedback"
+
+    async def call(self, client, i):
+        resume_id = _resume(self.state, i)["id"]
+        response = await client.post(f"/api/resumes/{resume_id}/feedback", json={"noCache": self.state["no_cache"]})
+        return {"status": response.status_code}
+
+
+class JobFeedback(Scenario):
+    # Submit-to-result latency of a background job, polled the way the UI does
+    path = "/api/jobs"
+
+    async def call(self, client, i):
+        payload = {"kind": "feedback", "payload": {"resumeText": _resume(self.state, i)["text"]},
+                   "idempotencyKey": uuid.uuid4().hex}
+        response = await client.post(self.path, json=payload)
+        if response.status_code != 202:
+            return {"status": response.status_code}
+        job_id = response.json()["jobId"]
+        while True:
+            await asyncio.sleep(0.02)
+            job = (await client.get(f"/api/jobs/{job_id}")).json()
+            if job["status"] in ("succeeded", "failed", "cancelled"):
+                return {"status": 200 if job["status"] == "succeeded" else job["status"]}
+
+
+SCENARIOS = {
+    "parse-resume": ParseResume,
+    "download-resume": DownloadResume,
+    "get-feedback": GetFeedback,
+    "get-feedback-stream": GetFeedbackStream,
+    "rewrite-resume": RewriteResume,
+    "rewrite-resume-stream": RewriteResumeStream,
+    "section-feedback": SectionFeedback,
+    "job-feedback": JobFeedback,
+}
+
+
+async def drive(scenario: Scenario, client, requests: int, concurrency: int):
+    counter = iter(range(requests))
+    samples = []
+
+    async def worker():
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                outcome = await scenario.call(client, i)
+            except Exception as e:
+                outcome = {"status": type(e).__name__}
+            latency = time.perf_counter() - started
+            samples.append({**outcome, "latency": latency, "ok": isinstance(outcome["status"], int)
+                            and outcome["status"] < 400})
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples, time.perf_counter() - started
+
+
+# ----------------- RUN -----------------
+async def wait_ready(client, timeout_s: float):
+    # Dependencies come up after the server starts listening; the API answers 503 until then
+    deadline = time.perf_counter() + timeout_s
+    while True:
+        response = await client.get("/readyz")
+        if response.status_code == 200:
+            return
+        if time.perf_counter() > deadline or _failed(response.json()):
+            raise RuntimeError(f"App did not become ready: {response.text}")
+        await asyncio.sleep(0.05)
+
+
+def _failed(report: dict) -> bool:
+    return any(c["state"] == "failed" and c["required"] for c in report["components"].values())
+
+
+async def run(args) -> dict:
+    import httpx
+    import uvicorn
+
+    from corpus import build_corpus
+    import main as app_module
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app_module.app, host="127.0.0.1", port=port,
+                                           log_level="warning", lifespan="on"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        if serving.done():
+            serving.result()  # startup failed: surface the error
+        await asyncio.sleep(0.05)
+
+    state = {"pdfs": build_corpus(args.corpus, args.seed), "resumes": [], "users": args.users,
+             "no_cache": not args.use_cache}
+    report = {}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=args.timeout,
+                                     limits=limits) as client:
+            await wait_ready(client, args.timeout)
+            routes = args.routes
+            if "parse-resume" not in routes:
+                # Other routes need uploaded resumes to point at; seed them untimed
+                await drive(ParseResume(state), client, min(args.corpus, args.users), args.concurrency)
+            for name in routes:
+                if name != "parse-resume" and not state["resumes"]:
+                    raise RuntimeError("No resumes were uploaded; cannot drive " + name)
+                scenario = SCENARIOS[name](state)
+                before = stage_totals((await client.get("/metrics")).text)
+                if args.warmup:
+                    await drive(scenario, client, args.warmup, args.concurrency)
+                    before = stage_totals((await client.get("/metrics")).text)
+                samples, wall = await drive(scenario, client, args.requests, args.concurrency)
+                after = stage_totals((await client.get("/metrics")).text)
+                report[name] = summarize(samples, wall)
+                report[name]["stages_ms"] = stage_means(before, after, scenario.path)
+                print(f"{name:<24} p50 {report[name]['latency_ms']['p50']:>9.2f}ms  "
+                      f"p95 {report[name]['latency_ms']['p95']:>9.2f}ms  "
+                      f"{report[name]['rps']:>8.2f} rps  {report[name]['errors']} errors", file=sys.stderr)
+    finally:
+        server.should_exit = True
+        await serving
+    return report
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """Print per-route deltas; return the routes that regressed beyond `tolerance`."""
+    regressed = []
+    for name, result in current["routes"].items():
+        base = baseline.get("routes", {}).get(name)
+        if not base:
+            continue
+        p95, base_p95 = result["latency_ms"]["p95"], base["latency_ms"]["p95"]
+        rps, base_rps = result["rps"], base["rps"]
+        p95_delta = (p95 - base_p95) / base_p95 if base_p95 else 0.0
+        rps_delta = (rps - base_rps) / base_rps if base_rps else 0.0
+        flag = ""
+        if p95_delta > tolerance or rps_delta < -tolerance:
+            regressed.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<24} p95 {base_p95:>9.2f} -> {p95:>9.2f}ms ({p95_delta:+.1%})  "
+              f"rps {base_rps:>8.2f} -> {rps:>8.2f} ({rps_delta:+.1%}){flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test of the SkillBridge API")
+    parser.add_argument("--routes", default=",".join(ROUTES), help="Comma-separated, run in this order")
+    parser.add_argument("--requests", type=int, default=100, help="Timed requests per route")
+    parser.add_argument("--warmup", type=int, default=5, help="Untimed requests per route first")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--corpus", type=int, default=40, help="Distinct synthetic PDFs")
+    parser.add_argument("--users", type=int, default=10, help="Distinct userIds uploads are spread over")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--llm-latency-ms", type=float, default=200, help="Fake LLM time to first token")
+    parser.add_argument("--token-delay-ms", type=float, default=5, help="Fake LLM delay per streamed token")
+    parser.add_argument("--llm-rate", type=float, default=0, help="LLM calls/s allowed (0 = app default)")
+    parser.add_argument("--use-cache", action="store_true", help="Let LLM responses be served from the cache")
+    parser.add_argument("--mongo-uri", default="memory://")
+    parser.add_argument("--parse-mode", default="process", choices=["process", "thread"])
+    parser.add_argument("--parse-workers", type=int, default=0, help="0 = pool default")
+    parser.add_argument("--spacy-model", default=os.getenv("SPACY_MODEL", "en_core_web_sm"))
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request client timeout (s)")
+    parser.add_argument("--out", help="Write the JSON report here (default: stdout)")
+    parser.add_argument("--compare", help="Baseline report to diff against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95 / RPS change before failing")
+    args = parser.parse_args()
+    args.routes = [name.strip() for name in args.routes.split(",") if name.strip()]
+    unknown = [name for name in args.routes if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown routes: {', '.join(unknown)} (choose from {', '.join(ROUTES)})")
+
+    configure_env(args)
+    routes = asyncio.run(run(args))
+
+    result = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        },
+        "routes": routes,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+    else:
+        print(json.dumps(result, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nvs {baseline['meta']['commit']} ({baseline['meta']['timestamp']})")
+        if compare(result, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# benchmarks/mongo_concurrency.py
+# Shows that concurrent handlers no longer serialize behind Mongo latency.
+# Fires N concurrent lookups, each made artificially slow with a server-side
+# sleep, once through the old sync MongoClient and once through the async
+# client from mongo_store.py, and reports wall time plus worst event-loop lag.
+#
+#   MONGO_URI=mongodb://localhost:27017 python benchmarks/mongo_concurrency.py -n 20 --delay-ms 100
+#
+# Needs a mongod with server-side JavaScript enabled (used for $where sleep).
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymongo import MongoClient
+
+from mongo_store import DB_NAME, create_mongo_client, mongo_client_options
+
+COLLECTION = "bench_mongo_concurrency"
+
+
+async def measure_loop_lag(stop: asyncio.Event, interval: float = 0.005) -> float:
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - started - interval)
+    return worst
+
+
+async def run_sync(mongo_uri: str, n: int, query: dict) -> dict:
+    options = mongo_client_options(mongo_uri)
+    client = MongoClient(mongo_uri, **options)
+    collection = client[DB_NAME][COLLECTION]
+
+    async def handler():
+        # What the routes used to do: a blocking call inside `async def`
+        return collection.find_one(query)
+
+    result = await _drive(handler, n)
+    client.close()
+    return result
+
+
+async def run_async(mongo_uri: str, n: int, query: dict) -> dict:
+    client = create_mongo_client(mongo_uri)
+    collection = client[DB_NAME][COLLECTION]
+
+    async def handler():
+        return await collection.find_one(query)
+
+    result = await _drive(handler, n)
+    await client.close()
+    return result
+
+
+async def _drive(handler, n: int) -> dict:
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(handler() for _ in range(n)))
+    wall = time.perf_counter() - started
+    stop.set()
+    return {"wall_s": round(wall, 4), "max_loop_lag_s": round(await lag_task, 4)}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Sync vs async Mongo client under concurrency")
+    parser.add_argument("-n", type=int, default=20, help="Concurrent requests")
+    parser.add_argument("--delay-ms", type=int, default=100, help="Server-side latency per query")
+    args = parser.parse_args()
+
+    mongo_uri = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+    setup = MongoClient(mongo_uri, **mongo_client_options(mongo_uri))
+    setup[DB_NAME][COLLECTION].replace_one({"_id": "probe"}, {"_id": "probe"}, upsert=True)
+    setup.close()
+
+    query = {"_id": "probe", "$where": f"sleep({args.delay_ms}) || true"}
+    report = {
+        "requests": args.n,
+        "delay_ms": args.delay_ms,
+        "sync_client": await run_sync(mongo_uri, args.n, query),
+        "async_client": await run_async(mongo_uri, args.n, query),
+    }
+    # Serialized execution would take roughly n * delay
+    report["serialized_estimate_s"] = round(args.n * args.delay_ms / 1000, 4)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
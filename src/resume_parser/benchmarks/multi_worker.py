@@ -0,0 +1,158 @@
+# benchmarks/multi_worker.py
+# Parse throughput and memory of gunicorn multi-worker serving as the worker
+# count grows. For each count it starts `gunicorn -c gunicorn.conf.py main:app`
+# against the offline stand-ins (fake LLM, local vectors, MONGO_URI=memory://),
+# uploads distinct synthetic resumes to /api/parse-resume so every one is a
+# real parse, and reads RSS / PSS / private memory of the master and each
+# worker from /proc. PSS splits shared pages between the processes mapping
+# them, so it shows what preloading saves; --no-preload runs each count a
+# second time without it for comparison. Linux only (/proc).
+#
+#   python benchmarks/multi_worker.py --workers 1,2,4 --files 200 --out multi_worker.json
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from corpus import build_corpus
+from cold_start import APP_DIR, OFFLINE_ENV, free_port
+from load_test import percentile
+
+
+def memory_kb(pid: int) -> dict:
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if name in ("Rss", "Pss", "Private_Clean", "Private_Dirty"):
+                fields[name] = int(value.split()[0])
+    return {
+        "rss_mb": round(fields["Rss"] / 1024, 1),
+        "pss_mb": round(fields["Pss"] / 1024, 1),
+        "private_mb": round((fields["Private_Clean"] + fields["Private_Dirty"]) / 1024, 1),
+    }
+
+
+def children(pid: int) -> list:
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(child) for child in f.read().split()]
+
+
+def memory_report(master: int) -> dict:
+    # Parse-pool processes (PARSE_POOL_MODE=process) are counted with their worker
+    workers = []
+    for worker in children(master):
+        processes = [worker] + children(worker)
+        usage = [memory_kb(pid) for pid in processes]
+        workers.append({key: round(sum(u[key] for u in usage), 1) for key in usage[0]})
+    total_pss = memory_kb(master)["pss_mb"] + sum(w["pss_mb"] for w in workers)
+    return {"master": memory_kb(master), "workers": workers, "total_pss_mb": round(total_pss, 1)}
+
+
+async def wait_ready(client, workers: int, timeout_s: float):
+    # Requests land on arbitrary workers: several 200s in a row means they're all up
+    deadline = time.perf_counter() + timeout_s
+    streak = 0
+    while streak < workers * 4:
+        if time.perf_counter() > deadline:
+            raise RuntimeError("Workers did not become ready")
+        try:
+            ok = (await client.get("/readyz")).status_code == 200
+        except httpx.TransportError:
+            ok = False
+        streak = streak + 1 if ok else 0
+        if not ok:
+            await asyncio.sleep(0.05)
+
+
+async def drive(client, pdfs: list, concurrency: int) -> dict:
+    latencies, errors = [], 0
+    queue = iter(enumerate(pdfs))
+
+    async def uploader():
+        nonlocal errors
+        for i, pdf in queue:
+            started = time.perf_counter()
+            response = await client.post("/api/parse-resume", data={"userId": f"bench-user-{i}"},
+                                         files={"file": (f"resume_{i}.pdf", pdf, "application/pdf")})
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(uploader() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "files_per_s": round(len(latencies) / wall, 2),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+    }
+
+
+async def one_config(workers: int, preload: bool, pdfs: list, args) -> dict:
+    port = free_port()
+    env = {**os.environ, "WEB_CONCURRENCY": str(workers), "BIND": f"127.0.0.1:{port}",
+           "GUNICORN_PRELOAD": str(preload).lower(), "SPACY_MODEL": args.spacy_model}
+    for name, value in OFFLINE_ENV.items():
+        env.setdefault(name, value)
+    process = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app"],
+                               cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency * workers)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60.0, limits=limits) as client:
+            await wait_ready(client, workers, args.timeout)
+            idle = memory_report(process.pid)
+            load = await drive(client, pdfs, args.concurrency * workers)
+            loaded = memory_report(process.pid)
+    finally:
+        process.terminate()
+        process.wait(timeout=60)
+    return {"workers": workers, "preload": preload, **load, "memory_idle": idle, "memory_loaded": loaded}
+
+
+async def main_async(args):
+    counts = [int(n) for n in args.workers.split(",")]
+    # Distinct PDFs per run, so neither the per-worker parse cache nor Mongo dedupe kicks in
+    pdfs = build_corpus(args.files, args.seed)
+    results = []
+    for workers in counts:
+        for preload in ([True, False] if args.no_preload else [True]):
+            result = await one_config(workers, preload, pdfs, args)
+            print(f"workers={workers} preload={preload}: {result['files_per_s']} files/s, "
+                  f"total PSS {result['memory_loaded']['total_pss_mb']} MB", file=sys.stderr)
+            results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse throughput and memory vs gunicorn worker count")
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts")
+    parser.add_argument("--files", type=int, default=100, help="Uploads per configuration")
+    parser.add_argument("--concurrency", type=int, default=2, help="Concurrent uploads per worker")
+    parser.add_argument("--no-preload", action="store_true", help="Also run every count without preloading")
+    parser.add_argument("--spacy-model", default=os.getenv("SPACY_MODEL", "en_core_web_sm"))
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--out", help="Write the JSON report here (default: stdout)")
+    args = parser.parse_args()
+
+    report = {"cpus": os.cpu_count(), "spacy_model": args.spacy_model, "files": args.files,
+              "results": asyncio.run(main_async(args))}
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# benchmarks/publish_dispatch.py
+# Publish dispatcher (publish.py) against the local Jenkins stand-in
+# (fake_jenkins.py, served in-process): simulated users re-publish several
+# times in quick succession, and the report shows how many pipeline runs
+# that became, how long the route-side submit takes, the delay from the first
+# click to the trigger, and the retries caused by injected Jenkins failures.
+#
+#   python benchmarks/publish_dispatch.py --users 50 --clicks 5 --debounce-ms 300
+#   python benchmarks/publish_dispatch.py --fail-rate 0.3   # retries under a flaky Jenkins
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+import uvicorn
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_jenkins import FakeJenkins
+from load_test import free_port, percentile
+from publish import FAILED, TRIGGERED, PublishDispatcher
+
+
+async def serve(app, port: int):
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="error"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    return server, task
+
+
+async def user_session(dispatcher, user: int, clicks: int, gap_s: float, rng, submits: list):
+    publish_id = None
+    for click in range(clicks):
+        started = time.perf_counter()
+        publish, _ = dispatcher.submit(f"bench-user-{user}", "resume", "latex", f"% revision {click}\n")
+        submits.append(time.perf_counter() - started)
+        publish_id = publish["publishId"]
+        await asyncio.sleep(rng.uniform(0, gap_s))
+    return publish_id
+
+
+async def main_async(args):
+    rng = random.Random(args.seed)
+    jenkins = FakeJenkins(latency_s=args.latency, fail_rate=args.fail_rate, seed=args.seed)
+    port = free_port()
+    server, serving = await serve(jenkins.app, port)
+    dispatcher = PublishDispatcher(f"http://127.0.0.1:{port}/job/publish/buildWithParameters",
+                                   user="bench", token="bench", debounce_s=args.debounce_ms / 1000,
+                                   max_delay_s=args.debounce_ms * 6 / 1000, base_backoff_s=0.05,
+                                   max_retries=args.retries)
+    dispatcher.start()
+    submits = []
+    try:
+        started = time.perf_counter()
+        ids = await asyncio.gather(*(
+            user_session(dispatcher, user, args.clicks, args.debounce_ms / 1000 / 2, rng, submits)
+            for user in range(args.users)
+        ))
+        while dispatcher.stats()["queued"] or dispatcher.stats()["dispatching"]:
+            await asyncio.sleep(0.01)
+        wall = time.perf_counter() - started
+        statuses = [dispatcher._recent[publish_id] for publish_id in set(ids)]
+    finally:
+        await dispatcher.close()
+        server.should_exit = True
+        await serving
+
+    # First click -> trigger accepted, for the publishes that went through
+    settle = sorted(
+        (p.finished_at.timestamp() - p.created_at.timestamp()) for p in statuses if p.status == TRIGGERED
+    )
+    submits.sort()
+    return {
+        "users": args.users,
+        "clicks_per_user": args.clicks,
+        "debounce_ms": args.debounce_ms,
+        "fail_rate": args.fail_rate,
+        "submitted": len(submits),
+        "pipeline_runs": len(jenkins.builds),
+        "runs_per_user": round(len(jenkins.builds) / args.users, 2),
+        "failed": sum(p.status == FAILED for p in statuses),
+        "jenkins_rejections": jenkins.rejected,
+        "submit_p50_us": round(percentile(submits, 50) * 1e6, 1),
+        "submit_p99_us": round(percentile(submits, 99) * 1e6, 1),
+        "first_click_to_trigger_p50_ms": round(percentile(settle, 50) * 1000, 1) if settle else None,
+        "wall_s": round(wall, 2),
+        "dispatcher": dispatcher.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish dispatcher coalescing and retries vs a stand-in Jenkins")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--clicks", type=int, default=5, help="Publishes per user, in quick succession")
+    parser.add_argument("--debounce-ms", type=float, default=300)
+    parser.add_argument("--latency", type=float, default=0.05, help="Stand-in Jenkins seconds per trigger")
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=5)
+    parser.add_argument("--out", help="Write the JSON report here (default: stdout)")
+    args = parser.parse_args()
+
+    report = asyncio.run(main_async(args))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# benchmarks/skill_extraction.py
+# Per-document latency of skill extraction: the old full pipeline
+# (spacy.load(model) with every component, ORG/PERSON/SKILL entities) against
+# the trimmed pipeline with the gazetteer EntityRuler, plus how the ruler
+# scales as the gazetteer grows. "before" needs the model installed.
+#
+#   python benchmarks/skill_extraction.py --docs 200
+#   python benchmarks/skill_extraction.py --extra-terms 0 5000 20000
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import spacy
+
+from parse_pool import SPACY_MODEL
+from skill_extractor import build_nlp, extract_skills, gazetteer_path, load_gazetteer
+
+FILLER = ["Designed", "and", "shipped", "services", "for", "payments", "reducing", "latency", "by", "40%",
+          "while", "mentoring", "four", "engineers", "at", "Acme", "Corp", "in", "Berlin", "."]
+
+
+def synthetic_resume(rng: random.Random, skills: list, words: int) -> str:
+    out = []
+    for _ in range(words):
+        out.append(rng.choice(skills) if rng.random() < 0.08 else rng.choice(FILLER))
+    return " ".join(out)
+
+
+def time_per_doc(nlp, texts, labels) -> dict:
+    samples, found = [], 0
+    for text in texts:
+        started = time.perf_counter()
+        found += len(extract_skills(nlp(text), labels))
+        samples.append(time.perf_counter() - started)
+    ordered = sorted(samples)
+    return {
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 3),
+        "p95_ms": round(ordered[int(len(ordered) * 0.95)] * 1000, 3),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+        "avg_entities": round(found / len(texts), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Skill extraction latency before/after pipeline trimming")
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--words", type=int, default=600, help="Words per synthetic resume")
+    parser.add_argument("--model", default=SPACY_MODEL)
+    parser.add_argument("--extra-terms", type=int, nargs="*", default=[0, 5000, 20000],
+                        help="Synthetic terms appended to the gazetteer for the scaling run")
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    skills = [terms[0].lstrip("=") for _, terms in load_gazetteer()]
+    texts = [synthetic_resume(rng, skills, args.words) for _ in range(args.docs)]
+    report = {"docs": args.docs, "words_per_doc": args.words, "model": args.model}
+
+    try:
+        started = time.perf_counter()
+        full = spacy.load(args.model)
+        report["before_load_s"] = round(time.perf_counter() - started, 2)
+        report["before_pipes"] = full.pipe_names
+        report["before"] = time_per_doc(full, texts, ("SKILL", "ORG", "PERSON"))
+    except OSError:
+        report["before"] = f"skipped: {args.model} is not installed"
+
+    started = time.perf_counter()
+    trimmed = build_nlp(args.model, ("SKILL",))
+    report["after_load_s"] = round(time.perf_counter() - started, 2)
+    report["after_pipes"] = trimmed.pipe_names
+    report["after"] = time_per_doc(trimmed, texts, ("SKILL",))
+
+    scaling = {}
+    base = open(gazetteer_path(), encoding="utf-8").read()
+    for extra in args.extra_terms:
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False, encoding="utf-8") as f:
+            f.write(base + "\n" + "\n".join(f"Synthetic Skill {i}" for i in range(extra)))
+        os.environ["SKILLS_GAZETTEER"] = f.name
+        try:
+            started = time.perf_counter()
+            nlp = build_nlp(args.model, ("SKILL",))
+            compile_s = time.perf_counter() - started
+            scaling[str(len(skills) + extra)] = {"compile_s": round(compile_s, 2),
+                                                 **time_per_doc(nlp, texts, ("SKILL",))}
+        finally:
+            os.environ.pop("SKILLS_GAZETTEER")
+            os.unlink(f.name)
+    report["gazetteer_scaling"] = scaling
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
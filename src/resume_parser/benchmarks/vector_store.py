@@ -0,0 +1,128 @@
+# benchmarks/vector_store.py
+# Compares retrieval latency of the vector store backends on a synthetic
+# Feedback corpus. The local engine always runs; Weaviate only runs with
+# --weaviate and WEAVIATE_URL / WEAVIATE_API_KEY / COHERE_APIKEY set, and
+# writes into the configured cluster.
+#
+#   python benchmarks/vector_store.py --docs 20000 --users 500 --queries 500
+#   python benchmarks/vector_store.py --persist /tmp/vectors
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vector_backends import LocalVectorStore, WeaviateStore, load_embedder
+
+SKILLS = ["python", "react", "docker", "kubernetes", "sql", "fastapi", "aws", "typescript",
+          "pandas", "spark", "java", "go", "terraform", "mongodb", "graphql", "pytorch"]
+VERBS = ["built", "led", "designed", "migrated", "optimized", "shipped", "maintained", "tested"]
+
+
+def synthetic_feedback(rng: random.Random, users: int) -> dict:
+    skills = rng.sample(SKILLS, 4)
+    resume = " ".join(f"{rng.choice(VERBS)} services with {skill}" for skill in skills)
+    feedback = f"Quantify impact for {skills[0]} and add detail on {skills[1]} projects."
+    return {
+        "user_id": f"user-{rng.randrange(users)}",
+        "text": f"Resume:\n{resume}\n\nFeedback:\n{feedback}",
+        "rating": rng.choice(["good", "bad", "unrated"]),
+    }
+
+
+def percentiles(samples: list) -> dict:
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {
+        "p50_us": round(pick(0.50) * 1e6, 1),
+        "p95_us": round(pick(0.95) * 1e6, 1),
+        "p99_us": round(pick(0.99) * 1e6, 1),
+        "mean_us": round(statistics.fmean(samples) * 1e6, 1),
+    }
+
+
+async def run_backend(store, docs: list, queries: list, batch: int) -> dict:
+    await store.connect()
+    try:
+        started = time.perf_counter()
+        for offset in range(0, len(docs), batch):
+            await store.insert_many("Feedback", docs[offset:offset + batch])
+        insert_s = time.perf_counter() - started
+
+        per_user, global_search = [], []
+        for user_id, query in queries:
+            t = time.perf_counter()
+            await store.search("Feedback", query, user_id=user_id, limit=3)
+            per_user.append(time.perf_counter() - t)
+            t = time.perf_counter()
+            await store.search("Feedback", query, limit=3)
+            global_search.append(time.perf_counter() - t)
+        return {
+            "insert_docs_per_s": round(len(docs) / insert_s, 1),
+            "search_user_filtered": percentiles(per_user),
+            "search_whole_collection": percentiles(global_search),
+        }
+    finally:
+        await store.close()
+
+
+async def main_async(args):
+    rng = random.Random(args.seed)
+    docs = [synthetic_feedback(rng, args.users) for _ in range(args.docs)]
+    queries = [(f"user-{rng.randrange(args.users)}", f"Resume: {' '.join(rng.sample(SKILLS, 3))}")
+               for _ in range(args.queries)]
+
+    embedder = load_embedder(args.embedder)
+    started = time.perf_counter()
+    embedder.embed([d["text"] for d in docs[:1000]])
+    embed_us = (time.perf_counter() - started) / min(1000, len(docs)) * 1e6
+
+    report = {
+        "docs": args.docs,
+        "users": args.users,
+        "queries": args.queries,
+        "embedder": embedder.name,
+        "embed_us_per_doc": round(embed_us, 1),
+        "backends": {},
+    }
+
+    with tempfile.TemporaryDirectory() as scratch:
+        directory = args.persist or (os.path.join(scratch, "vectors") if args.memmap else None)
+        local = LocalVectorStore(embedder, directory)
+        report["backends"]["local" + ("-memmap" if directory else "")] = await run_backend(
+            local, docs, queries, args.batch
+        )
+
+    if args.weaviate:
+        # Remote calls are slow; a slice of the corpus is enough to see the gap
+        report["backends"]["weaviate"] = await run_backend(
+            WeaviateStore.from_env(), docs[:args.weaviate_docs], queries[:args.weaviate_queries], args.batch
+        )
+
+    print(json.dumps(report, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vector store backend retrieval benchmark")
+    parser.add_argument("--docs", type=int, default=20000, help="Feedback objects to insert")
+    parser.add_argument("--users", type=int, default=500, help="Distinct user ids")
+    parser.add_argument("--queries", type=int, default=500, help="Searches per mode")
+    parser.add_argument("--batch", type=int, default=64, help="insert_many batch size")
+    parser.add_argument("--embedder", default=None, help="LOCAL_EMBEDDER spec (default: env or hashing)")
+    parser.add_argument("--memmap", action="store_true", help="Back the local store with a temp memmap dir")
+    parser.add_argument("--persist", default=None, help="Back the local store with this directory")
+    parser.add_argument("--weaviate", action="store_true", help="Also run against Weaviate Cloud")
+    parser.add_argument("--weaviate-docs", type=int, default=500)
+    parser.add_argument("--weaviate-queries", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
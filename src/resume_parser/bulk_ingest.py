@@ -0,0 +1,205 @@
+# bulk_ingest.py
+# Bulk resume upload: many PDFs (or zip archives of PDFs) in one request.
+# Parse-cache hits are answered straight away, misses are parsed in batches
+# across the parse pool, resume documents are written with insert_many, and
+# one NDJSON line per file is streamed back as each batch completes.
+import asyncio
+import io
+import json
+import os
+import time
+import zipfile
+from datetime import datetime
+
+from bson import ObjectId
+
+import resume_versions
+from global_state import GlobalState
+from parse_cache import content_hash
+from uploads import PDF_MAGIC, max_bulk_upload_bytes, read_bounded
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+class BulkLimitExceeded(Exception):
+    """Raised when an upload exceeds BULK_MAX_FILES; answered with 413."""
+
+
+def _limits():
+    return (
+        int(os.getenv("BULK_MAX_FILES", "1000")),
+        int(float(os.getenv("BULK_MAX_FILE_MB", "10")) * 1024 * 1024),
+    )
+
+
+def _ndjson(record: dict) -> str:
+    return json.dumps(record, default=str) + "\n"
+
+
+async def read_uploads(files: list) -> list:
+    """
+    [UploadFile] -> [(filename, bytes or None)]. A PDF is read up to
+    BULK_MAX_FILE_MB and an archive up to the whole bulk cap; past that the
+    read stops and the content is None, so one oversized file costs at most
+    its limit in memory rather than its full size.
+    """
+    max_bytes, max_archive_bytes = _limits()[1], max_bulk_upload_bytes()
+    uploads = []
+    for file in files:
+        head = await file.read(len(PDF_MAGIC))
+        limit = max_bytes if head.startswith(PDF_MAGIC) else max_archive_bytes
+        rest = await read_bounded(file, limit - len(head))
+        uploads.append((file.filename, head + rest if rest is not None else None))
+    return uploads
+
+
+def expand_uploads(uploads: list) -> list:
+    """
+    [(filename, bytes or None)] -> [(filename, bytes or None, error or None)]
+    with zip archives replaced by the PDFs inside them. None content (cut off
+    by read_uploads) is reported as too large. Entry sizes are checked from
+    the zip directory before anything is decompressed.
+    """
+    max_files, max_bytes = _limits()
+    entries = []
+    for filename, content in uploads:
+        if content is None:
+            entries.append((filename, None, "File too large"))
+        elif zipfile.is_zipfile(io.BytesIO(content)) and not content.startswith(b"%PDF"):
+            try:
+                with zipfile.ZipFile(io.BytesIO(content)) as archive:
+                    for info in archive.infolist():
+                        if info.is_dir() or not info.filename.lower().endswith(".pdf"):
+                            continue
+                        name = f"{filename}/{info.filename}"
+                        if info.file_size > max_bytes:
+                            entries.append((name, None, "File too large"))
+                        else:
+                            entries.append((name, archive.read(info), None))
+                        if len(entries) > max_files:
+                            raise BulkLimitExceeded(f"More than {max_files} files in upload")
+            except zipfile.BadZipFile as e:
+                entries.append((filename, None, f"Invalid zip archive: {e}"))
+        elif len(content) > max_bytes:
+            entries.append((filename, None, "File too large"))
+        else:
+            entries.append((filename, content, None))
+        if len(entries) > max_files:
+            raise BulkLimitExceeded(f"More than {max_files} files in upload")
+    return entries
+
+
+async def _insert_resumes(user_id: str, rows: list, chain: dict) -> list:
+    """
+    rows: [(filename, digest, cache entry)] -> inserted ids, in order. Each
+    document is versioned like a single upload: linked to the user's previous
+    resume (`chain["previous"]`, advanced as rows are added) with its
+    sections, diff and summary excerpt.
+    """
+    if not rows:
+        return []
+    docs = []
+    for filename, digest, entry in rows:
+        text = entry["parsedText"] or ""
+        sections = entry.get("sections") or resume_versions.resume_sections(text)
+        version = resume_versions.version_fields(chain["previous"], sections)
+        doc = {
+            "_id": ObjectId(),  # known before the insert, so the next row can link to it
+            "userId": user_id,
+            "filename": filename,
+            "contentHash": digest,
+            "blobId": entry["blobId"],
+            "fileId": entry["fileId"],
+            "skills": entry["skills"],
+            "summary": resume_versions.summary_excerpt(text),
+            **version,
+            "uploadedAt": datetime.now(),
+        }
+        docs.append(doc)
+        chain["previous"] = {"_id": doc["_id"], "sections": version["sections"]}
+    result = await GlobalState.collection.insert_many(docs)
+    return result.inserted_ids
+
+
+def _ok_lines(rows: list, ids: list, cached: bool):
+    for (filename, digest, entry), resume_id in zip(rows, ids):
+        yield _ndjson({
+            "filename": filename,
+            "status": "ok",
+            "resumeId": str(resume_id),
+            "contentHash": digest,
+            "skills": entry["skills"],
+            "chars": len(entry["parsedText"] or ""),
+            "cached": cached,
+        })
+
+
+async def ingest_stream(user_id: str, entries: list, batch_size: int = None):
+    """Async generator of NDJSON lines; the last line summarises the run."""
+    batch_size = batch_size or int(os.getenv("BULK_PARSE_BATCH_SIZE", "8"))
+    started = time.perf_counter()
+    counts = {"ok": 0, "failed": 0, "cached": 0}
+    chain = {"previous": await resume_versions.latest_version(GlobalState.collection, user_id)}
+
+    def failed(filename, error):
+        counts["failed"] += 1
+        return _ndjson({"filename": filename, "status": "error", "error": error})
+
+    # Files sharing content are parsed once and fanned out afterwards
+    by_digest = {}
+    for filename, content, error in entries:
+        if error:
+            yield failed(filename, error)
+            continue
+        digest = content_hash(content)
+        by_digest.setdefault(digest, [content, []])[1].append(filename)
+
+    digests = list(by_digest)
+    found = await asyncio.gather(*(GlobalState.parse_cache.lookup(d) for d in digests))
+
+    hit_rows, misses = [], []
+    for digest, entry in zip(digests, found):
+        if entry:
+            hit_rows.extend((filename, digest, entry) for filename in by_digest[digest][1])
+        else:
+            misses.append(digest)
+    if hit_rows:
+        ids = await _insert_resumes(user_id, hit_rows, chain)
+        counts["ok"] += len(hit_rows)
+        counts["cached"] += len(hit_rows)
+        for line in _ok_lines(hit_rows, ids, cached=True):
+            yield line
+
+    pdfs = [by_digest[digest][0] for digest in misses]
+    async for batch in GlobalState.parse_pool.parse_many(pdfs, batch_size=batch_size):
+        parsed = []
+        for index, text, skills, sections, error in batch:
+            digest = misses[index]
+            if error:
+                for filename in by_digest[digest][1]:
+                    yield failed(filename, error)
+            else:
+                parsed.append((digest, text, skills, sections))
+        if not parsed:
+            continue
+        stored = await asyncio.gather(*(
+            GlobalState.parse_cache.store(digest, by_digest[digest][0], text, skills, sections)
+            for digest, text, skills, sections in parsed
+        ))
+        rows = [
+            (filename, digest, entry)
+            for (digest, *_), entry in zip(parsed, stored)
+            for filename in by_digest[digest][1]
+        ]
+        # One insert_many per parsed batch, so lines stream while later batches parse
+        ids = await _insert_resumes(user_id, rows, chain)
+        counts["ok"] += len(rows)
+        for line in _ok_lines(rows, ids, cached=False):
+            yield line
+
+    yield _ndjson({
+        "done": True,
+        "files": len(entries),
+        **counts,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    })
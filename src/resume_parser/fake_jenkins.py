@@ -0,0 +1,67 @@
+# fake_jenkins.py
+# Local stand-in for the Jenkins `buildWithParameters` endpoint, so the
+# publish dispatcher (publish.py) can be exercised without a CI server. It
+# records every trigger and can add latency and fail a fraction of requests.
+# Point JENKINS_URL at it:
+#
+#   python fake_jenkins.py --port 8090 --fail-rate 0.2
+#   JENKINS_URL=http://127.0.0.1:8090/job/publish/buildWithParameters JENKINS_USER=u JENKINS_TOKEN=t ...
+import argparse
+import asyncio
+import itertools
+import random
+import time
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+
+class FakeJenkins:
+    def __init__(self, latency_s: float = 0.0, fail_rate: float = 0.0, fail_status: int = 503, seed: int = None):
+        self.latency_s = latency_s
+        self.fail_rate = fail_rate
+        self.fail_status = fail_status
+        self.rng = random.Random(seed)
+        self.builds = []    # triggers that were accepted, in order
+        self.rejected = 0
+        self._queue_ids = itertools.count(1)
+        self.app = Starlette(routes=[
+            Route("/job/{job}/buildWithParameters", self.trigger, methods=["POST"]),
+            Route("/builds", self.list_builds, methods=["GET"]),
+        ])
+
+    async def trigger(self, request: Request):
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+        if not request.headers.get("authorization"):
+            return Response("Authentication required", status_code=401)
+        if self.rng.random() < self.fail_rate:
+            self.rejected += 1
+            return Response("Jenkins is unavailable", status_code=self.fail_status)
+        queue_id = next(self._queue_ids)
+        self.builds.append({"job": request.path_params["job"], "params": dict(request.query_params),
+                            "queueId": queue_id, "at": time.time()})
+        return Response(status_code=201, headers={"Location": f"{request.base_url}queue/item/{queue_id}/"})
+
+    async def list_builds(self, request: Request):
+        return JSONResponse({"builds": self.builds, "rejected": self.rejected})
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Stand-in Jenkins trigger endpoint")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per trigger")
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--fail-status", type=int, default=503)
+    args = parser.parse_args()
+    jenkins = FakeJenkins(args.latency, args.fail_rate, args.fail_status)
+    uvicorn.run(jenkins.app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# fake_llm.py
+# Local stand-in for Gemini with configurable latency, streaming and
+# failures. Selected with LLM_BACKEND=fake so the scheduler, caches and
+# routes can be exercised without network access or API keys.
+import asyncio
+import os
+import time
+from typing import Any, AsyncIterator, List, Optional
+
+from google.api_core.exceptions import ResourceExhausted
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+DEFAULT_RESPONSE = """Fake generation.
+---TEXT---
+Jane Doe
+Software Engineer with **5 years** of experience in **Python** and **FastAPI**.
+*2021 - 2024* Backend Engineer, Example Corp
+---ENDTEXT---
+---LATEX---
+\\documentclass{article}
+\\begin{document}
+Jane Doe
+\\end{document}
+---ENDLATEX---
+"""
+
+
+class FakeChatModel(BaseChatModel):
+    response: str = DEFAULT_RESPONSE
+    latency_s: float = 0.0      # delay before the first token / full response
+    token_delay_s: float = 0.0  # delay between streamed tokens
+    chunk_size: int = 8         # characters per streamed token
+    fail_times: int = 0         # first N calls raise a rate-limit error
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _maybe_fail(self):
+        self.calls += 1
+        if self.calls <= self.fail_times:
+            raise ResourceExhausted("fake rate limit")
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        self._maybe_fail()
+        time.sleep(self.latency_s + self.token_delay_s * (len(self.response) // self.chunk_size))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.response))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        self._maybe_fail()
+        await asyncio.sleep(self.latency_s + self.token_delay_s * (len(self.response) // self.chunk_size))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.response))])
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        self._maybe_fail()
+        await asyncio.sleep(self.latency_s)
+        for i in range(0, len(self.response), self.chunk_size):
+            if i and self.token_delay_s:
+                await asyncio.sleep(self.token_delay_s)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=self.response[i:i + self.chunk_size]))
+
+
+def fake_llm_from_env(model: str = None, temperature: float = None) -> FakeChatModel:
+    return FakeChatModel(
+        latency_s=float(os.getenv("FAKE_LLM_LATENCY_MS", "0")) / 1000,
+        token_delay_s=float(os.getenv("FAKE_LLM_TOKEN_DELAY_MS", "0")) / 1000,
+    )
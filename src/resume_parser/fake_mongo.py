@@ -0,0 +1,332 @@
+# fake_mongo.py
+# In-process stand-in for the async MongoDB client and GridFS, covering the
+# subset of the API this backend uses. Selected with MONGO_URI=memory:// so
+# the full app can run (load tests, offline dev) without Atlas or mongod.
+# Documents are deep-copied in and out, like a BSON round trip; there is no
+# persistence, TTL expiry or transactions.
+import copy
+import io
+from types import SimpleNamespace
+
+from bson import ObjectId
+from gridfs.errors import NoFile
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+_MISSING = object()
+
+
+def _get(doc, path: str):
+    value = doc
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _compare(value, op: str, arg) -> bool:
+    if op == "$exists":
+        return (value is not _MISSING) == bool(arg)
+    if op == "$ne":
+        return value != arg
+    if op == "$in":
+        return value in arg
+    if op == "$nin":
+        return value not in arg
+    if value is _MISSING or value is None:
+        return False
+    try:
+        return {"$gt": value > arg, "$gte": value >= arg, "$lt": value < arg, "$lte": value <= arg}[op]
+    except KeyError:
+        raise NotImplementedError(f"fake_mongo does not support {op}")
+    except TypeError:
+        return False
+
+
+def matches(doc: dict, query: dict) -> bool:
+    for key, condition in (query or {}).items():
+        if key == "$or":
+            if not any(matches(doc, sub) for sub in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, sub) for sub in condition):
+                return False
+        elif isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+            value = _get(doc, key)
+            if not all(_compare(value, op, arg) for op, arg in condition.items()):
+                return False
+        elif _get(doc, key) != condition:
+            return False
+    return True
+
+
+def _project(doc: dict, projection):
+    doc = copy.deepcopy(doc)
+    if not projection:
+        return doc
+    if isinstance(projection, (list, tuple)):
+        projection = {field: 1 for field in projection}
+    include = {k for k, v in projection.items() if v and k != "_id"}
+    if include:
+        kept = {k: doc[k] for k in include if k in doc}
+        if projection.get("_id", 1) and "_id" in doc:
+            kept["_id"] = doc["_id"]
+        return kept
+    return {k: v for k, v in doc.items() if projection.get(k, 1)}
+
+
+def _sort_key(doc, field):
+    value = _get(doc, field)
+    # Missing / None sort first ascending, as in Mongo
+    return (0, 0) if value is _MISSING or value is None else (1, value)
+
+
+def _sorted(docs, sort):
+    for field, direction in reversed(list(sort or [])):
+        docs = sorted(docs, key=lambda d: _sort_key(d, field), reverse=direction < 0)
+    return docs
+
+
+def _apply_update(doc: dict, update: dict, inserting: bool = False):
+    for op, fields in update.items():
+        for path, value in fields.items():
+            *parents, leaf = path.split(".")
+            target = doc
+            for part in parents:
+                target = target.setdefault(part, {})
+            if op == "$set" or (op == "$setOnInsert" and inserting):
+                target[leaf] = copy.deepcopy(value)
+            elif op == "$unset":
+                target.pop(leaf, None)
+            elif op == "$inc":
+                target[leaf] = target.get(leaf, 0) + value
+            elif op == "$setOnInsert":
+                pass
+            else:
+                raise NotImplementedError(f"fake_mongo does not support {op}")
+
+
+class FakeCursor:
+    def __init__(self, docs, projection):
+        self._docs = docs
+        self._projection = projection
+        self._sort = None
+        self._limit = 0
+
+    def sort(self, key_or_list, direction=None):
+        self._sort = key_or_list if isinstance(key_or_list, list) else [(key_or_list, direction or 1)]
+        return self
+
+    def limit(self, count: int):
+        self._limit = count
+        return self
+
+    def _results(self):
+        docs = _sorted(self._docs, self._sort)
+        if self._limit:
+            docs = docs[:self._limit]
+        return [_project(doc, self._projection) for doc in docs]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self._results():
+            yield doc
+
+    async def to_list(self, length=None):
+        results = self._results()
+        return results[:length] if length else results
+
+
+class FakeCollection:
+    def __init__(self, name: str):
+        self.name = name
+        self._docs = {}
+        self._unique = {}  # unique index fields -> {values: _id}
+
+    async def create_index(self, keys, unique: bool = False, name: str = None, **kwargs):
+        fields = tuple(field for field, _ in keys) if isinstance(keys, list) else (keys,)
+        if unique and fields not in self._unique:
+            self._unique[fields] = {}
+            for doc in self._docs.values():
+                self._index(doc)
+        return name or "_".join(fields)
+
+    async def drop_index(self, index_or_name):
+        # Only unique indexes are modelled, and none of those are dropped
+        pass
+
+    def _index(self, doc, old=None):
+        """Claim `doc`'s unique keys (releasing `old`'s) or raise DuplicateKeyError."""
+        for fields, owners in self._unique.items():
+            values = tuple(_get(doc, f) for f in fields)
+            owner = owners.get(values)
+            if _MISSING not in values and owner is not None and owner != doc["_id"]:
+                raise DuplicateKeyError(f"E11000 duplicate key on {self.name} {fields}")
+        if old is not None:
+            self._release(old)
+        for fields, owners in self._unique.items():
+            values = tuple(_get(doc, f) for f in fields)
+            if _MISSING not in values:
+                owners[values] = doc["_id"]
+
+    def _release(self, doc):
+        for fields, owners in self._unique.items():
+            owners.pop(tuple(_get(doc, f) for f in fields), None)
+
+    def _matching(self, query):
+        if query and list(query) == ["_id"] and not isinstance(query["_id"], dict):
+            doc = self._docs.get(query["_id"])  # primary key lookups skip the scan
+            return [doc] if doc else []
+        return [doc for doc in self._docs.values() if matches(doc, query)]
+
+    async def find_one(self, query=None, projection=None, sort=None, **kwargs):
+        docs = _sorted(self._matching(query), sort)
+        return _project(docs[0], projection) if docs else None
+
+    def find(self, query=None, projection=None, sort=None, limit: int = 0, **kwargs):
+        cursor = FakeCursor(self._matching(query), projection)
+        if sort:
+            cursor.sort(sort)
+        return cursor.limit(limit)
+
+    async def count_documents(self, query=None, **kwargs):
+        return len(self._matching(query))
+
+    async def insert_one(self, doc: dict, **kwargs):
+        doc.setdefault("_id", ObjectId())
+        if doc["_id"] in self._docs:
+            raise DuplicateKeyError(f"E11000 duplicate _id on {self.name}")
+        self._index(doc)
+        self._docs[doc["_id"]] = copy.deepcopy(doc)
+        return SimpleNamespace(inserted_id=doc["_id"], acknowledged=True)
+
+    async def insert_many(self, docs: list, **kwargs):
+        ids = [(await self.insert_one(doc)).inserted_id for doc in docs]
+        return SimpleNamespace(inserted_ids=ids, acknowledged=True)
+
+    async def update_one(self, query, update, upsert: bool = False, **kwargs):
+        docs = self._matching(query)
+        if not docs:
+            if upsert:
+                doc = {k: v for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+                _apply_update(doc, update, inserting=True)
+                result = await self.insert_one(doc)
+                return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=result.inserted_id)
+            return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+        updated = copy.deepcopy(docs[0])
+        _apply_update(updated, update)
+        self._index(updated, old=docs[0])
+        self._docs[updated["_id"]] = updated
+        return SimpleNamespace(matched_count=1, modified_count=1, upserted_id=None)
+
+    async def replace_one(self, query, replacement, upsert: bool = False, **kwargs):
+        docs = self._matching(query)
+        if not docs and not upsert:
+            return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+        replacement = copy.deepcopy(replacement)
+        replacement["_id"] = docs[0]["_id"] if docs else query.get("_id", ObjectId())
+        self._index(replacement, old=docs[0] if docs else None)
+        self._docs[replacement["_id"]] = replacement
+        return SimpleNamespace(matched_count=len(docs[:1]), modified_count=len(docs[:1]),
+                               upserted_id=None if docs else replacement["_id"])
+
+    async def find_one_and_update(self, query, update, sort=None, projection=None,
+                                  return_document=ReturnDocument.BEFORE, upsert: bool = False, **kwargs):
+        docs = _sorted(self._matching(query), sort)
+        if not docs:
+            return None
+        before = copy.deepcopy(docs[0])
+        await self.update_one({"_id": before["_id"]}, update)
+        after = self._docs[before["_id"]]
+        return _project(after if return_document == ReturnDocument.AFTER else before, projection)
+
+    async def delete_one(self, query, **kwargs):
+        docs = self._matching(query)
+        if docs:
+            self._release(docs[0])
+            del self._docs[docs[0]["_id"]]
+        return SimpleNamespace(deleted_count=len(docs[:1]))
+
+    async def delete_many(self, query, **kwargs):
+        docs = self._matching(query)
+        for doc in docs:
+            self._release(doc)
+            del self._docs[doc["_id"]]
+        return SimpleNamespace(deleted_count=len(docs))
+
+
+class FakeGridOut:
+    def __init__(self, file_id, data: bytes, filename: str, metadata: dict):
+        self._id = file_id
+        self.filename = filename
+        self.metadata = metadata
+        self.length = len(data)
+        self._stream = io.BytesIO(data)
+
+    async def seek(self, position: int):
+        self._stream.seek(position)
+
+    async def read(self, size: int = -1) -> bytes:
+        return self._stream.read(size)
+
+    async def close(self):
+        pass
+
+
+class FakeGridFSBucket:
+    def __init__(self, bucket_name: str = "fs", chunk_size_bytes: int = 255 * 1024):
+        self.bucket_name = bucket_name
+        self._files = {}
+
+    async def upload_from_stream(self, filename: str, source, metadata: dict = None):
+        file_id = ObjectId()
+        self._files[file_id] = (source.read(), filename, metadata or {})
+        return file_id
+
+    async def open_download_stream(self, file_id):
+        if file_id not in self._files:
+            raise NoFile(f"no file with id {file_id}")
+        data, filename, metadata = self._files[file_id]
+        return FakeGridOut(file_id, data, filename, metadata)
+
+    async def delete(self, file_id):
+        if self._files.pop(file_id, None) is None:
+            raise NoFile(f"no file with id {file_id}")
+
+
+class FakeDatabase:
+    def __init__(self, name: str):
+        self.name = name
+        self._collections = {}
+        self._buckets = {}
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        if name not in self._collections:
+            self._collections[name] = FakeCollection(name)
+        return self._collections[name]
+
+    def create_gridfs_bucket(self, bucket_name: str = "fs", chunk_size_bytes: int = 255 * 1024):
+        # Picked up by resume_files.ResumeFileStore instead of AsyncGridFSBucket
+        if bucket_name not in self._buckets:
+            self._buckets[bucket_name] = FakeGridFSBucket(bucket_name, chunk_size_bytes)
+        return self._buckets[bucket_name]
+
+    async def command(self, name, *args, **kwargs):
+        return {"ok": 1.0}
+
+
+class FakeMongoClient:
+    def __init__(self):
+        self._databases = {}
+        self.admin = FakeDatabase("admin")
+
+    def __getitem__(self, name: str) -> FakeDatabase:
+        if name not in self._databases:
+            self._databases[name] = FakeDatabase(name)
+        return self._databases[name]
+
+    async def close(self):
+        pass
@@ -4,4 +4,18 @@ class GlobalState:
     mongo_client = None
     db = None
     collection = None
-    nlp = None
+    blobs = None
+    files = None
+    parse_cache = None
+    parse_pool = None
+    llm_cache = None
+    job_store = None
+    job_pool = None
+    latex_compiler = None
+
+    @classmethod
+    def reset(cls):
+        # Per-process state: a forked worker must build its own clients, never reuse its parent's
+        for name in ("mongo_client", "db", "collection", "blobs", "files", "parse_cache", "parse_pool",
+                     "llm_cache", "job_store", "job_pool", "latex_compiler"):
+            setattr(cls, name, None)
@@ -0,0 +1,80 @@
+# gunicorn.conf.py
+# Multi-process serving: gunicorn runs WEB_CONCURRENCY uvicorn workers.
+#
+#   gunicorn -c gunicorn.conf.py main:app
+#
+# The app and the read-only heavy state (spaCy pipeline, provider SDK
+# modules) are loaded once in the master and shared copy-on-write by the
+# forked workers. gc.freeze() keeps the collector from dirtying those pages.
+# Network clients (Mongo, vector store, Gemini channels) are never created in
+# the master: each worker's startup hook builds its own after the fork.
+import gc
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+from dotenv import load_dotenv
+
+# Read .env before anything below: main.py loads it too, but only once the app
+# is imported, after these defaults are set. Real environment variables still
+# take precedence over .env, and .env over the defaults here.
+load_dotenv()
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+# Long LLM streams and bulk uploads: a worker is only recycled when truly stuck
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+# Each worker parses on the pipeline it inherited, in one thread, instead of
+# starting its own process pool: parsing scales with the workers, and the
+# only spaCy copy is the master's. PARSE_POOL_MODE=process still works (the
+# parse processes then fork from the worker and inherit the same pages),
+# whether it comes from the environment or .env.
+os.environ.setdefault("PARSE_POOL_MODE", "thread")
+os.environ.setdefault("PARSE_POOL_WORKERS", "1")
+
+# Metrics from every worker are aggregated through a shared directory; it
+# must be set before prometheus_client is first imported (by the app preload)
+if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="skillbridge-metrics-")
+
+
+def on_starting(server):
+    # Values left over from a previous run would be summed in
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def when_ready(server):
+    # Runs in the master after the app is loaded and before any worker is forked
+    if not preload_app:
+        return
+    from parse_pool import preload_pipeline
+
+    preload_pipeline()
+    if os.getenv("LLM_BACKEND") != "fake":
+        # Module import only (over a second of CPU); clients and channels are per worker
+        import langchain_google_genai  # noqa: F401
+    gc.freeze()
+    server.log.info("Preloaded shared state for %s workers", workers)
+
+
+def post_fork(server, worker):
+    # Nothing network-bound should exist in the master, but never share one by accident
+    from global_state import GlobalState
+    from llm_registry import registry
+
+    GlobalState.reset()
+    registry.clear()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
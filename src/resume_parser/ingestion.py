@@ -0,0 +1,227 @@
+# ingestion.py
+# Background, batched ingestion into the vector store. Routes enqueue objects
+# and return immediately; a flusher groups them per collection and writes them
+# with insert_many once a batch fills up or the flush interval passes, so
+# vectorization (Cohere or local) happens in batches instead of one at a time.
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict, defaultdict, deque
+
+from telemetry import get_logger, span
+
+logger = get_logger("ingest")
+
+
+class IngestionQueueFull(Exception):
+    """Raised when the pending buffer is at capacity; callers should back off."""
+
+
+class IngestionClosed(Exception):
+    pass
+
+
+def payload_key(collection: str, properties: dict) -> str:
+    raw = json.dumps([collection, properties], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class _Pending:
+    __slots__ = ("collection", "properties", "key", "on_inserted", "attempts")
+
+    def __init__(self, collection, properties, key, on_inserted):
+        self.collection = collection
+        self.properties = properties
+        self.key = key
+        self.on_inserted = on_inserted
+        self.attempts = 0
+
+
+class IngestionQueue:
+    def __init__(self, store, batch_size: int = 64, flush_interval_s: float = 1.0,
+                 max_pending: int = 10000, max_attempts: int = 3, dedupe_window_s: float = 300.0):
+        # VectorStore the batches are written to
+        self.store = store
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.dedupe_window_s = dedupe_window_s
+
+        self._pending = []
+        self._pending_keys = set()
+        self._recent = OrderedDict()  # key -> flushed at, for dedupe across batches
+        self._wakeup = asyncio.Event()
+        self._closed = False
+        self._flusher = None
+        self._callbacks = set()
+        self.failures = deque(maxlen=50)
+        self.counters = {
+            "enqueued": 0,
+            "deduplicated": 0,
+            "batches": 0,
+            "inserted": 0,
+            "retried": 0,
+            "failed": 0,
+        }
+        self.last_flush_ms = None
+
+    @classmethod
+    def from_env(cls, store):
+        return cls(
+            store,
+            batch_size=int(os.getenv("INGEST_BATCH_SIZE", "64")),
+            flush_interval_s=float(os.getenv("INGEST_FLUSH_INTERVAL_MS", "1000")) / 1000,
+            max_pending=int(os.getenv("INGEST_MAX_PENDING", "10000")),
+            max_attempts=int(os.getenv("INGEST_MAX_ATTEMPTS", "3")),
+        )
+
+    # ----------------- PRODUCER SIDE -----------------
+    def enqueue(self, collection: str, properties: dict, on_inserted=None) -> bool:
+        """
+        Queue one object. Returns False if an identical payload is already
+        pending or was written within the dedupe window.
+        `on_inserted(uuid)` may be a coroutine function; it runs after the write.
+        """
+        if self._closed:
+            raise IngestionClosed("Ingestion queue is shutting down")
+
+        key = payload_key(collection, properties)
+        if key in self._pending_keys or self._recently_flushed(key):
+            self.counters["deduplicated"] += 1
+            return False
+        if len(self._pending) >= self.max_pending:
+            raise IngestionQueueFull(f"{len(self._pending)} objects waiting for ingestion")
+
+        self._pending.append(_Pending(collection, properties, key, on_inserted))
+        self._pending_keys.add(key)
+        self.counters["enqueued"] += 1
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def _recently_flushed(self, key: str) -> bool:
+        flushed_at = self._recent.get(key)
+        return flushed_at is not None and time.monotonic() - flushed_at < self.dedupe_window_s
+
+    def _remember(self, key: str):
+        now = time.monotonic()
+        self._recent[key] = now
+        self._recent.move_to_end(key)
+        while self._recent:
+            oldest_key, oldest_at = next(iter(self._recent.items()))
+            if now - oldest_at < self.dedupe_window_s and len(self._recent) <= 4 * self.max_pending:
+                break
+            self._recent.pop(oldest_key)
+
+    # ----------------- FLUSHER -----------------
+    def start(self):
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval_s)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+            if len(self._pending) >= self.batch_size:
+                self._wakeup.set()
+
+    async def flush(self):
+        # Flushes a snapshot; objects that fail (and anything enqueued
+        # meanwhile) wait for the next cycle instead of spinning here
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+
+        started = time.perf_counter()
+        by_collection = defaultdict(list)
+        for item in batch:
+            by_collection[item.collection].append(item)
+        for collection, items in by_collection.items():
+            for offset in range(0, len(items), self.batch_size):
+                await self._write(collection, items[offset:offset + self.batch_size])
+        self.last_flush_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    async def _write(self, collection: str, items: list):
+        self.counters["batches"] += 1
+        try:
+            with span("vector_insert"):
+                result = await self.store.insert_many(collection, [item.properties for item in items])
+            errors = result.errors
+            uuids = result.uuids
+        except Exception as e:
+            # Whole batch failed (network, auth...): every object counts as a failure
+            errors = {index: e for index in range(len(items))}
+            uuids = {}
+
+        for index, item in enumerate(items):
+            if index in errors:
+                self._on_failure(item, errors[index])
+                continue
+            self.counters["inserted"] += 1
+            self._pending_keys.discard(item.key)
+            self._remember(item.key)
+            if item.on_inserted and index in uuids:
+                self._run_callback(item.on_inserted, uuids[index])
+
+        if errors:
+            logger.warning("[⚠️ INGEST] %s/%s objects failed for %s", len(errors), len(items), collection)
+        else:
+            logger.info("[🧠 INGEST] Stored %s objects in %s", len(items), collection)
+
+    def _on_failure(self, item: _Pending, error):
+        item.attempts += 1
+        message = getattr(error, "message", None) or str(error)
+        if item.attempts < self.max_attempts and not self._closed:
+            self.counters["retried"] += 1
+            self._pending.append(item)
+            return
+        self._pending_keys.discard(item.key)
+        self.counters["failed"] += 1
+        self.failures.append({
+            "collection": item.collection,
+            "user_id": item.properties.get("user_id"),
+            "attempts": item.attempts,
+            "error": message,
+        })
+
+    def _run_callback(self, callback, uuid):
+        result = callback(uuid)
+        if asyncio.iscoroutine(result):
+            task = asyncio.create_task(result)
+            self._callbacks.add(task)
+            task.add_done_callback(self._callbacks.discard)
+
+    # ----------------- LIFECYCLE -----------------
+    async def close(self, timeout_s: float = 30.0):
+        """Stop accepting work and drain everything already queued."""
+        self._closed = True
+        self._wakeup.set()
+        if self._flusher:
+            await self._flusher
+        try:
+            # Retries are disabled once closed, so this terminates
+            await asyncio.wait_for(self._drain(), timeout=timeout_s)
+            if self._callbacks:
+                await asyncio.wait_for(asyncio.gather(*self._callbacks, return_exceptions=True), timeout=timeout_s)
+        except asyncio.TimeoutError:
+            logger.warning("[⚠️ INGEST] Drain timed out with %s objects still pending", len(self._pending))
+
+    async def _drain(self):
+        while self._pending:
+            await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "pending": len(self._pending),
+            "callbacks_running": len(self._callbacks),
+            "last_flush_ms": self.last_flush_ms,
+            "recent_failures": list(self.failures),
+        }
@@ -0,0 +1,68 @@
+# job_worker.py
+# Standalone worker for the Mongo-backed job queue (jobs.py), so generation
+# capacity scales separately from the API. Run as many as needed; set
+# JOB_WORKERS=0 on the API to leave all execution to these processes.
+#
+#   python job_worker.py [--workers 4]
+import argparse
+import asyncio
+import os
+import signal
+
+from dotenv import load_dotenv
+from prometheus_client import start_http_server
+
+from global_state import GlobalState
+from jobs import JOB_HANDLERS, JobWorkerPool, MongoJobStore
+from llm_cache import LLMCache
+from llm_registry import registry as chain_registry
+from mongo_store import connect_mongo
+from telemetry import configure_logging
+# Importing the routes module registers the job handlers
+from weaviate_server import close_vector_store, init_vector_store
+
+
+async def run(args):
+    load_dotenv()
+    configure_logging()
+    if os.getenv("JOB_METRICS_PORT"):
+        # No HTTP app here, so stage histograms get their own scrape port
+        start_http_server(int(os.getenv("JOB_METRICS_PORT")))
+    mongo_uri = os.getenv("MONGO_URI")
+    if not mongo_uri:
+        raise RuntimeError("[❌] MONGO_URI missing")
+
+    client, db = await connect_mongo(mongo_uri)
+    GlobalState.mongo_client = client
+    GlobalState.db = db
+    GlobalState.llm_cache = LLMCache.from_env(db["llm_cache"])
+    chain_registry.warm()
+    await init_vector_store()
+
+    store = MongoJobStore(db["jobs"], int(os.getenv("JOB_RESULT_TTL_S", "3600")))
+    await store.ensure_indexes()
+    pool = JobWorkerPool.from_env(store)
+    pool.concurrency = args.workers or pool.concurrency
+    pool.start()
+    print(f"[✅ JOBS] Worker {pool.worker_id} running {pool.concurrency} slots for {sorted(JOB_HANDLERS)}")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+
+    print("[🛑 JOBS] Shutting down, requeueing unfinished jobs")
+    await pool.close()
+    await close_vector_store()
+    await client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run background generation jobs from the Mongo queue")
+    parser.add_argument("--workers", type=int, default=0, help="Concurrent jobs (default: JOB_WORKERS)")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,535 @@
+# jobs.py
+# Background jobs for long-running generation. Submitting returns a job id
+# immediately; workers (in this process, or a separate `python job_worker.py`
+# sharing the Mongo queue) claim jobs with a lease, run the registered
+# handler, and write progress / partial output that clients poll or stream.
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import StreamingResponse
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from global_state import GlobalState
+from llm_scheduler import SchedulerSaturated
+from sse import SSE_HEADERS, sse_event
+from telemetry import get_logger
+
+logger = get_logger("jobs")
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+# What a heartbeat found: keep going, stop and record the cancel, or stop
+# without writing anything (the lease lapsed and the job may be someone else's)
+LEASE_HELD = "held"
+CANCEL_REQUESTED = "cancel_requested"
+LEASE_LOST = "lost"
+
+# kind -> (handler, required payload fields); filled by @job_handler
+JOB_HANDLERS = {}
+
+
+def job_handler(kind: str, required=()):
+    """Register `async def handler(payload, reporter) -> dict` for a job kind."""
+    def register(fn):
+        JOB_HANDLERS[kind] = (fn, tuple(required))
+        return fn
+    return register
+
+
+def default_idempotency_key(kind: str, payload: dict) -> str:
+    raw = json.dumps([kind, payload], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def public_view(job: dict) -> dict:
+    hidden = ("_id", "payload", "leaseUntil", "workerId", "availableAt")
+    view = {k: v.isoformat() if isinstance(v, datetime) else v for k, v in job.items() if k not in hidden}
+    view["jobId"] = job["_id"]
+    return view
+
+
+def _new_job(kind: str, payload: dict, idempotency_key: str) -> dict:
+    return {
+        "_id": uuid.uuid4().hex,
+        "kind": kind,
+        "payload": payload,
+        "idempotencyKey": idempotency_key,
+        "status": QUEUED,
+        "progress": {"stage": QUEUED},
+        "partial": "",
+        "result": None,
+        "error": None,
+        "attempts": 0,
+        "cancelRequested": False,
+        "availableAt": datetime.now(),
+        "createdAt": datetime.now(),
+    }
+
+
+# ----------------- STORES -----------------
+class MongoJobStore:
+    """Jobs collection shared by API and worker processes."""
+
+    def __init__(self, collection, result_ttl_s: int = 3600):
+        self.collection = collection
+        self.result_ttl_s = result_ttl_s
+
+    async def ensure_indexes(self):
+        await self.collection.create_index(
+            [("idempotencyKey", ASCENDING)], unique=True, name="idempotencyKey_unique",
+            partialFilterExpression={"idempotencyKey": {"$type": "string"}},
+        )
+        await self.collection.create_index([("status", ASCENDING), ("availableAt", ASCENDING)], name="status_available")
+        await self.collection.create_index([("expiresAt", ASCENDING)], expireAfterSeconds=0, name="expiresAt_ttl")
+
+    async def create(self, kind: str, payload: dict, idempotency_key: str):
+        """Returns (job, created). An existing live job with the same key wins."""
+        job = _new_job(kind, payload, idempotency_key)
+        for _ in range(3):
+            try:
+                await self.collection.insert_one(job)
+                return job, True
+            except DuplicateKeyError:
+                existing = await self.collection.find_one({"idempotencyKey": idempotency_key})
+                if existing is None:
+                    continue  # expired in between; try again
+                if existing["status"] not in (FAILED, CANCELLED):
+                    return existing, False
+                # A failed or cancelled attempt shouldn't block a retry: release its key
+                await self.collection.update_one(
+                    {"_id": existing["_id"], "idempotencyKey": idempotency_key},
+                    {"$unset": {"idempotencyKey": ""}},
+                )
+        raise RuntimeError("Could not register job")
+
+    async def get(self, job_id: str):
+        return await self.collection.find_one({"_id": job_id})
+
+    async def claim(self, worker_id: str, kinds: list, lease_s: float):
+        now = datetime.now()
+        return await self.collection.find_one_and_update(
+            {
+                "kind": {"$in": kinds},
+                "$or": [
+                    {"status": QUEUED, "availableAt": {"$lte": now}},
+                    # Lease ran out: the worker holding it died
+                    {"status": RUNNING, "leaseUntil": {"$lt": now}},
+                ],
+            },
+            {
+                "$set": {
+                    "status": RUNNING,
+                    "workerId": worker_id,
+                    "leaseUntil": now + timedelta(seconds=lease_s),
+                    "startedAt": now,
+                    "progress": {"stage": "started"},
+                    "partial": "",  # a reclaimed job starts its output over
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("availableAt", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def heartbeat(self, job_id: str, worker_id: str, lease_s: float) -> str:
+        """Extends the lease; returns LEASE_HELD, CANCEL_REQUESTED or LEASE_LOST."""
+        job = await self.collection.find_one_and_update(
+            {"_id": job_id, "workerId": worker_id, "status": RUNNING},
+            {"$set": {"leaseUntil": datetime.now() + timedelta(seconds=lease_s)}},
+            projection={"cancelRequested": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        if job is None:
+            # Reclaimed by another worker, finished, or gone
+            return LEASE_LOST
+        return CANCEL_REQUESTED if job.get("cancelRequested") else LEASE_HELD
+
+    # Worker writes only land while `worker_id` still holds the job, so a
+    # worker whose lease lapsed can't overwrite the new owner's run
+    async def update_progress(self, job_id: str, worker_id: str, progress: dict, partial: str = None):
+        update = {"progress": progress}
+        if partial is not None:
+            update["partial"] = partial
+        await self.collection.update_one(
+            {"_id": job_id, "workerId": worker_id, "status": RUNNING}, {"$set": update}
+        )
+
+    async def finish(self, job_id: str, worker_id: str, status: str, result=None, error: str = None):
+        now = datetime.now()
+        await self.collection.update_one({"_id": job_id, "workerId": worker_id, "status": RUNNING}, {"$set": {
+            "status": status,
+            "result": result,
+            "error": error,
+            "progress": {"stage": status},
+            "finishedAt": now,
+            "expiresAt": now + timedelta(seconds=self.result_ttl_s),
+        }})
+
+    async def requeue(self, job_id: str, worker_id: str, delay_s: float = 0.0):
+        await self.collection.update_one({"_id": job_id, "workerId": worker_id, "status": RUNNING}, {
+            "$set": {"status": QUEUED, "availableAt": datetime.now() + timedelta(seconds=delay_s),
+                     "progress": {"stage": QUEUED}},
+            "$unset": {"workerId": "", "leaseUntil": ""},
+        })
+
+    async def cancel(self, job_id: str):
+        job = await self.collection.find_one_and_update(
+            {"_id": job_id, "status": QUEUED},
+            {"$set": {"status": CANCELLED, "progress": {"stage": CANCELLED}, "finishedAt": datetime.now(),
+                      "expiresAt": datetime.now() + timedelta(seconds=self.result_ttl_s)}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if job:
+            return job
+        # Running: the worker notices on its next heartbeat
+        return await self.collection.find_one_and_update(
+            {"_id": job_id, "status": RUNNING},
+            {"$set": {"cancelRequested": True}},
+            return_document=ReturnDocument.AFTER,
+        ) or await self.get(job_id)
+
+
+class MemoryJobStore:
+    """Single-process stand-in with the same semantics, for dev and tests."""
+
+    def __init__(self, result_ttl_s: int = 3600):
+        self.result_ttl_s = result_ttl_s
+        self.jobs = {}
+        self.keys = {}
+
+    async def ensure_indexes(self):
+        pass
+
+    def _purge(self):
+        now = datetime.now()
+        for job_id in [j for j, job in self.jobs.items() if job.get("expiresAt") and job["expiresAt"] <= now]:
+            job = self.jobs.pop(job_id)
+            if self.keys.get(job.get("idempotencyKey")) == job_id:
+                self.keys.pop(job["idempotencyKey"])
+
+    async def create(self, kind: str, payload: dict, idempotency_key: str):
+        self._purge()
+        existing = self.jobs.get(self.keys.get(idempotency_key))
+        if existing and existing["status"] not in (FAILED, CANCELLED):
+            return dict(existing), False
+        job = _new_job(kind, payload, idempotency_key)
+        self.jobs[job["_id"]] = job
+        self.keys[idempotency_key] = job["_id"]
+        return dict(job), True
+
+    async def get(self, job_id: str):
+        self._purge()
+        job = self.jobs.get(job_id)
+        return dict(job) if job else None
+
+    async def claim(self, worker_id: str, kinds: list, lease_s: float):
+        now = datetime.now()
+        ready = [
+            job for job in self.jobs.values()
+            if job["kind"] in kinds and (
+                (job["status"] == QUEUED and job["availableAt"] <= now)
+                or (job["status"] == RUNNING and job["leaseUntil"] < now)
+            )
+        ]
+        if not ready:
+            return None
+        job = min(ready, key=lambda j: j["availableAt"])
+        job.update(status=RUNNING, workerId=worker_id, leaseUntil=now + timedelta(seconds=lease_s),
+                   startedAt=now, progress={"stage": "started"}, partial="", attempts=job["attempts"] + 1)
+        return dict(job)
+
+    def _held(self, job_id: str, worker_id: str):
+        job = self.jobs.get(job_id)
+        return job if job and job.get("workerId") == worker_id and job["status"] == RUNNING else None
+
+    def _finish(self, job: dict, status: str, result=None, error: str = None):
+        now = datetime.now()
+        job.update(status=status, result=result, error=error, progress={"stage": status},
+                   finishedAt=now, expiresAt=now + timedelta(seconds=self.result_ttl_s))
+
+    async def heartbeat(self, job_id: str, worker_id: str, lease_s: float) -> str:
+        job = self._held(job_id, worker_id)
+        if not job:
+            return LEASE_LOST
+        job["leaseUntil"] = datetime.now() + timedelta(seconds=lease_s)
+        return CANCEL_REQUESTED if job["cancelRequested"] else LEASE_HELD
+
+    async def update_progress(self, job_id: str, worker_id: str, progress: dict, partial: str = None):
+        job = self._held(job_id, worker_id)
+        if job:
+            job["progress"] = progress
+            if partial is not None:
+                job["partial"] = partial
+
+    async def finish(self, job_id: str, worker_id: str, status: str, result=None, error: str = None):
+        job = self._held(job_id, worker_id)
+        if job:
+            self._finish(job, status, result, error)
+
+    async def requeue(self, job_id: str, worker_id: str, delay_s: float = 0.0):
+        job = self._held(job_id, worker_id)
+        if job:
+            job.update(status=QUEUED, availableAt=datetime.now() + timedelta(seconds=delay_s),
+                       progress={"stage": QUEUED}, workerId=None, leaseUntil=None)
+
+    async def cancel(self, job_id: str):
+        job = self.jobs.get(job_id)
+        if not job:
+            return None
+        if job["status"] == QUEUED:
+            self._finish(job, CANCELLED)
+        elif job["status"] == RUNNING:
+            job["cancelRequested"] = True
+        return dict(job)
+
+
+def create_job_store(db=None):
+    ttl_s = int(os.getenv("JOB_RESULT_TTL_S", "3600"))
+    if db is None or os.getenv("JOB_STORE") == "memory":
+        return MemoryJobStore(ttl_s)
+    return MongoJobStore(db["jobs"], ttl_s)
+
+
+# ----------------- WORKERS -----------------
+class JobReporter:
+    """Handed to job handlers to publish stage changes and partial output."""
+
+    def __init__(self, store, job_id: str, worker_id: str, interval_s: float = 0.5):
+        self.store = store
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.interval_s = interval_s
+        self.stage = "started"
+        self.partial = ""
+        self._last_write = 0.0
+
+    async def update(self, stage: str = None, partial: str = None, **details):
+        if stage:
+            self.stage = stage
+        if partial is not None:
+            self.partial = partial
+        # Stage changes are written immediately; partial text at most every interval
+        if stage is None and time.monotonic() - self._last_write < self.interval_s:
+            return
+        self._last_write = time.monotonic()
+        await self.store.update_progress(
+            self.job_id, self.worker_id, {"stage": self.stage, "chars": len(self.partial), **details}, self.partial
+        )
+
+
+class JobWorkerPool:
+    def __init__(self, store, concurrency: int = 2, lease_s: float = 60.0, poll_interval_s: float = 0.5,
+                 max_attempts: int = 3, handlers: dict = None):
+        self.store = store
+        self.concurrency = concurrency
+        self.lease_s = lease_s
+        self.poll_interval_s = poll_interval_s
+        self.max_attempts = max_attempts
+        self.handlers = JOB_HANDLERS if handlers is None else handlers
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._wakeup = asyncio.Event()
+        self._closed = False
+        self._loops = []
+        self._running = {}  # job id -> handler task
+        self.counters = {"claimed": 0, "succeeded": 0, "failed": 0, "cancelled": 0, "requeued": 0, "lease_lost": 0}
+
+    @classmethod
+    def from_env(cls, store):
+        return cls(
+            store,
+            concurrency=int(os.getenv("JOB_WORKERS", "2")),
+            lease_s=float(os.getenv("JOB_LEASE_S", "60")),
+            poll_interval_s=float(os.getenv("JOB_POLL_INTERVAL_MS", "500")) / 1000,
+            max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "3")),
+        )
+
+    def start(self):
+        for _ in range(self.concurrency):
+            self._loops.append(asyncio.create_task(self._loop()))
+
+    def notify(self):
+        """Wake idle workers now instead of on the next poll."""
+        self._wakeup.set()
+
+    async def _loop(self):
+        while not self._closed:
+            try:
+                job = await self.store.claim(self.worker_id, list(self.handlers), self.lease_s)
+            except Exception as e:
+                logger.warning("[⚠️ JOBS] Claim failed: %s", e)
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval_s)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+            try:
+                await self._execute(job)
+            except Exception as e:
+                # Heartbeat / finish / requeue hit a store error: the job's lease
+                # lapses and another claim picks it up; this worker carries on
+                logger.error("[❌ JOBS] %s job %s: store error, leaving it to its lease: %s",
+                             job.get("kind"), job.get("_id"), e)
+
+    async def _execute(self, job: dict):
+        job_id = job["_id"]
+        self.counters["claimed"] += 1
+        if job["attempts"] > self.max_attempts:
+            await self.store.finish(job_id, self.worker_id, FAILED,
+                                    error=f"Gave up after {self.max_attempts} attempts")
+            self.counters["failed"] += 1
+            return
+
+        handler, _ = self.handlers[job["kind"]]
+        task = asyncio.create_task(handler(job["payload"], JobReporter(self.store, job_id, self.worker_id)))
+        self._running[job_id] = task
+        lease = LEASE_HELD
+        # The heartbeat renews the lease and is also how fast a cancel is noticed
+        heartbeat_s = min(self.lease_s / 3, 2.0)
+        try:
+            while not task.done():
+                await asyncio.wait({task}, timeout=heartbeat_s)
+                if not task.done():
+                    lease = await self.store.heartbeat(job_id, self.worker_id, self.lease_s)
+                    if lease != LEASE_HELD:
+                        task.cancel()
+                        await asyncio.wait({task})
+            if lease == LEASE_LOST:
+                # Another worker may own the job now: drop it without writing
+                logger.warning("[⚠️ JOBS] %s job %s: lease lost, abandoning it", job["kind"], job_id)
+                self.counters["lease_lost"] += 1
+                return
+            if task.cancelled():
+                if lease == CANCEL_REQUESTED:
+                    await self.store.finish(job_id, self.worker_id, CANCELLED)
+                    self.counters["cancelled"] += 1
+                else:
+                    # Pool shutting down: hand the job back for another worker
+                    await self.store.requeue(job_id, self.worker_id)
+                    self.counters["requeued"] += 1
+                return
+            error = task.exception()
+            if error is None:
+                await self.store.finish(job_id, self.worker_id, SUCCEEDED, result=task.result())
+                self.counters["succeeded"] += 1
+            elif isinstance(error, SchedulerSaturated):
+                # LLM lanes are full; try again shortly rather than failing the job
+                await self.store.requeue(job_id, self.worker_id, delay_s=2.0)
+                self.counters["requeued"] += 1
+            else:
+                logger.error("[❌ JOBS] %s job %s failed: %s", job['kind'], job_id, error)
+                await self.store.finish(job_id, self.worker_id, FAILED, error=str(error))
+                self.counters["failed"] += 1
+        finally:
+            if not task.done():
+                # Left early on an error: don't keep running a job this worker no longer tracks
+                task.cancel()
+            self._running.pop(job_id, None)
+
+    async def close(self, timeout_s: float = 10.0):
+        """Stop claiming; give running jobs `timeout_s`, then requeue them."""
+        self._closed = True
+        self._wakeup.set()
+        if self._running:
+            await asyncio.wait(list(self._running.values()), timeout=timeout_s)
+        for task in list(self._running.values()):
+            task.cancel()
+        if self._loops:
+            await asyncio.gather(*self._loops, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {**self.counters, "running": len(self._running), "concurrency": self.concurrency,
+                "worker_id": self.worker_id}
+
+
+# ----------------- ROUTES -----------------
+router = APIRouter()
+
+
+def _store():
+    if GlobalState.job_store is None:
+        raise HTTPException(status_code=503, detail="Job queue not initialized")
+    return GlobalState.job_store
+
+
+@router.post("/api/jobs", status_code=202)
+async def submit_job(payload: dict, idempotency_key: str = Header(None)):
+    kind = payload.get("kind")
+    job_payload = payload.get("payload") or {}
+    if kind not in JOB_HANDLERS:
+        raise HTTPException(status_code=400, detail=f"Unknown job kind: {kind}")
+    missing = [field for field in JOB_HANDLERS[kind][1] if not job_payload.get(field)]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Missing {', '.join(missing)}")
+
+    # Without an explicit key, a retried identical submission maps to the same job
+    key = idempotency_key or payload.get("idempotencyKey") or default_idempotency_key(kind, job_payload)
+    job, created = await _store().create(kind, job_payload, key)
+    if created and GlobalState.job_pool:
+        GlobalState.job_pool.notify()
+    return {"jobId": job["_id"], "status": job["status"], "deduplicated": not created}
+
+
+@router.get("/api/jobs/stats")
+async def job_stats():
+    return GlobalState.job_pool.stats() if GlobalState.job_pool else {"workers": 0}
+
+
+@router.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await _store().get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return public_view(job)
+
+
+@router.delete("/api/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    job = await _store().cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return {"jobId": job_id, "status": job["status"], "cancelRequested": job.get("cancelRequested", False)}
+
+
+@router.get("/api/jobs/{job_id}/stream")
+async def stream_job(job_id: str):
+    store = _store()
+    if not await store.get(job_id):
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    poll_s = float(os.getenv("JOB_STREAM_POLL_MS", "500")) / 1000
+
+    async def events():
+        sent, last_progress = 0, None
+        while True:
+            job = await store.get(job_id)
+            if job is None:
+                yield sse_event("error", {"detail": "Job expired"})
+                return
+            partial = job.get("partial") or ""
+            if len(partial) > sent:
+                # Only the new text; the client appends like a token stream
+                yield sse_event("token", {"text": partial[sent:]})
+                sent = len(partial)
+            if job["progress"] != last_progress:
+                last_progress = job["progress"]
+                yield sse_event("progress", last_progress)
+            if job["status"] in FINISHED:
+                yield sse_event("done", public_view(job))
+                return
+            await asyncio.sleep(poll_s)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
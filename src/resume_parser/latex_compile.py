@@ -0,0 +1,327 @@
+# latex_compile.py
+# In-backend LaTeX -> PDF compilation, so a preview no longer needs a round
+# trip through the Jenkins pipeline. Compiles run as bounded, sandboxed
+# subprocesses (no shell escape, kpathsea file access confined to the job's
+# scratch directory, CPU / memory / output rlimits, one deadline per job).
+# Output is cached by a hash of engine + source: in memory, then in Mongo +
+# GridFS, and concurrent requests for the same source share one compile, so
+# identical resumes are compiled once.
+import asyncio
+import hashlib
+import os
+import re
+import shutil
+import signal
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
+
+from parse_cache import LRUCache
+from telemetry import cache_event, get_logger, span
+
+logger = get_logger("latex")
+
+COMPILED_BUCKET = "compiled_resume_files"
+JOB_NAME = "resume"
+_RERUN_RE = re.compile(r"Rerun to get|Label\(s\) may have changed")
+
+# Sets the rlimits in a fresh interpreter and execs the engine in its place.
+# preexec_fn would do the same between fork and exec, but it isn't safe in a
+# process that runs threads (the parse and publish pools, asyncio.to_thread).
+_RLIMIT_LAUNCHER = """
+import os, resource, sys
+cpu, memory, output = map(int, sys.argv[1:4])
+resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu))
+resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+resource.setrlimit(resource.RLIMIT_FSIZE, (output, output))
+os.execvp(sys.argv[4], sys.argv[4:])
+"""
+
+
+class CompilerUnavailable(Exception):
+    """No LaTeX engine on this host (or it failed its version probe)."""
+
+
+class CompilePoolSaturated(Exception):
+    """Raised when the compile queue is full and the caller should back off."""
+
+
+class CompileTimeout(Exception):
+    """The job overran LATEX_TIMEOUT_S and its process group was killed."""
+
+
+class LatexSourceTooLarge(Exception):
+    pass
+
+
+class _LeaderCancelled(Exception):
+    """The request compiling a source was cancelled; requests waiting on it retry."""
+
+
+class CompileFailed(Exception):
+    """LaTeX exited with an error; `log` holds the relevant lines of its log."""
+
+    def __init__(self, message: str, log: str = ""):
+        super().__init__(message)
+        self.log = log
+
+
+def _error_excerpt(log: str, max_lines: int = 20) -> str:
+    # TeX errors start with "!"; the next lines carry the offending input line
+    lines = log.splitlines()
+    picked = []
+    for i, line in enumerate(lines):
+        if line.startswith("!"):
+            picked.extend(lines[i:i + 3])
+        if len(picked) >= max_lines:
+            break
+    return "\n".join(picked[:max_lines]) or "\n".join(lines[-max_lines:])
+
+
+class LatexCompiler:
+    def __init__(self, compiled=None, files=None, engine: str = "pdflatex", max_concurrency: int = 2,
+                 max_pending: int = None, timeout_s: float = 20.0, max_passes: int = 3, max_memory_mb: int = 1024,
+                 max_output_mb: int = 50, max_source_kb: int = 512, cache_size: int = 64, work_dir: str = None):
+        self.compiled = compiled  # Mongo collection of compiled PDFs (metadata); None = memory only
+        self.files = files        # ResumeFileStore on the COMPILED_BUCKET
+        self.engine = engine
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending or max_concurrency * 8
+        self.timeout_s = timeout_s
+        self.max_passes = max_passes
+        self.max_memory_mb = max_memory_mb
+        self.max_output_mb = max_output_mb
+        self.max_source_bytes = max_source_kb * 1024
+        self.work_dir = work_dir
+        self.lru = LRUCache(cache_size)
+        self.engine_version = None
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._pending = 0
+        self._inflight = {}  # digest -> future of the compile everyone for that digest awaits
+
+    @classmethod
+    def from_env(cls, compiled=None, files=None):
+        max_pending = os.getenv("LATEX_QUEUE_MAX")
+        return cls(
+            compiled, files,
+            engine=os.getenv("LATEX_ENGINE", "pdflatex"),
+            max_concurrency=int(os.getenv("LATEX_MAX_CONCURRENCY", "2")),
+            max_pending=int(max_pending) if max_pending else None,
+            timeout_s=float(os.getenv("LATEX_TIMEOUT_S", "20")),
+            max_passes=int(os.getenv("LATEX_MAX_PASSES", "3")),
+            max_memory_mb=int(os.getenv("LATEX_MAX_MEMORY_MB", "1024")),
+            max_output_mb=int(os.getenv("LATEX_MAX_OUTPUT_MB", "50")),
+            max_source_kb=int(os.getenv("LATEX_MAX_SOURCE_KB", "512")),
+            cache_size=int(os.getenv("LATEX_CACHE_SIZE", "64")),
+            work_dir=os.getenv("LATEX_WORK_DIR") or None,
+        )
+
+    async def ensure_indexes(self):
+        if self.compiled is not None:
+            await self.compiled.create_index([("contentHash", ASCENDING)], unique=True, name="contentHash_unique")
+
+    async def probe(self):
+        """Check the engine runs; its version goes into the cache key, so a TeX upgrade recompiles."""
+        path = shutil.which(self.engine)
+        if not path:
+            raise CompilerUnavailable(f"LaTeX engine {self.engine!r} not found on PATH")
+        process = await asyncio.create_subprocess_exec(
+            path, "--version", stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL,
+        )
+        out, _ = await process.communicate()
+        if process.returncode != 0:
+            raise CompilerUnavailable(f"{self.engine} --version exited with {process.returncode}")
+        self.engine_version = out.decode("utf-8", "replace").splitlines()[0].strip()
+        logger.info("[✅ LATEX] %s (%s concurrent)", self.engine_version, self.max_concurrency)
+
+    def source_hash(self, tex: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(f"{self.engine}|{self.engine_version}\n".encode("utf-8"))
+        digest.update(tex.encode("utf-8"))
+        return digest.hexdigest()
+
+    # ----------------- CACHE -----------------
+    async def lookup(self, digest: str):
+        pdf = self.lru.get(digest)
+        if pdf is not None:
+            cache_event("latex", "memory_hits")
+            return pdf
+        if self.compiled is not None:
+            doc = await self.compiled.find_one({"contentHash": digest}, {"fileId": 1})
+            grid_out = await self.files.open(doc["fileId"]) if doc else None
+            if grid_out is not None:
+                try:
+                    pdf = await grid_out.read()
+                finally:
+                    await grid_out.close()
+                cache_event("latex", "mongo_hits")
+                self.lru.put(digest, pdf)
+                return pdf
+        cache_event("latex", "misses")
+        return None
+
+    async def _store(self, digest: str, pdf: bytes):
+        self.lru.put(digest, pdf)
+        if self.compiled is None:
+            return
+        file_id = await self.files.put(digest, pdf, filename=f"{digest}.pdf")
+        try:
+            await self.compiled.insert_one({
+                "contentHash": digest,
+                "fileId": file_id,
+                "size": len(pdf),
+                "engine": self.engine_version,
+                "createdAt": datetime.now(),
+            })
+        except DuplicateKeyError:
+            # Compiled concurrently by another worker process; keep the first copy
+            await self.files.delete(file_id)
+
+    # ----------------- COMPILE -----------------
+    def check_size(self, tex: str):
+        if len(tex.encode("utf-8")) > self.max_source_bytes:
+            raise LatexSourceTooLarge(f"LaTeX source exceeds {self.max_source_bytes // 1024} KB")
+
+    async def compile(self, tex: str):
+        """(digest, pdf bytes, cache tier or None) for `tex`, compiling only on a miss."""
+        if self.engine_version is None:
+            raise CompilerUnavailable("LaTeX compiler not initialized")
+        self.check_size(tex)
+
+        digest = self.source_hash(tex)
+        pdf = self.lru.get(digest)
+        if pdf is not None:
+            cache_event("latex", "memory_hits")
+            return digest, pdf, "memory"
+
+        inflight = self._inflight.get(digest)
+        while inflight is not None:
+            # Same source already compiling for another request: wait for that result
+            cache_event("latex", "coalesced")
+            try:
+                return digest, await asyncio.shield(inflight), "inflight"
+            except _LeaderCancelled:
+                # That request went away mid-compile; the first waiter back takes over
+                inflight = self._inflight.get(digest)
+
+        if self._pending >= self.max_pending:
+            raise CompilePoolSaturated(f"{self._pending} LaTeX compiles already queued")
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[digest] = future
+        self._pending += 1
+        try:
+            pdf = await self.lookup(digest)
+            tier = "mongo" if pdf is not None else None
+            if pdf is None:
+                async with self._slots:
+                    with span("latex_compile"):
+                        pdf = await self._compile(tex)
+                await self._store(digest, pdf)
+            future.set_result(pdf)
+            return digest, pdf, tier
+        except BaseException as e:
+            future.set_exception(e if isinstance(e, Exception) else _LeaderCancelled())
+            future.exception()  # retrieved here, so an unawaited future doesn't warn
+            raise
+        finally:
+            self._pending -= 1
+            del self._inflight[digest]
+
+    async def _compile(self, tex: str) -> bytes:
+        deadline = time.monotonic() + self.timeout_s
+        with tempfile.TemporaryDirectory(prefix="latex-", dir=self.work_dir) as workdir:
+            with open(os.path.join(workdir, f"{JOB_NAME}.tex"), "w", encoding="utf-8") as f:
+                f.write(tex)
+
+            # Cross-references and page totals settle over passes; stop once the log stops asking
+            for _ in range(self.max_passes):
+                returncode = await self._run_pass(workdir, deadline)
+                log = self._read(workdir, "log")
+                if returncode != 0:
+                    raise CompileFailed("LaTeX compilation failed", _error_excerpt(log))
+                if not _RERUN_RE.search(log):
+                    break
+
+            pdf_path = os.path.join(workdir, f"{JOB_NAME}.pdf")
+            if not os.path.exists(pdf_path):
+                raise CompileFailed("LaTeX produced no PDF (empty document?)", _error_excerpt(log))
+            with open(pdf_path, "rb") as f:
+                return f.read()
+
+    async def _run_pass(self, workdir: str, deadline: float) -> int:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise CompileTimeout(f"LaTeX compile exceeded {self.timeout_s:g}s")
+        process = await asyncio.create_subprocess_exec(
+            *self._limits_prefix(),
+            self.engine, "-interaction=nonstopmode", "-halt-on-error", "-no-shell-escape",
+            "-file-line-error", f"{JOB_NAME}.tex",
+            cwd=workdir,
+            env=self._sandbox_env(workdir),
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
+            start_new_session=True,  # own process group, so a kill takes any children with it
+        )
+        try:
+            return await asyncio.wait_for(process.wait(), remaining)
+        except asyncio.TimeoutError:
+            self._kill(process)
+            await process.wait()
+            raise CompileTimeout(f"LaTeX compile exceeded {self.timeout_s:g}s")
+        except BaseException:
+            # Request cancelled (client went away): don't leave TeX running
+            self._kill(process)
+            raise
+
+    @staticmethod
+    def _kill(process):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    def _sandbox_env(self, workdir: str) -> dict:
+        return {
+            "PATH": os.environ.get("PATH", "/usr/bin:/bin"),
+            "HOME": workdir,
+            "TMPDIR": workdir,
+            "LANG": "C.UTF-8",
+            # kpathsea: no \write18, and no reading or writing dotfiles, parent
+            # directories or absolute paths outside the job directory
+            "shell_escape": "f",
+            "openin_any": "p",
+            "openout_any": "p",
+            "TEXMFOUTPUT": workdir,
+            # Fixed timestamps, so the same source always yields the same PDF bytes
+            "SOURCE_DATE_EPOCH": "0",
+            "FORCE_SOURCE_DATE": "1",
+        }
+
+    def _limits_prefix(self) -> list:
+        # argv that applies the CPU / memory / output rlimits, then execs the engine
+        cpu_s = int(self.timeout_s) + 1
+        memory = self.max_memory_mb * 1024 * 1024
+        output = self.max_output_mb * 1024 * 1024
+        return [sys.executable, "-I", "-S", "-c", _RLIMIT_LAUNCHER, str(cpu_s), str(memory), str(output)]
+
+    @staticmethod
+    def _read(workdir: str, ext: str) -> str:
+        try:
+            with open(os.path.join(workdir, f"{JOB_NAME}.{ext}"), encoding="utf-8", errors="replace") as f:
+                return f.read()
+        except FileNotFoundError:
+            return ""
+
+    def stats(self) -> dict:
+        return {
+            "engine": self.engine_version,
+            "maxConcurrency": self.max_concurrency,
+            "pending": self._pending,
+            "inflight": len(self._inflight),
+            "cached": len(self.lru),
+        }
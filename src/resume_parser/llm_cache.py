@@ -0,0 +1,251 @@
+# llm_cache.py
+# Response cache for LLM chains. Keys hash the normalized chain inputs
+# (resume text, job text, retrieved context...) together with the model and
+# prompt version, so a prompt change or model switch never serves stale
+# output. Two tiers: an in-process LRU and a Mongo collection with TTL expiry.
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+from datetime import datetime, timedelta
+
+from pymongo import ASCENDING
+
+from global_state import GlobalState
+from llm_registry import registry
+from llm_scheduler import Priority, run_chain, stream_chain
+from parse_cache import LRUCache
+from sse import chunk_text
+from telemetry import cache_event, get_logger
+
+logger = get_logger("llm_cache")
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(value):
+    if isinstance(value, str):
+        return _WHITESPACE_RE.sub(" ", value).strip()
+    return value
+
+
+def cache_key(chain_key: tuple, inputs: dict) -> str:
+    # chain_key is ChainRegistry.key_for(): (model, temperature, prompt, prompt version)
+    payload = {
+        "chain": list(chain_key),
+        "inputs": {k: normalize_text(v) for k, v in inputs.items()},
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class _LeaderCancelled(Exception):
+    """The request computing a key was cancelled; requests waiting on it retry."""
+
+
+class CacheMode:
+    USE = "use"          # read, and write on miss
+    REFRESH = "refresh"  # skip the read, overwrite with a fresh result
+    BYPASS = "bypass"    # neither read nor write
+
+    @staticmethod
+    def from_payload(payload: dict) -> str:
+        if payload.get("noCache"):
+            return CacheMode.BYPASS
+        if payload.get("refreshCache"):
+            return CacheMode.REFRESH
+        return CacheMode.USE
+
+
+class LLMCache:
+    def __init__(self, collection=None, max_entries: int = 512, ttl_s: int = 7 * 24 * 3600):
+        self.collection = collection
+        self.ttl_s = ttl_s
+        self.lru = LRUCache(max_entries)
+        self._inflight = {}
+        self.counters = {
+            "memory_hits": 0,
+            "mongo_hits": 0,
+            "misses": 0,
+            "bypassed": 0,
+            "refreshed": 0,
+            "writes": 0,
+            "coalesced": 0,
+        }
+
+    def _count(self, event: str):
+        self.counters[event] += 1
+        cache_event("llm", event)
+
+    @classmethod
+    def from_env(cls, collection=None):
+        return cls(
+            collection,
+            max_entries=int(os.getenv("LLM_CACHE_SIZE", "512")),
+            ttl_s=int(os.getenv("LLM_CACHE_TTL_S", str(7 * 24 * 3600))),
+        )
+
+    async def ensure_indexes(self):
+        if self.collection is not None:
+            await self.collection.create_index([("expiresAt", ASCENDING)], expireAfterSeconds=0, name="expiresAt_ttl")
+
+    async def get(self, key: str):
+        entry = self.lru.get(key)
+        if entry and entry[1] > time.time():
+            self._count("memory_hits")
+            return entry[0]
+
+        if self.collection is not None:
+            try:
+                # TTL monitor only runs once a minute, so filter expired rows ourselves
+                doc = await self.collection.find_one(
+                    {"_id": key, "expiresAt": {"$gt": datetime.now()}},
+                    {"text": 1, "expiresAt": 1},
+                )
+            except Exception as e:
+                logger.warning("[⚠️ LLM CACHE] Mongo read failed: %s", e)
+                doc = None
+            if doc:
+                self._count("mongo_hits")
+                self.lru.put(key, (doc["text"], doc["expiresAt"].timestamp()))
+                return doc["text"]
+
+        self._count("misses")
+        return None
+
+    async def put(self, key: str, text: str, chain_key: tuple):
+        expires_at = datetime.now() + timedelta(seconds=self.ttl_s)
+        self.lru.put(key, (text, expires_at.timestamp()))
+        self._count("writes")
+        if self.collection is None:
+            return
+        try:
+            await self.collection.replace_one(
+                {"_id": key},
+                {
+                    "text": text,
+                    "model": chain_key[0],
+                    "prompt": chain_key[2],
+                    "promptVersion": chain_key[3],
+                    "createdAt": datetime.now(),
+                    "expiresAt": expires_at,
+                },
+                upsert=True,
+            )
+        except Exception as e:
+            logger.warning("[⚠️ LLM CACHE] Mongo write failed: %s", e)
+
+    async def lookup(self, key: str, mode: str):
+        """Cache read that honours the request's cache mode."""
+        if mode == CacheMode.BYPASS:
+            self._count("bypassed")
+            return None
+        if mode == CacheMode.REFRESH:
+            self._count("refreshed")
+            return None
+        return await self.get(key)
+
+    async def store(self, key: str, text: str, chain_key: tuple, mode: str):
+        if mode != CacheMode.BYPASS:
+            await self.put(key, text, chain_key)
+
+    async def get_or_compute(self, key: str, compute, chain_key: tuple, mode: str = CacheMode.USE):
+        """
+        Returns (text, hit). `compute` is an async callable producing the text.
+        Identical concurrent misses share one computation.
+        """
+        text = await self.lookup(key, mode)
+        if text is not None:
+            return text, True
+        if mode == CacheMode.BYPASS:
+            return await compute(), False
+        if mode == CacheMode.USE and key in self._inflight:
+            self._count("coalesced")
+            try:
+                return await asyncio.shield(self._inflight[key]), False
+            except _LeaderCancelled:
+                # The request computing it went away; start over (the first one back computes)
+                return await self.get_or_compute(key, compute, chain_key, mode)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            text = await compute()
+            await self.put(key, text, chain_key)
+            future.set_result(text)
+            return text, False
+        except asyncio.CancelledError:
+            # Not future.cancel(): waiters would take this cancellation as their own
+            future.set_exception(_LeaderCancelled())
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody else may be waiting; don't leave "exception never retrieved" noise
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        lookups = self.counters["memory_hits"] + self.counters["mongo_hits"] + self.counters["misses"]
+        hits = self.counters["memory_hits"] + self.counters["mongo_hits"]
+        return {
+            **self.counters,
+            "entries_in_memory": len(self.lru),
+            "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+def get_llm_cache() -> LLMCache:
+    # Memory-only until init_services attaches the Mongo tier
+    if GlobalState.llm_cache is None:
+        GlobalState.llm_cache = LLMCache.from_env()
+    return GlobalState.llm_cache
+
+
+def message_text(result) -> str:
+    return result.content if hasattr(result, "content") else str(result)
+
+
+async def cached_result(name: str, inputs: dict):
+    """Cached text for these chain inputs, or None. Never calls the LLM."""
+    return await get_llm_cache().get(cache_key(registry.key_for(name), inputs))
+
+
+async def cached_run_chain(name: str, inputs: dict, mode: str = CacheMode.USE,
+                           priority: Priority = Priority.STANDARD):
+    """run_chain() behind the response cache. Returns (AIMessage, hit)."""
+    from langchain_core.messages import AIMessage  # deferred: langchain_core is slow to import
+    chain_key = registry.key_for(name)
+
+    async def compute():
+        return message_text(await run_chain(name, inputs, priority=priority))
+
+    text, hit = await get_llm_cache().get_or_compute(cache_key(chain_key, inputs), compute, chain_key, mode)
+    return AIMessage(content=text), hit
+
+
+async def cached_stream_chain(name: str, inputs: dict, mode: str = CacheMode.USE,
+                              priority: Priority = Priority.INTERACTIVE):
+    """
+    stream_chain() behind the response cache. Yields (text, hit) pieces; a hit
+    arrives as a single piece, a miss streams and is cached once complete.
+    """
+    cache = get_llm_cache()
+    chain_key = registry.key_for(name)
+    key = cache_key(chain_key, inputs)
+
+    cached = await cache.lookup(key, mode)
+    if cached is not None:
+        yield cached, True
+        return
+
+    parts = []
+    async for chunk in stream_chain(name, inputs, priority=priority):
+        text = chunk_text(chunk)
+        if text:
+            parts.append(text)
+            yield text, False
+    await cache.store(key, "".join(parts), chain_key, mode)
@@ -0,0 +1,94 @@
+# llm_registry.py
+# Builds every prompt | LLM chain once and hands out the same instances on
+# each request, so Gemini clients (and their HTTP/gRPC connections) are
+# reused instead of being recreated per call.
+import os
+import threading
+
+from prompts import build_prompt, prompt_version
+
+DEFAULT_MODEL = "gemini-2.0-flash"
+
+# chain name -> (prompt name, temperature)
+CHAIN_SPECS = {
+    "feedback": ("feedback", 0.7),
+    "role": ("role", 0.2),
+    "improve": ("improve", 0.65),
+    "rewrite": ("rewrite", 0.65),
+    "section_feedback": ("section_feedback", 0.7),
+}
+
+
+class ChainRegistry:
+    def __init__(self, model: str = None, llm_factory=None):
+        self._model = model
+        self.llm_factory = llm_factory
+        self._llms = {}    # (model, temperature) -> shared chat model
+        self._chains = {}  # (model, temperature, prompt, prompt version) -> chain
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _gemini(model: str, temperature: float):
+        # Imported on first use: langchain_google_genai alone is over a second of import time
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        return ChatGoogleGenerativeAI(
+            model=model,
+            temperature=temperature,
+            convert_system_message_to_human=True,
+            google_api_key=os.getenv("GOOGLE_GEMINI_API_KEY")
+        )
+
+    def _factory(self):
+        if self.llm_factory:
+            return self.llm_factory
+        # LLM_BACKEND=fake swaps Gemini for the local stand-in (benchmarks, offline dev)
+        if os.getenv("LLM_BACKEND") == "fake":
+            from fake_llm import fake_llm_from_env
+            return fake_llm_from_env
+        return self._gemini
+
+    def llm(self, model: str, temperature: float):
+        key = (model, temperature)
+        with self._lock:
+            if key not in self._llms:
+                self._llms[key] = self._factory()(model, temperature)
+            return self._llms[key]
+
+    @property
+    def model(self) -> str:
+        # Resolved lazily so GEMINI_MODEL from .env is seen even if loaded after import
+        return self._model or os.getenv("GEMINI_MODEL", DEFAULT_MODEL)
+
+    def key_for(self, name: str):
+        prompt_name, temperature = CHAIN_SPECS[name]
+        return (self.model, temperature, prompt_name, prompt_version(prompt_name))
+
+    def get(self, name: str):
+        key = self.key_for(name)
+        chain = self._chains.get(key)
+        if chain is not None:
+            return chain
+
+        model, temperature, prompt_name, _ = key
+        llm = self.llm(model, temperature)
+        with self._lock:
+            if key not in self._chains:
+                self._chains[key] = build_prompt(prompt_name) | llm
+            return self._chains[key]
+
+    def warm(self):
+        for name in CHAIN_SPECS:
+            self.get(name)
+        return len(self._chains)
+
+    def clear(self):
+        with self._lock:
+            self._llms.clear()
+            self._chains.clear()
+
+
+registry = ChainRegistry()
+
+
+def get_chain(name: str):
+    return registry.get(name)
@@ -0,0 +1,351 @@
+# llm_scheduler.py
+# Central admission control for every LLM chain call: per-model concurrency
+# with priority ordering, token-bucket rate limiting, jittered retries drawn
+# from a global retry budget, and queue-depth / wait-time metrics.
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import time
+from enum import IntEnum
+from functools import lru_cache
+
+from telemetry import count_tokens, record, span
+
+
+class Priority(IntEnum):
+    # Lower value is served first
+    INTERACTIVE = 0  # user is waiting on the result (rewrite, feedback)
+    STANDARD = 1
+    BACKGROUND = 2   # nobody is waiting (role extraction, pre-computation)
+
+
+class SchedulerSaturated(Exception):
+    """Raised when a model's wait queue is full; callers should answer 429."""
+
+
+@lru_cache(maxsize=None)
+def retryable_errors() -> tuple:
+    # Resolved on the first failure rather than at import: google.api_core is
+    # a noticeable share of startup and only matters once a call has failed
+    from google.api_core import exceptions as google_exceptions
+    return (
+        google_exceptions.ResourceExhausted,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.InternalServerError,
+        google_exceptions.DeadlineExceeded,
+        asyncio.TimeoutError,
+        ConnectionError,
+    )
+
+
+def is_retryable(exc: Exception) -> bool:
+    errors = retryable_errors()
+    if isinstance(exc, errors):
+        return True
+    # langchain sometimes wraps the provider error
+    return isinstance(exc.__cause__, errors)
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = burst
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, amount: float = 1.0) -> float:
+        """Take tokens if available; otherwise return seconds until they would be."""
+        self._refill()
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return 0.0
+        if self.rate <= 0:
+            return float("inf")
+        return (amount - self.tokens) / self.rate
+
+    async def take(self, amount: float = 1.0):
+        while True:
+            wait = self.try_take(amount)
+            if wait == 0.0:
+                return
+            await asyncio.sleep(wait)
+
+
+class RetryBudget:
+    """
+    Caps retries to a fraction of recent traffic so retries can't snowball
+    during a provider outage. Every first attempt deposits `ratio` tokens,
+    every retry withdraws one; `min_per_sec` keeps a trickle available at low
+    traffic.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_per_sec: float = 1.0, max_tokens: float = 20.0):
+        self.ratio = ratio
+        self.bucket = TokenBucket(rate=min_per_sec, burst=max_tokens)
+        self.bucket.tokens = min_per_sec
+
+    def record_request(self):
+        self.bucket._refill()
+        self.bucket.tokens = min(self.bucket.burst, self.bucket.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        return self.bucket.try_take(1.0) == 0.0
+
+
+class _ModelLane:
+    """Priority-ordered concurrency gate for one model."""
+
+    def __init__(self, limit: int, rate: float, burst: float, max_queue: int):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.bucket = TokenBucket(rate, burst)
+        self.active = 0
+        self._waiters = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for _, _, fut in self._waiters if not fut.done())
+
+    async def acquire(self, priority: Priority):
+        if self.active < self.limit and not self.queued:
+            self.active += 1
+        else:
+            if self.queued >= self.max_queue:
+                raise SchedulerSaturated(f"{self.queued} LLM calls already waiting")
+            fut = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (int(priority), next(self._seq), fut))
+            try:
+                await fut  # release() hands its slot over by resolving this future
+            except asyncio.CancelledError:
+                if fut.done() and not fut.cancelled():
+                    # Slot was handed to us just as we were cancelled; pass it on
+                    self.release()
+                raise
+
+        try:
+            await self.bucket.take()
+        except BaseException:
+            self.release()
+            raise
+
+    def release(self):
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self.active -= 1
+
+
+class _Stats:
+    def __init__(self):
+        self.calls = 0
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+        self.retry_budget_exhausted = 0
+        self.rejected = 0
+        self.wait_total_s = 0.0
+        self.wait_max_s = 0.0
+
+    def record_wait(self, seconds: float):
+        self.wait_total_s += seconds
+        self.wait_max_s = max(self.wait_max_s, seconds)
+
+
+class LLMScheduler:
+    def __init__(self, max_concurrency: int = 8, rate_per_sec: float = 5.0, burst: float = 10.0,
+                 max_queue: int = 100, max_retries: int = 2, base_backoff_s: float = 0.5,
+                 max_backoff_s: float = 8.0, retry_budget: RetryBudget = None):
+        self.max_concurrency = max_concurrency
+        self.rate_per_sec = rate_per_sec
+        self.burst = burst
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.base_backoff_s = base_backoff_s
+        self.max_backoff_s = max_backoff_s
+        self.retry_budget = retry_budget or RetryBudget()
+        self._lanes = {}
+        self._stats = {}
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_concurrency=int(_env_float("LLM_MAX_CONCURRENCY", 8)),
+            rate_per_sec=_env_float("LLM_RATE_PER_SEC", 5.0),
+            burst=_env_float("LLM_BURST", 10.0),
+            max_queue=int(_env_float("LLM_MAX_QUEUE", 100)),
+            max_retries=int(_env_float("LLM_MAX_RETRIES", 2)),
+            retry_budget=RetryBudget(ratio=_env_float("LLM_RETRY_BUDGET_RATIO", 0.2)),
+        )
+
+    def _lane(self, model: str) -> _ModelLane:
+        if model not in self._lanes:
+            self._lanes[model] = _ModelLane(self.max_concurrency, self.rate_per_sec, self.burst, self.max_queue)
+            self._stats[model] = _Stats()
+        return self._lanes[model]
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: uniform in [0, min(cap, base * 2^attempt)]
+        return random.uniform(0, min(self.max_backoff_s, self.base_backoff_s * (2 ** attempt)))
+
+    async def _admit(self, model: str, priority: Priority):
+        lane = self._lane(model)
+        stats = self._stats[model]
+        started = time.perf_counter()
+        try:
+            await lane.acquire(priority)
+        except SchedulerSaturated:
+            stats.rejected += 1
+            raise
+        waited = time.perf_counter() - started
+        stats.record_wait(waited)
+        record("llm_wait", waited)
+        return lane
+
+    async def _should_retry(self, model: str, attempt: int, exc: Exception) -> bool:
+        if attempt >= self.max_retries or not is_retryable(exc):
+            return False
+        stats = self._stats[model]
+        if not self.retry_budget.try_spend():
+            stats.retry_budget_exhausted += 1
+            return False
+        stats.retries += 1
+        await asyncio.sleep(self._backoff(attempt))
+        return True
+
+    async def ainvoke(self, chain, inputs: dict, model: str = "default",
+                      priority: Priority = Priority.STANDARD):
+        self._lane(model)
+        stats = self._stats[model]
+        stats.calls += 1
+        self.retry_budget.record_request()
+
+        attempt = 0
+        while True:
+            lane = await self._admit(model, priority)
+            try:
+                result = await chain.ainvoke(inputs)
+            except Exception as e:
+                lane.release()
+                if await self._should_retry(model, attempt, e):
+                    attempt += 1
+                    continue
+                stats.failed += 1
+                raise
+            except BaseException:
+                # Caller cancelled (client disconnect): the slot must still come back
+                lane.release()
+                raise
+            lane.release()
+            stats.completed += 1
+            return result
+
+    async def astream(self, chain, inputs: dict, model: str = "default",
+                      priority: Priority = Priority.INTERACTIVE):
+        # The slot is held for the whole stream; retries only happen before the
+        # first chunk, since a partially delivered stream can't be replayed
+        self._lane(model)
+        stats = self._stats[model]
+        stats.calls += 1
+        self.retry_budget.record_request()
+
+        attempt = 0
+        while True:
+            lane = await self._admit(model, priority)
+            started = False
+            try:
+                async for chunk in chain.astream(inputs):
+                    started = True
+                    yield chunk
+            except Exception as e:
+                lane.release()
+                if not started and await self._should_retry(model, attempt, e):
+                    attempt += 1
+                    continue
+                stats.failed += 1
+                raise
+            except BaseException:
+                # Client went away (generator closed / task cancelled)
+                lane.release()
+                raise
+            lane.release()
+            stats.completed += 1
+            return
+
+    def stats(self) -> dict:
+        report = {}
+        for model, lane in self._lanes.items():
+            s = self._stats[model]
+            admitted = s.calls + s.retries - s.rejected
+            report[model] = {
+                "active": lane.active,
+                "queued": lane.queued,
+                "calls": s.calls,
+                "completed": s.completed,
+                "failed": s.failed,
+                "rejected": s.rejected,
+                "retries": s.retries,
+                "retry_budget_exhausted": s.retry_budget_exhausted,
+                "avg_wait_ms": round(s.wait_total_s / admitted * 1000, 2) if admitted else 0.0,
+                "max_wait_ms": round(s.wait_max_s * 1000, 2),
+            }
+        return report
+
+
+_scheduler = None
+
+
+def get_scheduler() -> LLMScheduler:
+    # Built on first use so LLM_* settings from .env are already loaded
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = LLMScheduler.from_env()
+    return _scheduler
+
+
+def _record_tokens(name: str, inputs: dict, usage, output_text: str):
+    # Provider-reported usage when Gemini sends it, otherwise the same estimate RAG budgeting uses
+    from llm_registry import CHAIN_SPECS
+    from rag_context import estimate_tokens, prompt_tokens
+    if usage:
+        count_tokens(name, usage.get("input_tokens", 0), usage.get("output_tokens", 0))
+    else:
+        count_tokens(name, prompt_tokens(CHAIN_SPECS[name][0], inputs), estimate_tokens(output_text))
+
+
+async def run_chain(name: str, inputs: dict, priority: Priority = Priority.STANDARD):
+    from llm_registry import registry
+    with span("llm"):
+        result = await get_scheduler().ainvoke(registry.get(name), inputs, model=registry.model, priority=priority)
+    content = getattr(result, "content", result)
+    _record_tokens(name, inputs, getattr(result, "usage_metadata", None), content if isinstance(content, str) else "")
+    return result
+
+
+async def stream_chain(name: str, inputs: dict, priority: Priority = Priority.INTERACTIVE):
+    from llm_registry import registry
+    usage, parts = None, []
+    with span("llm"):
+        async for chunk in get_scheduler().astream(registry.get(name), inputs, model=registry.model, priority=priority):
+            # Gemini reports usage on the final chunk(s)
+            usage = getattr(chunk, "usage_metadata", None) or usage
+            content = getattr(chunk, "content", "")
+            if isinstance(content, str):
+                parts.append(content)
+            yield chunk
+    _record_tokens(name, inputs, usage, "".join(parts))
@@ -1,18 +1,44 @@
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+import time
+_IMPORT_STARTED = time.perf_counter()
+
+import asyncio
+from typing import List
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 from datetime import datetime
-from bson import ObjectId, Binary
-from io import BytesIO
-import fitz  # PyMuPDF
-import spacy
+from bson import ObjectId
 import os
 from dotenv import load_dotenv
-from pymongo import MongoClient
-from weaviate_server import init_weaviate_client
+from weaviate_server import close_vector_store, init_vector_store, start_ingestion, stop_ingestion
+from weaviate_server import start_publisher, stop_publisher
 from weaviate_server import router as feedback_router
+from jobs import JobWorkerPool, create_job_store
+from jobs import router as jobs_router
+from llm_registry import registry as chain_registry
+from llm_cache import LLMCache
 from global_state import GlobalState  # we'll create this file
-import certifi
+from mongo_store import connect_mongo
+from parse_pool import ResumeParsePool, ParsePoolSaturated, ParseTimeout, ParseWorkerCrashed, PdfRejected
+from parse_cache import ParseCache
+from latex_compile import COMPILED_BUCKET, LatexCompiler
+import resume_versions
+from readiness import Readiness, ReadinessGate
+from uploads import InvalidUpload, MaxBodySizeMiddleware, UploadTooLarge, max_bulk_upload_bytes, max_upload_bytes, spool_upload
+from resume_files import ResumeFileStore, InvalidRange, parse_range, iter_file
+from bulk_ingest import NDJSON_MEDIA_TYPE, BulkLimitExceeded, expand_uploads, ingest_stream, read_uploads
+from telemetry import TimingMiddleware, configure_logging, get_logger, metrics_payload, span
+
+load_dotenv()  # The one place .env is read; the middleware settings below already need it
+logger = get_logger("main")
+
+# Everything the API needs before it takes traffic; the vector store is optional
+readiness = Readiness(started=_IMPORT_STARTED)
+for component in ("mongo", "parse_pool", "llm", "parse_cache"):
+    readiness.add(component)
+readiness.add("vector_store", required=False)
+readiness.add("latex", required=False)
+_startup_task = None
 
 # === App Init ===
 app = FastAPI()
@@ -21,85 +47,307 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Trace-Id", "Server-Timing", "X-Resume-Id", "X-Compile-Cache"],
     allow_credentials=True
 )
+# Oversized uploads are refused before the multipart parser buffers them
+app.add_middleware(
+    MaxBodySizeMiddleware,
+    max_bytes=max_upload_bytes() + 64 * 1024,  # room for multipart framing and form fields
+    paths=("/api/parse-resume",),
+)
+app.add_middleware(MaxBodySizeMiddleware, max_bytes=max_bulk_upload_bytes(), paths=("/api/parse-resumes",))
+# API traffic waits (503 + Retry-After) until the required dependencies are up
+app.add_middleware(ReadinessGate, readiness=readiness)
+# Outermost, so request timings include everything above; TRACE_ALL_REQUESTS traces without the header
+app.add_middleware(TimingMiddleware, trace_all=os.getenv("TRACE_ALL_REQUESTS", "false").lower() == "true")
 
 # === Startup Hook ===
-@app.on_event("startup")
-def init_services():
-    load_dotenv()
-    print("[DEBUG] RESUME_OUTPUT_DIR:", os.getenv("RESUME_OUTPUT_DIR"))
+async def init_mongo(mongo_uri: str):
+    mongo_client, db = await connect_mongo(mongo_uri)
+    GlobalState.mongo_client = mongo_client
+    GlobalState.db = db
+    GlobalState.collection = db["resumes"]
+    GlobalState.blobs = db["resume_blobs"]
+    GlobalState.files = ResumeFileStore(db)
+    GlobalState.llm_cache = LLMCache.from_env(db["llm_cache"])
+    GlobalState.job_store = create_job_store(db)
+    await asyncio.gather(
+        resume_versions.ensure_indexes(GlobalState.collection),
+        GlobalState.llm_cache.ensure_indexes(),
+        GlobalState.job_store.ensure_indexes(),
+    )
+    logger.info("[✅ MONGO] Connected to MongoDB")
+
+
+async def init_llm():
+    # LLM chains are built once and shared by every request. Building them
+    # imports the provider SDK (seconds of CPU), so it runs off the event loop
+    if os.getenv("LLM_BACKEND") != "fake" and not os.getenv("GOOGLE_GEMINI_API_KEY"):
+        logger.warning("[❗] GOOGLE_GEMINI_API_KEY not set. Please set it in your .env file.")
+    chain_count = await asyncio.to_thread(chain_registry.warm)
+    logger.info("[✅ LLM] %s chains warmed (%s)", chain_count, chain_registry.model)
+
+
+async def init_vectors():
+    await init_vector_store()
+    start_ingestion()
+
+
+async def init_parse_cache():
+    GlobalState.parse_cache = ParseCache.from_env(
+        GlobalState.blobs, GlobalState.files, GlobalState.parse_pool.parser_version
+    )
+    await GlobalState.parse_cache.ensure_indexes()
+
+
+async def init_latex():
+    # Optional: without a TeX engine only /api/compile-latex is unavailable
+    compiler = LatexCompiler.from_env(GlobalState.db["compiled_resumes"], ResumeFileStore(GlobalState.db, COMPILED_BUCKET))
+    await asyncio.gather(compiler.probe(), compiler.ensure_indexes())
+    GlobalState.latex_compiler = compiler
+
+
+async def start_dependencies(mongo_uri: str):
+    # Parse workers first: submitting the warm-up forks them now, before the
+    # LLM warm-up thread exists (a fork mid-import could inherit a held lock)
+    parse_pool = ResumeParsePool.from_env()
+    GlobalState.parse_pool = parse_pool
+    warming = parse_pool.warm_up()
+
+    async def init_parse_pool():
+        await warming
+        logger.info("[✅ NLP] Parse pool ready (%s x%s, queue %s)", parse_pool.mode, parse_pool.workers, parse_pool.max_pending)
+
+    async def init_chains():
+        if parse_pool.mode == "thread":
+            # spaCy and langchain_core both import pydantic.v1, and two threads
+            # importing it at once can see it half-initialised: load one at a time
+            await asyncio.wait([warming])
+        await init_llm()
+
+    # Independent services come up concurrently, each under its own timeout
+    vectors = asyncio.create_task(readiness.run("vector_store", init_vectors))
+    mongo_ok, parse_ok, _ = await asyncio.gather(
+        readiness.run("mongo", lambda: init_mongo(mongo_uri)),
+        readiness.run("parse_pool", init_parse_pool),
+        readiness.run("llm", init_chains),
+    )
+    dependent = []
+    if mongo_ok and parse_ok:
+        dependent.append(readiness.run("parse_cache", init_parse_cache))
+    if mongo_ok:
+        dependent.append(readiness.run("latex", init_latex))
+    await asyncio.gather(*dependent)
+
+    # Background jobs: JOB_WORKERS=0 leaves execution to `python job_worker.py`
+    if mongo_ok:
+        job_pool = JobWorkerPool.from_env(GlobalState.job_store)
+        if job_pool.concurrency > 0:
+            job_pool.start()
+            GlobalState.job_pool = job_pool
+            logger.info("[✅ JOBS] %s in-process job workers", job_pool.concurrency)
+    await vectors
+
 
+@app.on_event("startup")
+async def init_services():
+    global _startup_task
+    configure_logging()
+    logger.debug("RESUME_OUTPUT_DIR: %s", os.getenv("RESUME_OUTPUT_DIR"))
+    readiness.mark("import", time.perf_counter() - _IMPORT_STARTED)
+    start_publisher()
 
-    # Mongo setup
     mongo_uri = os.getenv("MONGO_URI")
     if not mongo_uri:
         raise RuntimeError("[❌] MONGO_URI missing")
-    mongo_client = MongoClient(mongo_uri, tlsCAFile=certifi.where())
-    mongo_client.admin.command("ping")
-    db = mongo_client["skillbridge"]
-    print("[✅ MONGO] Connected to MongoDB")
 
-    # NLP setup
-    nlp_model = spacy.load("en_core_web_sm")
-    print("[✅ NLP] spaCy loaded")
+    # Returns straight away so /healthz answers while dependencies come up;
+    # ReadinessGate holds everything else until /readyz would say ready
+    _startup_task = asyncio.create_task(start_dependencies(mongo_uri))
 
-    # Store global
-    GlobalState.mongo_client = mongo_client
-    GlobalState.db = db
-    GlobalState.collection = db["resumes"]
-    GlobalState.nlp = nlp_model
-
-    # Try Weaviate init
-    try:
-        init_weaviate_client()
-    except Exception as e:
-        print(f"[⚠️ WEAVIATE] Failed to initialize Weaviate: {e}")
+@app.on_event("shutdown")
+async def shutdown_services():
+    if _startup_task and not _startup_task.done():
+        _startup_task.cancel()
+        await asyncio.gather(_startup_task, return_exceptions=True)
+    # Running jobs get a grace period, then go back on the queue
+    if GlobalState.job_pool:
+        await GlobalState.job_pool.close()
+    # Send debounced publishes and drain queued vector writes before tearing anything else down
+    await stop_publisher()
+    await stop_ingestion()
+    await close_vector_store()
+    if GlobalState.parse_pool:
+        GlobalState.parse_pool.shutdown()
+    if GlobalState.mongo_client:
+        await GlobalState.mongo_client.close()
 
 # === Routes ===
+@app.get("/healthz")
+async def healthz():
+    # Liveness: up and serving. Only a required dependency that gave up makes it fail, so it gets restarted
+    if readiness.failed:
+        return JSONResponse(status_code=503, content={"status": "failed", **readiness.report()})
+    return {"status": "ok", "uptimeSeconds": round(time.perf_counter() - _IMPORT_STARTED, 3)}
+
+@app.get("/readyz")
+async def readyz():
+    report = readiness.report()
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
+
+@app.get("/metrics")
+async def metrics():
+    body, content_type = metrics_payload()
+    return Response(content=body, media_type=content_type)
+
 @app.post("/api/parse-resume")
 async def parse_resume(file: UploadFile = File(...), userId: str = Form(...)):
-    print(f"[📄] Upload received: {file.filename}")
-    content = await file.read()
+    logger.info("[📄] Upload received: %s", file.filename)
+    try:
+        with span("upload_read"):
+            upload = await spool_upload(file)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except InvalidUpload as e:
+        raise HTTPException(status_code=415, detail=str(e))
+
+    # The user's previous upload: its section fingerprints let the parse skip NER on unchanged sections
+    previous = await resume_versions.latest_version(GlobalState.collection, userId)
 
-    text = extract_text(content)
-    doc = GlobalState.nlp(text)
-    skills = [ent.text for ent in doc.ents if ent.label_ in ['SKILL', 'ORG', 'PERSON']]
-    summary = text[:]
+    with upload:
+        digest = upload.digest
+
+        # Same PDF seen before? Reuse its parse and blob instead of redoing both
+        cached = await GlobalState.parse_cache.lookup(digest)
+        if cached:
+            logger.info("[♻️ PARSE CACHE] Hit for %s", digest[:12])
+        else:
+            try:
+                text, skills, sections = await GlobalState.parse_pool.parse(
+                    upload.source, resume_versions.section_skills(previous)
+                )
+            except ParsePoolSaturated as e:
+                logger.warning("[⏳ PARSE POOL] Rejecting upload: %s", e)
+                raise HTTPException(
+                    status_code=503,
+                    detail="Resume parser is busy, please retry shortly",
+                    headers={"Retry-After": "2"},
+                )
+            except ParseWorkerCrashed as e:
+                # The pool was already replaced; the same upload usually parses on retry
+                logger.error("[💥 PARSE POOL] %s while parsing %s", e, file.filename)
+                raise HTTPException(
+                    status_code=503,
+                    detail="Resume parser restarted, please retry shortly",
+                    headers={"Retry-After": "2"},
+                )
+            except (PdfRejected, ParseTimeout) as e:
+                logger.info("[🚫 PARSE] Rejected %s: %s", file.filename, e)
+                raise HTTPException(status_code=422, detail=str(e))
+            cached = await GlobalState.parse_cache.store(digest, upload, text, skills, sections)
+
+    summary = cached["parsedText"]
+    skills = cached["skills"]
+    sections = cached["sections"] or resume_versions.resume_sections(summary)
+    version = resume_versions.version_fields(previous, sections)
 
     resume_doc = {
         "userId": userId,
         "filename": file.filename,
-        "file_data": Binary(content),
-        "parsedText": text,
-        "summary": summary,
-        "skills": list(set(skills)),
+        "contentHash": digest,
+        "blobId": cached["blobId"],
+        "fileId": cached["fileId"],
+        "skills": skills,
+        "summary": resume_versions.summary_excerpt(summary),
+        **version,
         "uploadedAt": datetime.now()
     }
 
-    print(f"[📥 MONGO] Saving resume for user {userId}")
-    GlobalState.collection.insert_one(resume_doc)
+    logger.info("[📥 MONGO] Saving resume for user %s", userId)
+    result = await GlobalState.collection.insert_one(resume_doc)
 
     return {
+        "resumeId": str(result.inserted_id),
         "filename": file.filename,
         "summary": summary,
-        "skills": list(set(skills))
+        "skills": skills,
+        "previousId": str(version["previousId"]) if previous else None,
+        "changes": version.get("changes"),
     }
 
+@app.post("/api/parse-resumes")
+async def parse_resumes_bulk(files: List[UploadFile] = File(...), userId: str = Form(...)):
+    # Any mix of PDFs and zip archives of PDFs; results stream back as NDJSON
+    try:
+        entries = expand_uploads(await read_uploads(files))
+    except BulkLimitExceeded as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    logger.info("[📦 BULK] %s file(s) received for user %s", len(entries), userId)
+    return StreamingResponse(ingest_stream(userId, entries), media_type=NDJSON_MEDIA_TYPE)
+
+@app.get("/api/history/{user_id}")
+async def resume_history(user_id: str, limit: int = Query(20, ge=1, le=100), cursor: str = None,
+                         summary: bool = False):
+    # Pass the returned nextCursor back as `cursor` for the following page
+    try:
+        items, next_cursor = await resume_versions.history_page(GlobalState.collection, user_id, limit, cursor, summary)
+    except resume_versions.InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"items": items, "nextCursor": next_cursor}
+
 @app.get("/api/download-resume/{resume_id}")
-def download_resume(resume_id: str):
-    doc = GlobalState.collection.find_one({"_id": ObjectId(resume_id)})
+async def download_resume(resume_id: str, request: Request):
+    doc = await GlobalState.collection.find_one(
+        {"_id": ObjectId(resume_id)},
+        {"filename": 1, "contentHash": 1, "fileId": 1},
+    )
     if not doc:
         raise HTTPException(status_code=404, detail="Resume not found")
 
-    return StreamingResponse(BytesIO(doc["file_data"]),
+    disposition = {"Content-Disposition": f"attachment; filename={doc['filename']}"}
+
+    if not doc.get("fileId"):
+        # Not migrated yet (see migrate_resume_files.py): PDF is still embedded
+        legacy = await GlobalState.collection.find_one({"_id": doc["_id"]}, {"file_data": 1})
+        if not legacy or legacy.get("file_data") is None:
+            raise HTTPException(status_code=404, detail="Resume file not found")
+        return Response(bytes(legacy["file_data"]), media_type="application/pdf", headers=disposition)
+
+    # Content-addressed, so the hash is a strong validator
+    etag = f'"{doc["contentHash"]}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    grid_out = await GlobalState.files.open(doc["fileId"])
+    if grid_out is None:
+        raise HTTPException(status_code=404, detail="Resume file not found")
+
+    size = grid_out.length
+    headers = {**disposition, "ETag": etag, "Accept-Ranges": "bytes"}
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range == etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except InvalidRange:
+            await grid_out.close()
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+
+        if byte_range:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(iter_file(grid_out, start, end), status_code=206,
+                media_type="application/pdf", headers=headers)
+
+    headers["Content-Length"] = str(size)
+    return StreamingResponse(iter_file(grid_out),
         media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename={doc['filename']}"}
+        headers=headers
     )
 
-def extract_text(pdf_bytes):
-    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-    return "".join([page.get_text() for page in doc])
-
 # === Weaviate Router ===
 app.include_router(feedback_router)
+app.include_router(jobs_router)
@@ -0,0 +1,94 @@
+# migrate_resume_files.py
+# One-off migration: moves PDF bodies embedded in `resumes` / `resume_blobs`
+# (`file_data`) into the GridFS bucket used by resume_files.py.
+# Safe to re-run; already migrated documents are skipped.
+#
+#   python migrate_resume_files.py [--dry-run] [--batch-size 50]
+import argparse
+import asyncio
+import os
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+from mongo_store import connect_mongo
+from parse_cache import ParseCache, content_hash
+from resume_files import ResumeFileStore
+from resume_versions import summary_excerpt
+
+
+async def migrate_blobs(db, files, dry_run: bool, batch_size: int) -> int:
+    blobs = db["resume_blobs"]
+    moved = 0
+    cursor = blobs.find({"file_data": {"$exists": True}}, {"contentHash": 1}, batch_size=batch_size)
+    async for blob in cursor:
+        # Fetch the body one document at a time to keep memory flat
+        body = (await blobs.find_one({"_id": blob["_id"]}, {"file_data": 1}))["file_data"]
+        if not dry_run:
+            file_id = await files.put(blob["contentHash"], bytes(body))
+            await blobs.update_one({"_id": blob["_id"]}, {"$set": {"fileId": file_id}, "$unset": {"file_data": ""}})
+        moved += 1
+    return moved
+
+
+async def migrate_resumes(db, cache, dry_run: bool, batch_size: int) -> int:
+    resumes = db["resumes"]
+    moved = 0
+    cursor = resumes.find({"file_data": {"$exists": True}}, {"_id": 1}, batch_size=batch_size)
+    async for ref in cursor:
+        doc = await resumes.find_one({"_id": ref["_id"]}, {"file_data": 1, "parsedText": 1, "summary": 1, "skills": 1})
+        body = bytes(doc["file_data"])
+        digest = content_hash(body)
+        if not dry_run:
+            entry = await cache.lookup(digest) or await cache.store(
+                digest, body, doc.get("parsedText", ""), doc.get("skills", [])
+            )
+            # The full text moves to the blob; history listings keep a short excerpt
+            text = doc.get("parsedText") or entry.get("parsedText") or doc.get("summary") or ""
+            await resumes.update_one(
+                {"_id": doc["_id"]},
+                {
+                    "$set": {
+                        "contentHash": digest,
+                        "blobId": entry["blobId"],
+                        "fileId": entry["fileId"],
+                        "summary": summary_excerpt(text),
+                    },
+                    "$unset": {"file_data": "", "parsedText": ""},
+                },
+            )
+        moved += 1
+    return moved
+
+
+async def run(args):
+    load_dotenv()
+    mongo_uri = os.getenv("MONGO_URI")
+    if not mongo_uri:
+        raise RuntimeError("[❌] MONGO_URI missing")
+
+    client, db = await connect_mongo(mongo_uri)
+    files = ResumeFileStore(db)
+    cache = ParseCache(db["resume_blobs"], files)
+    await cache.ensure_indexes()
+
+    started = datetime.now()
+    # Blobs first so resumes that hash to an existing blob reuse its GridFS file
+    blob_count = await migrate_blobs(db, files, args.dry_run, args.batch_size)
+    resume_count = await migrate_resumes(db, cache, args.dry_run, args.batch_size)
+    await client.close()
+
+    verb = "Would move" if args.dry_run else "Moved"
+    print(f"[✅ MIGRATION] {verb} {blob_count} blob(s) and {resume_count} resume(s) "
+          f"in {(datetime.now() - started).total_seconds():.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move embedded resume PDFs into GridFS")
+    parser.add_argument("--dry-run", action="store_true", help="Only count documents that would move")
+    parser.add_argument("--batch-size", type=int, default=50)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
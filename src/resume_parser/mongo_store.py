@@ -0,0 +1,59 @@
+# mongo_store.py
+# Async MongoDB access (PyMongo's native asyncio API) so DB round trips no
+# longer block the event loop. Pool sizing, timeouts and write concern are
+# explicit and overridable from the environment.
+import os
+
+import certifi
+from pymongo import AsyncMongoClient
+
+from telemetry import MongoTimingListener
+
+DB_NAME = "skillbridge"
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def mongo_client_options(mongo_uri: str) -> dict:
+    w = os.getenv("MONGO_WRITE_CONCERN", "majority")
+    options = {
+        # Pool sizing
+        "maxPoolSize": _env_int("MONGO_MAX_POOL_SIZE", 50),
+        "minPoolSize": _env_int("MONGO_MIN_POOL_SIZE", 0),
+        "maxIdleTimeMS": _env_int("MONGO_MAX_IDLE_TIME_MS", 60000),
+        "maxConnecting": _env_int("MONGO_MAX_CONNECTING", 4),
+        # Timeouts
+        "connectTimeoutMS": _env_int("MONGO_CONNECT_TIMEOUT_MS", 5000),
+        "serverSelectionTimeoutMS": _env_int("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000),
+        "socketTimeoutMS": _env_int("MONGO_SOCKET_TIMEOUT_MS", 20000),
+        "waitQueueTimeoutMS": _env_int("MONGO_WAIT_QUEUE_TIMEOUT_MS", 5000),
+        # Write concern
+        "w": int(w) if w.isdigit() else w,
+        "wTimeoutMS": _env_int("MONGO_WTIMEOUT_MS", 5000),
+        "journal": os.getenv("MONGO_JOURNAL", "true").lower() == "true",
+        "retryWrites": True,
+        # Command timings feed the "mongo" stage histogram
+        "event_listeners": [MongoTimingListener()],
+    }
+    # Atlas (SRV / TLS) needs the certifi bundle; a plain local mongod does not
+    if mongo_uri.startswith("mongodb+srv://") or "tls=true" in mongo_uri.lower():
+        options["tlsCAFile"] = certifi.where()
+    return options
+
+
+def create_mongo_client(mongo_uri: str) -> AsyncMongoClient:
+    return AsyncMongoClient(mongo_uri, **mongo_client_options(mongo_uri))
+
+
+async def connect_mongo(mongo_uri: str):
+    if mongo_uri.startswith("memory://"):
+        # In-process stand-in (fake_mongo.py) for offline load tests and dev
+        from fake_mongo import FakeMongoClient
+        client = FakeMongoClient()
+        return client, client[DB_NAME]
+    client = create_mongo_client(mongo_uri)
+    await client.admin.command("ping")
+    return client, client[DB_NAME]
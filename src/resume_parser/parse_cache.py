@@ -0,0 +1,122 @@
+# parse_cache.py
+# Content-addressed cache for parsed resumes: identical PDFs are parsed and
+# stored once (metadata in `resume_blobs`, bytes in GridFS), and every upload
+# only adds a small per-user reference document to `resumes`.
+import hashlib
+import os
+from collections import OrderedDict
+from datetime import datetime
+
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
+
+from telemetry import cache_event
+
+BLOB_META_PROJECTION = {"fileId": 1, "parsedText": 1, "skills": 1, "sections": 1, "parserVersion": 1}
+
+
+def content_hash(pdf_bytes: bytes) -> str:
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+class LRUCache:
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        if key not in self._entries:
+            return None
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ParseCache:
+    def __init__(self, blobs, files, max_entries: int = 256, parser_version: str = None):
+        self.blobs = blobs
+        self.files = files
+        self.lru = LRUCache(max_entries)
+        # None accepts any stored parse (migrations); otherwise older parses are misses
+        self.parser_version = parser_version
+
+    async def ensure_indexes(self):
+        await self.blobs.create_index([("contentHash", ASCENDING)], unique=True, name="contentHash_unique")
+
+    @classmethod
+    def from_env(cls, blobs, files, parser_version: str = None):
+        return cls(blobs, files, max_entries=int(os.getenv("PARSE_CACHE_SIZE", "256")),
+                   parser_version=parser_version)
+
+    async def lookup(self, digest: str):
+        entry = self.lru.get(digest)
+        if entry:
+            cache_event("parse", "memory_hits")
+            return entry
+
+        blob = await self.blobs.find_one({"contentHash": digest}, BLOB_META_PROJECTION)
+        if not blob or not self._current(blob):
+            cache_event("parse", "misses")
+            return None
+        cache_event("parse", "mongo_hits")
+        entry = self._to_entry(blob)
+        self.lru.put(digest, entry)
+        return entry
+
+    async def store(self, digest: str, pdf, text: str, skills: list, sections: list = None):
+        # `pdf` is bytes or a SpooledUpload, whose body is streamed from its spool
+        if isinstance(pdf, (bytes, bytearray)):
+            size = len(pdf)
+            file_id = await self.files.put(digest, pdf)
+        else:
+            size = pdf.size
+            with pdf.open() as body:
+                file_id = await self.files.put(digest, body)
+        blob = {
+            "contentHash": digest,
+            "fileId": file_id,
+            "size": size,
+            "parsedText": text,
+            "skills": skills,
+            "sections": sections,
+            "parserVersion": self.parser_version,
+            "createdAt": datetime.now(),
+        }
+        try:
+            await self.blobs.insert_one(blob)
+        except DuplicateKeyError:
+            # Same PDF was parsed concurrently by another request; keep the first copy
+            await self.files.delete(file_id)
+            blob = await self.blobs.find_one({"contentHash": digest}, BLOB_META_PROJECTION)
+            if not self._current(blob):
+                # Stored by an older parser: keep its file, replace the results
+                await self.blobs.update_one({"_id": blob["_id"]}, {"$set": {
+                    "parsedText": text, "skills": skills, "sections": sections, "parserVersion": self.parser_version,
+                }})
+                blob.update(parsedText=text, skills=skills, sections=sections)
+
+        entry = self._to_entry(blob)
+        self.lru.put(digest, entry)
+        return entry
+
+    def _current(self, blob) -> bool:
+        return self.parser_version is None or blob.get("parserVersion") == self.parser_version
+
+    @staticmethod
+    def _to_entry(blob):
+        return {
+            "blobId": blob["_id"],
+            "fileId": blob.get("fileId"),
+            "parsedText": blob["parsedText"],
+            "skills": blob["skills"],
+            # Per-section fingerprints and skills; absent on bulk-parsed and older blobs
+            "sections": blob.get("sections"),
+        }
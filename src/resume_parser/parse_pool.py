@@ -0,0 +1,317 @@
+# parse_pool.py
+# Runs PDF extraction + spaCy NER off the event loop so a large upload
+# can't stall every other request on the uvicorn worker.
+import asyncio
+import mmap
+import os
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import fitz  # PyMuPDF
+
+from resume_versions import resume_sections
+from skill_extractor import build_nlp, extract_skills, pipeline_version, skill_labels
+from telemetry import get_logger, record
+
+logger = get_logger("parse")
+
+SPACY_MODEL = "en_core_web_sm"
+
+# Each pool worker (process or thread) keeps its own spaCy model here
+_worker = threading.local()
+
+# Pipelines built by preload_pipeline() before the process forks (gunicorn
+# preload). Workers forked afterwards inherit them copy-on-write instead of
+# running spacy.load; each process hands one out to a single worker, since a
+# pipeline object is not shared between threads.
+_preloaded = {}
+
+
+class ParsePoolSaturated(Exception):
+    """Raised when the parse queue is full and the caller should back off."""
+
+
+class PdfRejected(Exception):
+    """Raised by a worker for a PDF over the page limit or extraction deadline."""
+
+
+class ParseTimeout(Exception):
+    """Raised on the loop side when a worker call overruns its hard deadline."""
+
+
+class ParseWorkerCrashed(Exception):
+    """A worker process died mid-parse; the pool has been replaced and a retry may succeed."""
+
+
+def _parse_limits():
+    return int(os.getenv("UPLOAD_MAX_PAGES", "50")), float(os.getenv("PARSE_TIMEOUT_S", "20"))
+
+
+# ----------------- WORKER SIDE -----------------
+def preload_pipeline(model_name: str = None):
+    """Build the parse pipeline in this (parent) process, for workers forked after it."""
+    model_name = model_name or os.getenv("SPACY_MODEL", SPACY_MODEL)
+    labels = skill_labels()
+    _preloaded[(model_name, labels)] = build_nlp(model_name, labels)
+    logger.info("[✅ NLP] Preloaded %s for forked workers", model_name)
+
+
+def _init_worker(model_name: str):
+    _worker.labels = skill_labels()
+    nlp = _preloaded.pop((model_name, _worker.labels), None)
+    _worker.nlp = nlp if nlp is not None else build_nlp(model_name, _worker.labels)
+    _worker.limits = _parse_limits()
+
+
+def _read_pages(doc):
+    max_pages, timeout_s = getattr(_worker, "limits", None) or _parse_limits()
+    if doc.page_count > max_pages:
+        raise PdfRejected(f"PDF has {doc.page_count} pages, limit is {max_pages}")
+
+    # Cooperative deadline, checked between pages; the loop side enforces a hard one
+    deadline = time.monotonic() + timeout_s
+    parts = []
+    for page in doc:
+        parts.append(page.get_text())
+        if time.monotonic() > deadline:
+            raise PdfRejected(f"Text extraction exceeded {timeout_s:g}s")
+    return "".join(parts)
+
+
+def extract_text(source):
+    """`source` is the PDF as bytes, or the path of a spooled upload."""
+    if not isinstance(source, str):
+        with fitz.open(stream=source, filetype="pdf") as doc:
+            return _read_pages(doc)
+
+    # Map the file instead of reading it: pages fault in as MuPDF touches them
+    with open(source, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        view = memoryview(mapped)
+        try:
+            with fitz.open(stream=view, filetype="pdf") as doc:
+                return _read_pages(doc)
+        finally:
+            # The mmap can't close while a view of it is still exported
+            view.release()
+
+
+def _skills(doc):
+    return extract_skills(doc, _worker.labels)
+
+
+@contextmanager
+def _stage(name: str):
+    # Worker-side timings travel back with the result (see _timed_call)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = getattr(_worker, "timings", None)
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + time.perf_counter() - started
+
+
+def _timed_call(fn, *args):
+    _worker.timings = {}
+    return fn(*args), _worker.timings
+
+
+def parse_pdf(source, known_sections: dict = None):
+    """
+    (text, skills, sections). NER runs per resume section; sections whose
+    fingerprint is in `known_sections` (from the user's previous version)
+    reuse those skills instead of going through the pipeline again.
+    """
+    with _stage("pdf_extract"):
+        text = extract_text(source)
+    known_sections = known_sections or {}
+    sections = resume_sections(text)
+    todo = [s for s in sections if s["hash"] not in known_sections]
+    with _stage("ner"):
+        for section, doc in zip(todo, _worker.nlp.pipe([s["text"] for s in todo])):
+            section["skills"] = _skills(doc)
+
+    skills = []
+    for section in sections:
+        section.setdefault("skills", known_sections.get(section["hash"], []))
+        skills.extend(skill for skill in section["skills"] if skill not in skills)
+        del section["text"]  # recoverable from the parsed text; keeps blobs small
+    return text, skills, sections
+
+
+def parse_pdf_batch(pdf_list):
+    """
+    Parse several PDFs in one worker call: extraction per file, then a single
+    nlp.pipe pass over every file's sections so spaCy batches the NER work.
+    Returns one (text, skills, sections, error) per input, shaped like
+    parse_pdf(); a broken PDF only fails its own entry.
+    """
+    texts, errors = [], {}
+    for index, source in enumerate(pdf_list):
+        try:
+            with _stage("pdf_extract"):
+                texts.append(extract_text(source))
+        except PdfRejected as e:
+            errors[index] = str(e)
+            texts.append("")
+        except Exception as e:
+            errors[index] = f"Could not read PDF: {e}"
+            texts.append("")
+
+    per_file = [resume_sections(text) if index not in errors else [] for index, text in enumerate(texts)]
+    all_sections = [section for sections in per_file for section in sections]
+    with _stage("ner"):
+        docs = _worker.nlp.pipe([s["text"] for s in all_sections], batch_size=max(len(all_sections), 1))
+        for section, doc in zip(all_sections, docs):
+            section["skills"] = _skills(doc)
+
+    results = []
+    for index, (text, sections) in enumerate(zip(texts, per_file)):
+        if index in errors:
+            results.append((None, None, None, errors[index]))
+            continue
+        skills = []
+        for section in sections:
+            skills.extend(skill for skill in section["skills"] if skill not in skills)
+            del section["text"]
+        results.append((text, skills, sections, None))
+    return results
+
+
+# ----------------- LOOP SIDE -----------------
+class ResumeParsePool:
+    def __init__(self, mode: str = "process", workers: int = None, max_pending: int = None,
+                 model_name: str = SPACY_MODEL):
+        if mode not in ("process", "thread"):
+            raise ValueError(f"Unknown parse pool mode: {mode}")
+        self.mode = mode
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 4
+        self.model_name = model_name
+        # Identifies the extraction output; cached parses from another version are redone
+        self.parser_version = pipeline_version(model_name)
+        # Past the workers' own deadline plus this grace, a call is abandoned
+        # and (in process mode) its worker killed
+        self.timeout_s = _parse_limits()[1]
+        self.timeout_grace_s = float(os.getenv("PARSE_TIMEOUT_GRACE_S", "5"))
+        self._pending = 0
+        self._executor = self._new_executor()
+
+    @classmethod
+    def from_env(cls):
+        workers = os.getenv("PARSE_POOL_WORKERS")
+        max_pending = os.getenv("PARSE_QUEUE_MAX")
+        return cls(
+            mode=os.getenv("PARSE_POOL_MODE", "process"),
+            model_name=os.getenv("SPACY_MODEL", SPACY_MODEL),
+            workers=int(workers) if workers else None,
+            max_pending=int(max_pending) if max_pending else None,
+        )
+
+    def _new_executor(self):
+        pool_cls = ProcessPoolExecutor if self.mode == "process" else ThreadPoolExecutor
+        return pool_cls(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.model_name,),
+        )
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def run(self, fn, *args, timeout_s: float = None):
+        # Admission happens on the loop thread, so a plain counter is enough
+        if self._pending >= self.max_pending:
+            raise ParsePoolSaturated(f"{self._pending} parse jobs already queued")
+
+        self._pending += 1
+        executor = self._executor
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(executor, _timed_call, fn, *args)
+            result, timings = await (future if timeout_s is None else asyncio.wait_for(future, timeout_s))
+            for stage, seconds in timings.items():
+                record(stage, seconds)
+            # Whatever the worker didn't account for was queueing and IPC
+            record("parse_wait", max(time.perf_counter() - started - sum(timings.values()), 0.0))
+            return result
+        except asyncio.TimeoutError:
+            self._restart(executor, f"Parse call overran {timeout_s:g}s")
+            raise ParseTimeout(f"Parsing took longer than {timeout_s:g}s")
+        except BrokenProcessPool:
+            # A worker died (e.g. crashed inside MuPDF); replace the pool for the next caller
+            self._restart(executor, "Worker died")
+            raise ParseWorkerCrashed("Resume parser worker crashed") from None
+        finally:
+            self._pending -= 1
+
+    def _restart(self, executor, reason: str):
+        if executor is not self._executor:
+            return  # another caller already replaced it
+        logger.warning("[⚠️ PARSE POOL] %s, restarting pool", reason)
+        self._executor = self._new_executor()
+        if self.mode == "process":
+            # shutdown() can't interrupt a worker stuck inside MuPDF; kill them
+            for process in list((executor._processes or {}).values()):
+                process.terminate()
+        # A stuck thread can't be killed; it is abandoned and finishes on its own
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _hard_timeout(self, files: int) -> float:
+        return self.timeout_s * files + self.timeout_grace_s
+
+    async def parse(self, source, known_sections: dict = None):
+        """`source`: PDF bytes, or the path of a spooled upload. See parse_pdf()."""
+        return await self.run(parse_pdf, source, known_sections, timeout_s=self._hard_timeout(1))
+
+    async def _run_when_admitted(self, fn, *args, timeout_s: float = None):
+        # Bulk work waits for room instead of bouncing like interactive uploads
+        while True:
+            try:
+                return await self.run(fn, *args, timeout_s=timeout_s)
+            except ParsePoolSaturated:
+                await asyncio.sleep(0.05)
+
+    async def parse_many(self, pdf_list, batch_size: int = 8):
+        """
+        Async-iterates one list of (index, text, skills, sections, error) per batch, in
+        completion order. At most one batch per worker is in flight,
+        leaving queue room for single uploads arriving meanwhile.
+        """
+        slots = asyncio.Semaphore(self.workers)
+
+        async def run_batch(start):
+            async with slots:
+                try:
+                    batch = pdf_list[start:start + batch_size]
+                    results = await self._run_when_admitted(parse_pdf_batch, batch,
+                                                            timeout_s=self._hard_timeout(len(batch)))
+                except Exception as e:
+                    # Worker crash or overrun: fail this batch's files, keep going with the rest
+                    results = [(None, None, None, f"Parser failed: {e}")] * len(batch)
+                return start, results
+
+        tasks = [asyncio.create_task(run_batch(start)) for start in range(0, len(pdf_list), batch_size)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                start, results = await finished
+                yield [(start + offset, *result) for offset, result in enumerate(results)]
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def warm_up(self) -> asyncio.Future:
+        """
+        Start the workers (and their spaCy loads) before traffic arrives. The
+        submits happen right away, so process workers are forked from the
+        calling thread; the returned future resolves once every worker is up.
+        """
+        return asyncio.gather(*[asyncio.wrap_future(self._executor.submit(os.getpid)) for _ in range(self.workers)])
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
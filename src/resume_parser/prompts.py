@@ -0,0 +1,108 @@
+# prompts.py
+# Prompt templates used by the LLM chains. Bump the version when a template
+# changes so cached chains (and anything keyed on the prompt) move with it.
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from langchain_core.prompts import PromptTemplate
+
+FEEDBACK_TEMPLATE = """
+You are an expert technical hiring manager, you have a lot of experience in interviewing candidates and understand how the current tech market works, based on that you are to provide feedback. Given the following resume, analyze it and provide:
+
+1. Concise 5-6 points for improvement  
+2. Core strengths  
+3. Key areas for improvement  
+4. Recommended roles based on the profile (simply suggest 2-3 roles compliant with candidate resume).
+5. Make improvements on the tech corporate jargon, language used in the resume. The improved resume must not have any copy-pasted segments from previous resume.
+6. Make sure that the resume generated here is ATS-friendly and can by-pass AI checks and all the points written in the resume adhere to the Situation-Task-Action-Report + XYZ methodology but do no explicitly mention these terms in the resume, the points themselves should fit the context.
+7. Make sure that the resume is long enough to cover ONE A4 PAGE for candidate's experience from 0 years to 5 years.
+8. 2-3 project ideas aligned with current job trends (2024-2025)
+9. Your output must always be in plain text format. Do not use Markdown but bullet points,italics, headings, or code blocks are allowed. Write clean text lines only, exactly as they should appear in a resume.
+
+Resume:
+{resume_text}
+"""
+
+ROLE_TEMPLATE = """
+        You are a professional job description analyzer. Given the following job description, extract the primary role or position being advertised.
+        Job description is given as:
+        {job_text}
+        """
+
+IMPROVE_TEMPLATE = """
+You're a career assistant. Improve the resume using past resume versions and feedback.
+
+### Current Resume:
+{latest_resume}
+
+### Past Attempts (Resume + Feedback):
+{past_context}
+
+### Take into consideration the job descriptions provided by the user:
+{job_text}
+
+Now generate:
+- An improved resume with proper line breaks.
+- Do not generate markdown, simple text will do but make it formatted.
+- The text resume should have proper emboldening of tech stack names, numbers, etc. and proper italicisation of dates and links. Extract the links from the resume generated and if that is not possible, keep space for them in accurate positions.
+- 2-3 project ideas relevant to last 2 year job trends.
+"""
+
+REWRITE_TEMPLATE = """
+You're a career assistant. Improve the resume using past resume versions and feedback.
+
+### Current Resume:
+{latest_resume}
+
+### Past Attempts (Resume + Feedback):
+{past_context}
+
+### Job Description:
+{job_text}
+
+### Instructions:
+Provide your output in TWO sections:
+
+---TEXT---
+A cleaned, ATS-friendly plain text version of the resume.  
+- Use **bold** for tech stacks, numbers, and achievements.  
+- Use *italics* for dates and links.  
+- Ensure this text is human-readable and fits on ONE A4 page.  
+---ENDTEXT---
+
+---LATEX---
+A LaTeX formatted version of the improved resume (ready to compile).  
+- Use proper LaTeX syntax.  
+- Ensure formatting fits one A4 page.  
+- Do not leave any placeholder commands unresolved.  
+---ENDLATEX---
+"""
+
+SECTION_FEEDBACK_TEMPLATE = """
+You are an expert technical hiring manager reviewing one section of a candidate's resume. Give 2-4 concise, concrete points for improving this section only: wording, tech corporate jargon, measurable impact and ATS-friendliness. Points should follow the Situation-Task-Action-Result + XYZ style without naming those terms. Do not comment on other sections.
+Your output must be plain text lines, no Markdown headings or code blocks.
+
+Section: {section}
+
+{section_text}
+"""
+
+# name -> (version, input variables, template)
+PROMPTS = {
+    "feedback": ("v1", ["resume_text"], FEEDBACK_TEMPLATE),
+    "role": ("v1", ["job_text"], ROLE_TEMPLATE),
+    "improve": ("v1", ["latest_resume", "past_context", "job_text"], IMPROVE_TEMPLATE),
+    "rewrite": ("v1", ["latest_resume", "past_context", "job_text"], REWRITE_TEMPLATE),
+    "section_feedback": ("v1", ["section", "section_text"], SECTION_FEEDBACK_TEMPLATE),
+}
+
+
+def prompt_version(name: str) -> str:
+    return PROMPTS[name][0]
+
+
+def build_prompt(name: str) -> "PromptTemplate":
+    # Imported here so importing the templates doesn't pull in langchain_core
+    from langchain_core.prompts import PromptTemplate
+    _, input_variables, template = PROMPTS[name]
+    return PromptTemplate(input_variables=input_variables, template=template)
@@ -0,0 +1,282 @@
+# publish.py
+# Background dispatch of "publish resume" requests to the Jenkins pipeline.
+# Routes submit and return at once; each (user, role) gets at most one queued
+# publish, which absorbs re-publishes (latest source wins) until the user has
+# been quiet for the debounce window, capped at PUBLISH_MAX_DELAY_MS, so a
+# burst of clicks starts one pipeline run. Triggers go through one pooled
+# httpx client with timeouts and jittered retries on connection errors, 429s
+# and 5xx. Debouncing is per process: with several web workers, publishes
+# landing on different workers are not merged.
+import asyncio
+import os
+import random
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+import httpx
+
+from telemetry import get_logger, span
+
+logger = get_logger("publish")
+
+QUEUED = "queued"
+DISPATCHING = "dispatching"
+TRIGGERED = "triggered"
+FAILED = "failed"
+
+
+class PublishQueueFull(Exception):
+    """Raised when too many publishes are waiting; callers should back off."""
+
+
+class PublishClosed(Exception):
+    pass
+
+
+class _Publish:
+    __slots__ = ("id", "user_id", "role", "mode", "tex_content", "requests", "status", "attempts", "error",
+                 "file_path", "queue_url", "created_at", "dispatched_at", "finished_at", "first_at", "due",
+                 "nudge", "after")
+
+    def __init__(self, user_id, role, mode, tex_content, due, after):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.role = role
+        self.mode = mode
+        self.tex_content = tex_content
+        self.requests = 1
+        self.status = QUEUED
+        self.attempts = 0
+        self.error = None
+        self.file_path = None
+        self.queue_url = None
+        self.created_at = datetime.now()
+        self.dispatched_at = None
+        self.finished_at = None
+        self.first_at = time.monotonic()
+        self.due = due
+        self.nudge = asyncio.Event()  # set to re-check `due` early (shutdown)
+        self.after = after  # the same key's publish still being sent, if any
+
+    def view(self) -> dict:
+        return {
+            "publishId": self.id,
+            "userId": self.user_id,
+            "role": self.role,
+            "mode": self.mode,
+            "status": self.status,
+            "requests": self.requests,
+            "attempts": self.attempts,
+            "error": self.error,
+            "queueUrl": self.queue_url,
+            "createdAt": self.created_at.isoformat(),
+            "dispatchedAt": self.dispatched_at.isoformat() if self.dispatched_at else None,
+            "finishedAt": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class PublishDispatcher:
+    def __init__(self, url: str, user: str = None, token: str = None, write_source=None,
+                 debounce_s: float = 5.0, max_delay_s: float = 30.0, timeout_s: float = 10.0,
+                 max_retries: int = 3, base_backoff_s: float = 0.5, max_backoff_s: float = 8.0,
+                 max_pending: int = 1000, max_connections: int = 10, history: int = 1000, client=None):
+        self.url = url
+        self.auth = (user, token) if user and token else None
+        # write_source(user_id, role, tex) -> path, run in a thread just before
+        # the trigger so the pipeline picks up the latest source
+        self.write_source = write_source
+        self.debounce_s = debounce_s
+        self.max_delay_s = max_delay_s
+        self.timeout_s = timeout_s
+        self.max_retries = max_retries
+        self.base_backoff_s = base_backoff_s
+        self.max_backoff_s = max_backoff_s
+        self.max_pending = max_pending
+        self.max_connections = max_connections
+        self.history = history
+        self.client = client  # injectable, e.g. httpx.AsyncClient(transport=httpx.MockTransport(...))
+
+        self._queued = {}        # (user_id, role) -> publish waiting out its debounce window
+        self._dispatching = {}   # (user_id, role) -> task of the publish being sent
+        self._tasks = set()
+        self._recent = OrderedDict()  # publish id -> _Publish, for status lookups
+        self._closed = False
+        self.counters = {
+            "submitted": 0,
+            "coalesced": 0,
+            "dispatched": 0,
+            "triggered": 0,
+            "retried": 0,
+            "failed": 0,
+            "rejected": 0,
+        }
+
+    @classmethod
+    def from_env(cls, write_source=None):
+        return cls(
+            os.getenv("JENKINS_URL"),
+            user=os.getenv("JENKINS_USER"),
+            token=os.getenv("JENKINS_TOKEN"),
+            write_source=write_source,
+            debounce_s=float(os.getenv("PUBLISH_DEBOUNCE_MS", "5000")) / 1000,
+            max_delay_s=float(os.getenv("PUBLISH_MAX_DELAY_MS", "30000")) / 1000,
+            timeout_s=float(os.getenv("PUBLISH_TIMEOUT_S", "10")),
+            max_retries=int(os.getenv("PUBLISH_MAX_RETRIES", "3")),
+            max_pending=int(os.getenv("PUBLISH_MAX_PENDING", "1000")),
+            max_connections=int(os.getenv("PUBLISH_MAX_CONNECTIONS", "10")),
+        )
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.url and self.auth)
+
+    def start(self):
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout_s, connect=min(self.timeout_s, 5.0)),
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+            )
+
+    # ----------------- PRODUCER SIDE -----------------
+    def submit(self, user_id: str, role: str, mode: str, tex_content: str) -> tuple:
+        """(publish view, coalesced). A publish already queued for (user, role) absorbs this one."""
+        if self._closed:
+            raise PublishClosed("Publish dispatcher is shutting down")
+        key = (user_id, role)
+        now = time.monotonic()
+        self.counters["submitted"] += 1
+
+        queued = self._queued.get(key)
+        if queued is not None:
+            queued.mode, queued.tex_content = mode, tex_content
+            queued.requests += 1
+            # Trailing-edge debounce, but never pushed past max_delay_s from the first request
+            queued.due = min(now + self.debounce_s, queued.first_at + self.max_delay_s)
+            self.counters["coalesced"] += 1
+            return queued.view(), True
+
+        if len(self._queued) >= self.max_pending:
+            self.counters["rejected"] += 1
+            raise PublishQueueFull(f"{len(self._queued)} publishes already queued")
+        publish = _Publish(user_id, role, mode, tex_content, now + self.debounce_s, self._dispatching.get(key))
+        self._queued[key] = publish
+        self._remember(publish)
+        task = asyncio.create_task(self._run(key, publish))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return publish.view(), False
+
+    def status(self, publish_id: str):
+        publish = self._recent.get(publish_id)
+        return publish.view() if publish else None
+
+    def _remember(self, publish: _Publish):
+        self._recent[publish.id] = publish
+        while len(self._recent) > self.history:
+            oldest = next(iter(self._recent.values()))
+            if oldest.status in (QUEUED, DISPATCHING):
+                break
+            self._recent.popitem(last=False)
+
+    # ----------------- DISPATCH -----------------
+    async def _run(self, key: tuple, publish: _Publish):
+        # `due` moves later while requests keep coming in; sleep until it stops
+        while not self._closed:
+            delay = publish.due - time.monotonic()
+            if delay <= 0:
+                break
+            try:
+                await asyncio.wait_for(publish.nudge.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            publish.nudge.clear()
+
+        # One pipeline run per key at a time: wait for the previous one to be sent
+        # (this publish keeps absorbing re-publishes meanwhile)
+        if publish.after is not None:
+            await asyncio.gather(publish.after, return_exceptions=True)
+            publish.after = None
+
+        del self._queued[key]
+        self._dispatching[key] = asyncio.current_task()
+        try:
+            await self._dispatch(publish)
+        finally:
+            if self._dispatching.get(key) is asyncio.current_task():
+                del self._dispatching[key]
+
+    async def _dispatch(self, publish: _Publish):
+        publish.status = DISPATCHING
+        publish.dispatched_at = datetime.now()
+        self.counters["dispatched"] += 1
+        try:
+            if self.write_source and publish.tex_content:
+                publish.file_path = await asyncio.to_thread(
+                    self.write_source, publish.user_id, publish.role, publish.tex_content
+                )
+            publish.tex_content = None  # not kept around for the status history
+            with span("publish"):
+                response = await self._trigger(publish)
+        except Exception as e:
+            publish.status, publish.error = FAILED, publish.error or f"{type(e).__name__}: {e}"
+            self.counters["failed"] += 1
+            logger.error("[❌ PUBLISH] %s/%s failed after %s attempt(s): %s",
+                         publish.user_id, publish.role, publish.attempts, publish.error)
+        else:
+            publish.status = TRIGGERED
+            publish.queue_url = response.headers.get("location")
+            self.counters["triggered"] += 1
+            logger.info("[✅ PUBLISH] Pipeline triggered for %s/%s (%s request(s) coalesced)",
+                        publish.user_id, publish.role, publish.requests)
+        publish.finished_at = datetime.now()
+
+    async def _trigger(self, publish: _Publish):
+        params = {"user_id": publish.user_id, "role": publish.role, "mode": publish.mode}
+        while True:
+            publish.attempts += 1
+            try:
+                response = await self.client.post(self.url, params=params, auth=self.auth)
+            except httpx.TransportError as e:
+                # Connection refused/reset, DNS, and connect/read timeouts
+                publish.error = f"{type(e).__name__}: {e}"
+                retryable = True
+            else:
+                if response.status_code in (200, 201):
+                    publish.error = None
+                    return response
+                publish.error = f"Jenkins returned {response.status_code}: {response.text[:200]}"
+                retryable = response.status_code == 429 or response.status_code >= 500
+            if not retryable or publish.attempts > self.max_retries or self._closed:
+                raise RuntimeError(publish.error)
+            self.counters["retried"] += 1
+            await asyncio.sleep(self._backoff(publish.attempts - 1))
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: uniform in [0, min(cap, base * 2^attempt)]
+        return random.uniform(0, min(self.max_backoff_s, self.base_backoff_s * (2 ** attempt)))
+
+    # ----------------- LIFECYCLE -----------------
+    async def close(self, timeout_s: float = 30.0):
+        """Stop accepting publishes, send the queued ones now, and close the client."""
+        self._closed = True
+        for publish in self._queued.values():
+            publish.nudge.set()
+        if self._tasks:
+            done, pending = await asyncio.wait(set(self._tasks), timeout=timeout_s)
+            if pending:
+                logger.warning("[⚠️ PUBLISH] Shutdown timed out with %s publishes unsent", len(pending))
+                for task in pending:
+                    task.cancel()
+        if self.client is not None:
+            await self.client.aclose()
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "configured": self.configured,
+            "queued": len(self._queued),
+            "dispatching": len(self._dispatching),
+        }
@@ -0,0 +1,197 @@
+# rag_context.py
+# Section-level chunking of stored feedback and token-budgeted assembly of the
+# retrieved chunks into the `past_context` prompt slot. Chunks are small and
+# individually ranked, so prompt size stays flat as a user's history grows.
+import os
+import re
+
+from prompts import PROMPTS
+
+# Rough chars-per-token for English text; good enough for budgeting and
+# reporting, and avoids a tokenizer dependency for a model we don't host
+CHARS_PER_TOKEN = 4
+
+SECTION_NAMES = {
+    "summary", "profile", "objective", "about", "experience", "work experience",
+    "professional experience", "employment", "education", "skills", "technical skills",
+    "projects", "certifications", "achievements", "awards", "publications", "leadership",
+    "activities", "interests", "languages", "contact", "strengths", "core strengths",
+    "areas for improvement", "key areas for improvement", "points for improvement",
+    "recommended roles", "project ideas",
+}
+_NUMBERING_RE = re.compile(r"^\s*(?:\d+[.)]|[-*•#]+)\s*")
+_WORD_RE = re.compile(r"[a-z0-9+#]+")
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def prompt_tokens(name: str, inputs: dict) -> int:
+    """Estimated size of the rendered prompt for chain `name`."""
+    return estimate_tokens(PROMPTS[name][2].format(**inputs))
+
+
+def _heading(line: str):
+    stripped = _NUMBERING_RE.sub("", line.strip()).strip().rstrip(":").strip()
+    if not stripped or len(stripped) > 40:
+        return None
+    if stripped.lower() in SECTION_NAMES or (stripped.isupper() and len(stripped.split()) <= 4):
+        return stripped.title()
+    return None
+
+
+def split_sections(text: str, default: str) -> list:
+    """[(section, body)] split on resume / feedback headings."""
+    sections = []
+    current, lines = default, []
+    for line in text.splitlines():
+        heading = _heading(line)
+        if heading:
+            if any(l.strip() for l in lines):
+                sections.append((current, "\n".join(lines).strip()))
+            current, lines = heading, []
+        else:
+            lines.append(line)
+    if any(l.strip() for l in lines):
+        sections.append((current, "\n".join(lines).strip()))
+    return sections
+
+
+def _split_body(body: str, max_chars: int) -> list:
+    # Pack paragraphs (then lines, for very long paragraphs) up to max_chars
+    pieces = []
+    for paragraph in re.split(r"\n\s*\n", body):
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph.strip())
+        else:
+            pieces.extend(line.strip() for line in paragraph.splitlines())
+    chunks, current = [], ""
+    for piece in filter(None, pieces):
+        if current and len(current) + len(piece) + 1 > max_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    # A single line longer than the limit is cut rather than dropped
+    return [chunk[i:i + max_chars] for chunk in chunks for i in range(0, len(chunk), max_chars)]
+
+
+def chunk_feedback(resume_text: str, feedback: str, max_tokens: int = None) -> list:
+    """
+    Split one resume + feedback pair into section-level chunks, each a dict
+    with `kind` ("resume" or "feedback"), `section` and `text`.
+    """
+    max_tokens = max_tokens or int(os.getenv("RAG_CHUNK_TOKENS", "160"))
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    chunks = []
+    for kind, text in (("resume", resume_text), ("feedback", feedback)):
+        for section, body in split_sections(text or "", default=kind.title()):
+            for piece in _split_body(body, max_chars):
+                chunks.append({"kind": kind, "section": section, "text": piece})
+    return chunks
+
+
+def _shingles(text: str) -> set:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < 3:
+        return set(words)
+    return {" ".join(words[i:i + 3]) for i in range(len(words) - 2)}
+
+
+def _jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 1.0 if a == b else 0.0
+    return len(a & b) / len(a | b)
+
+
+class ContextStats:
+    def __init__(self):
+        self.assembled = 0
+        self.candidates = 0
+        self.duplicates = 0
+        self.packed = 0
+        self.candidate_tokens = 0
+        self.context_tokens = 0
+        self.prompt_tokens = 0
+
+    def as_dict(self) -> dict:
+        n = self.assembled or 1
+        return {
+            "assembled": self.assembled,
+            "avg_candidates": round(self.candidates / n, 2),
+            "avg_duplicates": round(self.duplicates / n, 2),
+            "avg_packed": round(self.packed / n, 2),
+            "avg_candidate_tokens": round(self.candidate_tokens / n, 1),
+            "avg_context_tokens": round(self.context_tokens / n, 1),
+            "avg_prompt_tokens": round(self.prompt_tokens / n, 1),
+        }
+
+
+stats = ContextStats()
+
+
+class ContextAssembler:
+    def __init__(self, budget_tokens: int = 600, dedupe_threshold: float = 0.85, min_fragment_tokens: int = 48):
+        self.budget_tokens = budget_tokens
+        self.dedupe_threshold = dedupe_threshold
+        self.min_fragment_tokens = min_fragment_tokens
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            budget_tokens=int(os.getenv("RAG_CONTEXT_TOKENS", "600")),
+            dedupe_threshold=float(os.getenv("RAG_DEDUPE_THRESHOLD", "0.85")),
+        )
+
+    @staticmethod
+    def _render(hit) -> str:
+        props = hit.properties
+        section = props.get("section")
+        # Objects stored before chunking carry the whole blob and no section
+        label = f"[{props.get('kind', 'feedback').title()}: {section}]\n" if section else ""
+        return label + props["text"]
+
+    def assemble(self, hits: list):
+        """
+        Returns (context, report). Hits are ranked by similarity (unscored
+        hits keep their order after the scored ones), near-duplicates are
+        dropped, and chunks are packed greedily until the budget is spent.
+        """
+        ranked = sorted(enumerate(hits), key=lambda ih: (ih[1].score is None, -(ih[1].score or 0), ih[0]))
+        kept, seen, duplicates, used = [], [], 0, 0
+        candidate_tokens = 0
+        for _, hit in ranked:
+            text = self._render(hit)
+            tokens = estimate_tokens(text)
+            candidate_tokens += tokens
+            shingles = _shingles(hit.properties["text"])
+            if any(_jaccard(shingles, other) >= self.dedupe_threshold for other in seen):
+                duplicates += 1
+                continue
+            remaining = self.budget_tokens - used
+            if tokens > remaining:
+                if remaining < self.min_fragment_tokens:
+                    continue
+                text = text[:remaining * CHARS_PER_TOKEN]
+                tokens = estimate_tokens(text)
+            seen.append(shingles)
+            kept.append(text)
+            used += tokens
+
+        report = {
+            "candidates": len(hits),
+            "duplicates": duplicates,
+            "packed": len(kept),
+            "candidate_tokens": candidate_tokens,
+            "context_tokens": used,
+            "budget_tokens": self.budget_tokens,
+        }
+        stats.assembled += 1
+        stats.candidates += len(hits)
+        stats.duplicates += duplicates
+        stats.packed += len(kept)
+        stats.candidate_tokens += candidate_tokens
+        stats.context_tokens += used
+        return "\n\n---\n\n".join(kept), report
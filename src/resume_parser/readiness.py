@@ -0,0 +1,117 @@
+# readiness.py
+# Startup bookkeeping. Each dependency (Mongo, parse workers, LLM chains,
+# vector store) is initialized as a named component with its own timeout, so
+# independent ones come up concurrently and a slow one can't hang the rest.
+# /healthz answers as soon as the process serves HTTP; /readyz only once every
+# required component is up. Until then ReadinessGate answers 503 for the API.
+import asyncio
+import os
+import time
+
+from starlette.responses import JSONResponse
+
+from telemetry import STARTUP_SECONDS, get_logger
+
+logger = get_logger("startup")
+
+PENDING = "pending"
+READY = "ready"
+FAILED = "failed"
+
+
+def startup_timeout_s() -> float:
+    return float(os.getenv("STARTUP_TIMEOUT_S", "30"))
+
+
+class Component:
+    def __init__(self, name: str, required: bool):
+        self.name = name
+        self.required = required
+        self.state = PENDING
+        self.error = None
+        self.seconds = None
+
+    def view(self) -> dict:
+        view = {"state": self.state, "required": self.required}
+        if self.seconds is not None:
+            view["seconds"] = round(self.seconds, 3)
+        if self.error:
+            view["error"] = self.error
+        return view
+
+
+class Readiness:
+    def __init__(self, started: float = None, clock=time.perf_counter):
+        self.clock = clock
+        self.started = clock() if started is None else started  # cold-start totals count from here
+        self.ready_after_s = None
+        self.components = {}
+
+    def add(self, name: str, required: bool = True) -> Component:
+        # Registered up front so /readyz lists everything, including what hasn't started
+        self.components[name] = Component(name, required)
+        return self.components[name]
+
+    def mark(self, name: str, seconds: float):
+        """Record a step timed elsewhere (e.g. module import) as already done."""
+        component = self.components.get(name) or self.add(name, required=False)
+        component.state, component.seconds = READY, seconds
+        STARTUP_SECONDS.labels(name).set(seconds)
+
+    async def run(self, name: str, init, timeout_s: float = None) -> bool:
+        """Await `init()` within the timeout; False (and the error recorded) if it failed."""
+        component = self.components.get(name) or self.add(name)
+        started = self.clock()
+        try:
+            await asyncio.wait_for(init(), timeout_s or startup_timeout_s())
+        except asyncio.TimeoutError:
+            component.state, component.error = FAILED, f"timed out after {timeout_s or startup_timeout_s()}s"
+        except Exception as e:
+            component.state, component.error = FAILED, f"{type(e).__name__}: {e}"
+        else:
+            component.state = READY
+        component.seconds = self.clock() - started
+        STARTUP_SECONDS.labels(name).set(component.seconds)
+
+        if component.state == FAILED:
+            log = logger.error if component.required else logger.warning
+            log("[❌ STARTUP] %s failed after %.2fs: %s", name, component.seconds, component.error)
+            return False
+        logger.info("[✅ STARTUP] %s ready in %.2fs", name, component.seconds)
+        if self.ready and self.ready_after_s is None:
+            self.ready_after_s = self.clock() - self.started
+            STARTUP_SECONDS.labels("total").set(self.ready_after_s)
+            logger.info("[✅ STARTUP] Ready to serve %.2fs after import", self.ready_after_s)
+        return True
+
+    @property
+    def ready(self) -> bool:
+        return all(c.state == READY for c in self.components.values() if c.required)
+
+    @property
+    def failed(self) -> bool:
+        # A required component that won't come up: the process should be restarted
+        return any(c.state == FAILED for c in self.components.values() if c.required)
+
+    def report(self) -> dict:
+        return {
+            "ready": self.ready,
+            "readyAfterSeconds": round(self.ready_after_s, 3) if self.ready_after_s is not None else None,
+            "components": {name: c.view() for name, c in self.components.items()},
+        }
+
+
+class ReadinessGate:
+    """ASGI middleware: 503 + Retry-After for every path but the probes until ready."""
+
+    def __init__(self, app, readiness: Readiness, exempt=("/healthz", "/readyz", "/metrics")):
+        self.app = app
+        self.readiness = readiness
+        self.exempt = tuple(exempt)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.readiness.ready or scope["path"] in self.exempt:
+            return await self.app(scope, receive, send)
+        detail = "Service failed to start" if self.readiness.failed else "Service is starting, please retry shortly"
+        response = JSONResponse({"detail": detail}, status_code=503, headers={"Retry-After": "2"})
+        await response(scope, receive, send)
@@ -0,0 +1,91 @@
+# resume_files.py
+# PDF bodies live in GridFS (bucket "resume_files") so neither `resumes`
+# nor `resume_blobs` carries megabytes of binary per document, and downloads
+# can be streamed chunk by chunk.
+import re
+from io import BytesIO
+
+from gridfs import AsyncGridFSBucket
+from gridfs.errors import NoFile
+
+BUCKET_NAME = "resume_files"
+CHUNK_SIZE = 255 * 1024  # GridFS default, also used as the streaming read size
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class InvalidRange(Exception):
+    pass
+
+
+class ResumeFileStore:
+    def __init__(self, db, bucket_name: str = BUCKET_NAME):
+        # In-memory databases (fake_mongo) bring their own bucket. Checked on the
+        # type: attribute access on a real Database returns a collection
+        if hasattr(type(db), "create_gridfs_bucket"):
+            self.bucket = db.create_gridfs_bucket(bucket_name=bucket_name, chunk_size_bytes=CHUNK_SIZE)
+        else:
+            self.bucket = AsyncGridFSBucket(db, bucket_name=bucket_name, chunk_size_bytes=CHUNK_SIZE)
+
+    async def put(self, digest: str, pdf, filename: str = None):
+        # `pdf` is bytes or a binary file object, read chunk by chunk into GridFS
+        source = BytesIO(pdf) if isinstance(pdf, (bytes, bytearray)) else pdf
+        return await self.bucket.upload_from_stream(
+            filename or f"{digest}.pdf",
+            source,
+            metadata={"contentHash": digest, "contentType": "application/pdf"},
+        )
+
+    async def open(self, file_id):
+        try:
+            return await self.bucket.open_download_stream(file_id)
+        except NoFile:
+            return None
+
+    async def delete(self, file_id):
+        try:
+            await self.bucket.delete(file_id)
+        except NoFile:
+            pass
+
+
+def parse_range(header: str, size: int):
+    """
+    Parse a single-range `Range: bytes=...` header into an inclusive (start, end).
+    Multi-range requests are not supported and fall back to the full body.
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None
+
+    start, end = match.groups()
+    if not start and not end:
+        raise InvalidRange(header)
+    if not start:
+        # Suffix range: last N bytes
+        length = int(end)
+        if length == 0:
+            raise InvalidRange(header)
+        return max(size - length, 0), size - 1
+
+    start = int(start)
+    end = int(end) if end else size - 1
+    if start >= size or end < start:
+        raise InvalidRange(header)
+    return start, min(end, size - 1)
+
+
+async def iter_file(grid_out, start: int = 0, end: int = None, chunk_size: int = CHUNK_SIZE):
+    # Yields at most one chunk at a time so memory stays flat regardless of file size
+    end = grid_out.length - 1 if end is None else end
+    await grid_out.seek(start)
+    remaining = end - start + 1
+    try:
+        while remaining > 0:
+            data = await grid_out.read(min(chunk_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+    finally:
+        await grid_out.close()
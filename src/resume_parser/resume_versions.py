@@ -0,0 +1,224 @@
+# resume_versions.py
+# Links each upload to the user's previous resume and diffs the two at
+# section level. Sections are identified by name and fingerprinted by their
+# normalized text, so a revised resume only pays for the sections that
+# changed: NER in the parse worker, embedding in the vector store and the
+# per-section Gemini feedback pass all reuse results keyed by fingerprint.
+import asyncio
+import base64
+import hashlib
+import json
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+from llm_cache import normalize_text
+from llm_registry import registry
+from rag_context import prompt_tokens, split_sections
+
+DEFAULT_SECTION = "Summary"
+SUMMARY_CHARS = 280
+
+
+def section_hash(text: str) -> str:
+    # Whitespace and reflow differences from PDF extraction don't count as edits
+    return hashlib.sha256(normalize_text(text).lower().encode("utf-8")).hexdigest()[:16]
+
+
+def resume_sections(text: str) -> list:
+    """[{"name", "hash", "text"}] in document order; repeated headings get a suffix."""
+    sections, seen = [], {}
+    for name, body in split_sections(text or "", default=DEFAULT_SECTION):
+        seen[name] = seen.get(name, 0) + 1
+        if seen[name] > 1:
+            name = f"{name} ({seen[name]})"
+        sections.append({"name": name, "hash": section_hash(body), "text": body})
+    return sections
+
+
+def section_skills(doc) -> dict:
+    """fingerprint -> skills from a stored version, for the parse worker to reuse."""
+    if not doc:
+        return {}
+    return {s["hash"]: s["skills"] for s in doc.get("sections") or [] if "skills" in s}
+
+
+def diff_sections(previous: list, current: list) -> dict:
+    before = {s["name"]: s["hash"] for s in previous or []}
+    after = {s["name"]: s["hash"] for s in current or []}
+    return {
+        "changed": [name for name in after if name in before and before[name] != after[name]],
+        "added": [name for name in after if name not in before],
+        "removed": [name for name in before if name not in after],
+        "unchanged": [name for name in after if before.get(name) == after[name]],
+    }
+
+
+async def ensure_indexes(collection):
+    # A user's history page by page (_id breaks ties between equal upload
+    # times); its prefix also serves the latest-version lookup for linking uploads
+    await collection.create_index([("userId", ASCENDING), ("uploadedAt", DESCENDING), ("_id", DESCENDING)],
+                                  name="userId_uploadedAt_id")
+    # The two-field index it replaces only costs writes now
+    try:
+        await collection.drop_index("userId_uploadedAt")
+    except OperationFailure:
+        pass  # never created, or already dropped by another instance
+
+
+async def latest_version(collection, user_id: str):
+    return await collection.find_one(
+        {"userId": user_id},
+        {"sections": 1, "uploadedAt": 1},
+        sort=[("uploadedAt", DESCENDING)],
+    )
+
+
+def summary_excerpt(text: str) -> str:
+    """The first SUMMARY_CHARS of the parsed text, stored on the resume for history listings."""
+    text = normalize_text(text or "")
+    return text if len(text) <= SUMMARY_CHARS else text[:SUMMARY_CHARS].rsplit(" ", 1)[0] + "…"
+
+
+def version_fields(previous, sections: list) -> dict:
+    """Fields added to a new resume document: the link, its sections and the diff."""
+    fields = {"sections": [{k: v for k, v in s.items() if k != "text"} for s in sections]}
+    if previous:
+        fields["previousId"] = previous["_id"]
+        fields["changes"] = diff_sections(previous.get("sections"), sections)
+    return fields
+
+
+# ----------------- INCREMENTAL FEEDBACK -----------------
+def _feedback_key() -> str:
+    # Stored feedback is only reused by the same model and prompt version
+    return "|".join(str(part) for part in registry.key_for("section_feedback"))
+
+
+def _stored_feedback(doc, key: str) -> dict:
+    analysis = (doc or {}).get("analysis") or {}
+    return analysis.get("sections", {}) if analysis.get("key") == key else {}
+
+
+def section_inputs(section: dict) -> dict:
+    return {"section": section["name"], "section_text": section["text"]}
+
+
+async def section_feedback(collection, blobs, resume_id: str, generate):
+    """
+    Feedback for every section of a stored resume, awaiting `generate(section)`
+    only for sections whose fingerprint has no stored feedback on this version
+    or the one it was linked to. Returns (result, freshly generated sections
+    with their feedback), or (None, []) if the resume doesn't exist.
+    """
+    if not ObjectId.is_valid(resume_id):
+        return None, []
+    doc = await collection.find_one({"_id": ObjectId(resume_id)},
+                                    {"userId": 1, "blobId": 1, "previousId": 1, "analysis": 1})
+    if not doc:
+        return None, []
+    blob = await blobs.find_one({"_id": doc["blobId"]}, {"parsedText": 1})
+    sections = resume_sections(blob["parsedText"] if blob else "")
+
+    key = _feedback_key()
+    known = _stored_feedback(doc, key)
+    if doc.get("previousId"):
+        previous = await collection.find_one({"_id": doc["previousId"]}, {"analysis": 1})
+        known = {**_stored_feedback(previous, key), **known}
+
+    todo = [s for s in sections if s["hash"] not in known]
+    generated = await asyncio.gather(*(generate(s) for s in todo))
+    fresh = [{**s, "feedback": feedback} for s, feedback in zip(todo, generated)]
+
+    feedback = {**known, **{s["hash"]: s["feedback"] for s in fresh}}
+    current = {s["hash"]: feedback[s["hash"]] for s in sections}
+    await collection.update_one({"_id": doc["_id"]}, {"$set": {"analysis": {"key": key, "sections": current}}})
+
+    fresh_hashes = {s["hash"] for s in fresh}
+    tokens = lambda items: sum(prompt_tokens("section_feedback", section_inputs(s)) for s in items)
+    result = {
+        "resumeId": resume_id,
+        "userId": doc.get("userId"),
+        "feedback": "\n\n".join(f"{s['name']}:\n{current[s['hash']]}" for s in sections),
+        "sections": [
+            {"name": s["name"], "status": "generated" if s["hash"] in fresh_hashes else "reused",
+             "feedback": current[s["hash"]]}
+            for s in sections
+        ],
+        "report": {
+            "sections": len(sections),
+            "generated": len(fresh),
+            "reused": len(sections) - len(fresh),
+            "prompt_tokens": tokens(todo),
+            "prompt_tokens_saved": tokens(s for s in sections if s["hash"] not in fresh_hashes),
+        },
+    }
+    return result, fresh
+
+
+# ----------------- HISTORY -----------------
+class InvalidCursor(Exception):
+    pass
+
+
+# Listing fields only: never the embedded PDF (file_data) or parsedText of
+# pre-GridFS documents, nor the per-section hashes and stored feedback
+HISTORY_FIELDS = {"filename": 1, "uploadedAt": 1, "contentHash": 1, "skills": 1, "previousId": 1, "changes": 1}
+# Cut to SUMMARY_CHARS on the server whatever is stored: the summary, or
+# parsedText on documents from before summaries were stored
+SUMMARY_PROJECTION = {"$substrCP": [{"$ifNull": ["$summary", {"$ifNull": ["$parsedText", ""]}]}, 0, SUMMARY_CHARS]}
+
+
+def encode_cursor(doc: dict) -> str:
+    raw = json.dumps([doc["uploadedAt"].isoformat(), str(doc["_id"])])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        uploaded_at, resume_id = json.loads(raw)
+        return datetime.fromisoformat(uploaded_at), ObjectId(resume_id)
+    except Exception:
+        raise InvalidCursor(cursor)
+
+
+async def history_page(collection, user_id: str, limit: int = 20, cursor: str = None, summary: bool = False):
+    """
+    One page of a user's uploads, newest first: (items, next cursor or None).
+    Keyset pagination on (uploadedAt, _id) walks the userId_uploadedAt_id
+    index from where the previous page stopped, so deep pages cost the same
+    as the first and concurrent uploads don't shift items between pages.
+    """
+    query = {"userId": user_id}
+    if cursor:
+        uploaded_at, last_id = decode_cursor(cursor)
+        query["$or"] = [
+            {"uploadedAt": {"$lt": uploaded_at}},
+            {"uploadedAt": uploaded_at, "_id": {"$lt": last_id}},
+        ]
+    projection = {**HISTORY_FIELDS, "summary": SUMMARY_PROJECTION} if summary else HISTORY_FIELDS
+
+    # One extra document tells whether there is a next page
+    docs = await collection.find(query, projection).sort(
+        [("uploadedAt", DESCENDING), ("_id", DESCENDING)]
+    ).limit(limit + 1).to_list(limit + 1)
+    page, more = docs[:limit], len(docs) > limit
+
+    items = []
+    for doc in page:
+        item = {
+            "resumeId": str(doc["_id"]),
+            "filename": doc.get("filename"),
+            "uploadedAt": doc["uploadedAt"].isoformat() if doc.get("uploadedAt") else None,
+            "contentHash": doc.get("contentHash"),
+            "skills": doc.get("skills") or [],
+            "previousId": str(doc["previousId"]) if doc.get("previousId") else None,
+            "changes": doc.get("changes"),
+        }
+        if summary:
+            item["summary"] = doc.get("summary") or None
+        items.append(item)
+    return items, encode_cursor(page[-1]) if more else None
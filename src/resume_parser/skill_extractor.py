@@ -0,0 +1,89 @@
+# skill_extractor.py
+# Builds the spaCy pipeline used by the parse workers: the stock model with
+# every component we don't read disabled, plus an EntityRuler compiled from
+# the skills gazetteer (data/skills.txt) so SKILL entities actually exist.
+# Phrase patterns go through spaCy's PhraseMatcher, so matching cost grows
+# with document length, not with the number of terms.
+import hashlib
+import os
+from importlib.metadata import version
+
+DEFAULT_GAZETTEER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "skills.txt")
+
+# Nothing downstream reads POS tags, parses or lemmas. The stock English
+# models give ner its own tok2vec, so the shared one can go as well.
+UNUSED_COMPONENTS = ["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer", "senter", "morphologizer"]
+
+
+def gazetteer_path() -> str:
+    return os.getenv("SKILLS_GAZETTEER") or DEFAULT_GAZETTEER
+
+
+def skill_labels() -> tuple:
+    # SKILL only by default; add e.g. ORG to also keep statistical NER output
+    return tuple(label.strip() for label in os.getenv("SKILL_LABELS", "SKILL").split(",") if label.strip())
+
+
+def load_gazetteer(path: str = None) -> list:
+    """[(canonical name, [terms])]; a term starting with "=" is case-exact."""
+    entries = []
+    with open(path or gazetteer_path(), encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            terms = [term.strip() for term in line.split("|") if term.strip()]
+            entries.append((terms[0].lstrip("="), terms))
+    return entries
+
+
+def skill_patterns(nlp, entries: list) -> list:
+    patterns = []
+    for canonical, terms in entries:
+        for term in terms:
+            if term.startswith("="):
+                # Exact-case token pattern, e.g. "Go" the language but not "go"
+                tokens = [{"ORTH": token.text} for token in nlp.make_doc(term[1:])]
+                patterns.append({"label": "SKILL", "pattern": tokens, "id": canonical})
+            else:
+                patterns.append({"label": "SKILL", "pattern": term, "id": canonical})
+    return patterns
+
+
+def pipeline_version(model_name: str) -> str:
+    """Changes whenever the extraction output could change; keys the parse cache."""
+    digest = hashlib.sha256()
+    with open(gazetteer_path(), "rb") as f:
+        digest.update(f.read())
+    digest.update(f"{model_name}|{','.join(skill_labels())}|{version('spacy')}".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def build_nlp(model_name: str, labels: tuple = None):
+    # Imported on the first pipeline build (in the parse workers), not when the module is imported
+    import spacy
+
+    labels = labels or skill_labels()
+    needs_ner = any(label != "SKILL" for label in labels)
+    if needs_ner:
+        nlp = spacy.load(model_name, exclude=UNUSED_COMPONENTS)
+    else:
+        # Gazetteer only: the model's tokenizer is all we need
+        try:
+            nlp = spacy.load(model_name, exclude=UNUSED_COMPONENTS + ["ner"])
+        except OSError:
+            nlp = spacy.blank("en")
+
+    ruler_config = {"phrase_matcher_attr": "LOWER", "validate": False}
+    if "ner" in nlp.pipe_names:
+        # Gazetteer matches win over the statistical model's guesses
+        ruler = nlp.add_pipe("entity_ruler", before="ner", config=ruler_config)
+    else:
+        ruler = nlp.add_pipe("entity_ruler", config=ruler_config)
+    ruler.add_patterns(skill_patterns(nlp, load_gazetteer()))
+    return nlp
+
+
+def extract_skills(doc, labels: tuple) -> list:
+    # Canonical names for gazetteer hits ("k8s" -> "Kubernetes"), raw text otherwise
+    return list({ent.ent_id_ or ent.text for ent in doc.ents if ent.label_ in labels})
@@ -0,0 +1,108 @@
+# sse.py
+# Helpers for streaming LLM output to the browser as Server-Sent Events.
+import json
+import re
+import time
+
+from telemetry import get_logger
+
+logger = get_logger("sse")
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no",  # keep nginx from buffering the stream
+}
+
+_MARKER_RE = re.compile(r"---(END)?([A-Z]+)---")
+# Tail of the buffer that could still grow into a marker on the next chunk
+_PARTIAL_MARKER_RE = re.compile(r"-{1,3}[A-Z]*-{0,2}$")
+
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def chunk_text(chunk) -> str:
+    content = chunk.content if hasattr(chunk, "content") else chunk
+    if isinstance(content, list):
+        # Some providers stream content blocks instead of plain strings
+        return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    return content or ""
+
+
+class GenerationTimer:
+    """Tracks time-to-first-token and total latency for one streamed generation."""
+
+    def __init__(self, route: str):
+        self.route = route
+        self.started = time.perf_counter()
+        self.first_token_at = None
+
+    def mark_token(self):
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+
+    def finish(self) -> dict:
+        total = time.perf_counter() - self.started
+        ttft = (self.first_token_at - self.started) if self.first_token_at else None
+        timings = {
+            "ttft_ms": round(ttft * 1000, 1) if ttft is not None else None,
+            "total_ms": round(total * 1000, 1),
+        }
+        logger.info("[⏱️ LLM] %s ttft=%sms total=%sms", self.route, timings['ttft_ms'], timings['total_ms'])
+        return timings
+
+
+class SectionStreamParser:
+    """
+    Incrementally splits `---TAG--- ... ---ENDTAG---` sections out of a token
+    stream, even when a marker is split across chunks.
+    Yields (event, data) tuples for section_start / section_delta / section_end.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.section = None
+        self.sections = {}
+
+    def feed(self, text: str):
+        self.buffer += text
+        events = []
+
+        while True:
+            match = _MARKER_RE.search(self.buffer)
+            if not match:
+                break
+            self._emit_delta(self.buffer[:match.start()], events)
+            is_end, tag = match.group(1), match.group(2).lower()
+            if is_end:
+                if self.section == tag:
+                    events.append(("section_end", {"section": tag}))
+                    self.section = None
+            else:
+                self.section = tag
+                self.sections.setdefault(tag, "")
+                events.append(("section_start", {"section": tag}))
+            self.buffer = self.buffer[match.end():]
+
+        partial = _PARTIAL_MARKER_RE.search(self.buffer)
+        cut = partial.start() if partial else len(self.buffer)
+        self._emit_delta(self.buffer[:cut], events)
+        self.buffer = self.buffer[cut:]
+        return events
+
+    def close(self):
+        events = []
+        self._emit_delta(self.buffer, events)
+        self.buffer = ""
+        if self.section:
+            # Model stopped without closing the section; treat end of stream as the close
+            events.append(("section_end", {"section": self.section}))
+            self.section = None
+        return events
+
+    def _emit_delta(self, text: str, events: list):
+        if text and self.section:
+            self.sections[self.section] += text
+            events.append(("section_delta", {"section": self.section, "text": text}))
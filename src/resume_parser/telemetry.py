@@ -0,0 +1,217 @@
+# telemetry.py
+# Timing spans, Prometheus metrics and logging. Every stage of a request
+# (upload read, PDF extraction, NER, Mongo, vector store, Gemini) is timed
+# with span() and exported as a histogram labelled by route template and
+# stage. A request sent with an X-Trace-Id header gets its spans back in a
+# Server-Timing header, and the id is stamped on every log line it produces.
+# Logging goes through a QueueHandler so the event loop never blocks on
+# stdout; a listener thread does the actual writes.
+import atexit
+import logging
+import os
+import queue
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import REGISTRY, multiprocess
+from pymongo import monitoring
+from starlette.routing import Match
+
+TRACE_HEADER = "x-trace-id"
+
+# Up to a minute: Gemini calls and bulk parses run long
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+REQUEST_SECONDS = Histogram(
+    "skillbridge_request_seconds", "HTTP request latency", ["route", "method", "status"], buckets=BUCKETS,
+)
+STAGE_SECONDS = Histogram(
+    "skillbridge_stage_seconds", "Time spent per request stage", ["route", "stage"], buckets=BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "skillbridge_llm_tokens_total", "LLM tokens by chain and direction (in/out)", ["chain", "direction"],
+)
+CACHE_EVENTS = Counter(
+    "skillbridge_cache_events_total", "Cache lookups by cache and result", ["cache", "result"],
+)
+STARTUP_SECONDS = Gauge(
+    "skillbridge_startup_seconds", "Cold-start time per component (total = import to ready)", ["component"],
+    multiprocess_mode="max",
+)
+
+# Work outside a request (ingestion flushes, job workers) is labelled "background"
+_route = ContextVar("route", default="background")
+_trace = ContextVar("trace", default=None)
+
+
+class RequestTrace:
+    def __init__(self, trace_id: str):
+        self.id = trace_id
+        self.spans = []  # (stage, seconds) in completion order
+
+    def server_timing(self) -> str:
+        totals = {}
+        for stage, seconds in self.spans:
+            totals[stage] = totals.get(stage, 0.0) + seconds
+        return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in totals.items())
+
+
+def current_trace_id():
+    trace = _trace.get()
+    return trace.id if trace else None
+
+
+def record(stage: str, seconds: float):
+    STAGE_SECONDS.labels(_route.get(), stage).observe(seconds)
+    trace = _trace.get()
+    if trace is not None:
+        trace.spans.append((stage, seconds))
+
+
+@contextmanager
+def span(stage: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - started)
+
+
+def count_tokens(chain: str, tokens_in: int, tokens_out: int):
+    LLM_TOKENS.labels(chain, "in").inc(tokens_in)
+    LLM_TOKENS.labels(chain, "out").inc(tokens_out)
+
+
+def cache_event(cache: str, result: str):
+    CACHE_EVENTS.labels(cache, result).inc()
+
+
+# ----------------- MONGO -----------------
+class MongoTimingListener(monitoring.CommandListener):
+    """Every Mongo command (GridFS chunks included) counts towards the "mongo" stage."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        record("mongo", event.duration_micros / 1e6)
+
+    def failed(self, event):
+        record("mongo", event.duration_micros / 1e6)
+
+
+# ----------------- HTTP -----------------
+def _route_template(scope) -> str:
+    # Label by template ("/api/jobs/{job_id}"), never by raw path, to bound cardinality
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", scope["path"])
+    return "unmatched"
+
+
+class TimingMiddleware:
+    """ASGI middleware: request histogram, route label for spans, optional tracing."""
+
+    def __init__(self, app, trace_all: bool = False):
+        self.app = app
+        self.trace_all = trace_all
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        route = _route_template(scope)
+        headers = dict(scope.get("headers") or [])
+        trace_id = headers.get(TRACE_HEADER.encode("latin-1"), b"").decode("latin-1")
+        if not trace_id and self.trace_all:
+            trace_id = uuid.uuid4().hex
+        trace = RequestTrace(trace_id[:64]) if trace_id else None
+
+        route_token = _route.set(route)
+        trace_token = _trace.set(trace)
+        status = 500
+        started = time.perf_counter()
+
+        async def timed_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if trace is not None:
+                    # Spans finished before the headers go out; streamed stages land in the histograms only
+                    extra = [(b"x-trace-id", trace.id.encode("latin-1"))]
+                    timing = trace.server_timing()
+                    if timing:
+                        extra.append((b"server-timing", timing.encode("latin-1")))
+                    message = {**message, "headers": list(message.get("headers", [])) + extra}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            REQUEST_SECONDS.labels(route, scope["method"], str(status)).observe(time.perf_counter() - started)
+            _route.reset(route_token)
+            _trace.reset(trace_token)
+
+
+def metrics_payload():
+    """(body, content type) for GET /metrics."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # Several worker processes: aggregate what each one wrote to the shared directory
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+# ----------------- LOGGING -----------------
+class _TraceFilter(logging.Filter):
+    # Runs on the caller's side of the queue, where the request context is visible
+    def filter(self, record):
+        record.trace_id = current_trace_id() or "-"
+        return True
+
+
+_listener = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"skillbridge.{name}")
+
+
+def configure_logging(level: str = None):
+    """Route the skillbridge.* loggers through a queue; LOG_LEVEL sets verbosity."""
+    global _listener
+    logger = logging.getLogger("skillbridge")
+    logger.setLevel((level or os.getenv("LOG_LEVEL", "INFO")).upper())
+    if _listener:
+        return
+
+    records = queue.SimpleQueue()
+    handler = QueueHandler(records)
+    handler.addFilter(_TraceFilter())
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(trace_id)s] %(name)s: %(message)s"))
+
+    logger.handlers = [handler]
+    logger.propagate = False
+    _listener = QueueListener(records, output)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def _restart_after_fork():
+    # A forked child inherits the queue handler but not the listener thread draining it
+    global _listener
+    if _listener is not None:
+        _listener = None
+        configure_logging(logging.getLevelName(logging.getLogger("skillbridge").level))
+
+
+os.register_at_fork(after_in_child=_restart_after_fork)
@@ -0,0 +1,197 @@
+# uploads.py
+# Bounded upload handling. Request bodies on upload routes are capped while
+# they are received, uploads are copied chunk by chunk into memory only up to
+# a threshold and to a temp file beyond it, and the content hash is computed
+# on the fly. Large PDFs reach the parse workers as a path they memory-map
+# instead of bytes, so memory per request stays flat regardless of file size.
+import hashlib
+import io
+import os
+import tempfile
+
+from starlette.responses import JSONResponse
+
+READ_CHUNK = 1024 * 1024
+PDF_MAGIC = b"%PDF-"
+
+
+class UploadTooLarge(Exception):
+    """Upload exceeds UPLOAD_MAX_MB; answered with 413."""
+
+
+class InvalidUpload(Exception):
+    """Upload is not a PDF; answered with 415."""
+
+
+def max_upload_bytes() -> int:
+    return int(float(os.getenv("UPLOAD_MAX_MB", "10")) * 1024 * 1024)
+
+
+def max_bulk_upload_bytes() -> int:
+    # Whole /api/parse-resumes body: many PDFs or zip archives of them
+    return int(float(os.getenv("BULK_UPLOAD_MAX_MB", "200")) * 1024 * 1024)
+
+
+def spool_threshold_bytes() -> int:
+    return int(os.getenv("UPLOAD_SPOOL_THRESHOLD_KB", "1024")) * 1024
+
+
+class SpooledUpload:
+    """
+    An upload held in memory (`data`) or, past the threshold, in a named temp
+    file (`path`). Named rather than tempfile.SpooledTemporaryFile so a
+    process-pool worker can open and mmap the same file.
+    """
+
+    def __init__(self, threshold: int):
+        self.threshold = threshold
+        self.size = 0
+        self.path = None
+        self._hash = hashlib.sha256()
+        self._buffer = io.BytesIO()
+        self._file = None
+
+    def write(self, chunk: bytes):
+        self._hash.update(chunk)
+        self.size += len(chunk)
+        if self._file is None and self.size > self.threshold:
+            # Roll over: move what we have to disk and keep appending there
+            spool_dir = os.getenv("UPLOAD_SPOOL_DIR") or None
+            self._file = tempfile.NamedTemporaryFile(prefix="upload-", suffix=".pdf", dir=spool_dir, delete=False)
+            self.path = self._file.name
+            self._file.write(self._buffer.getvalue())
+            self._buffer = None
+        if self._file is not None:
+            self._file.write(chunk)
+        else:
+            self._buffer.write(chunk)
+
+    def finish(self):
+        if self._file is not None:
+            self._file.close()
+
+    @property
+    def digest(self) -> str:
+        return self._hash.hexdigest()
+
+    @property
+    def data(self):
+        return self._buffer.getvalue() if self._buffer is not None else None
+
+    @property
+    def source(self):
+        """What parse workers receive: bytes when small, a file path when spooled."""
+        return self.path if self.path else self.data
+
+    def open(self):
+        """Binary file object for streaming the body elsewhere (GridFS)."""
+        return open(self.path, "rb") if self.path else io.BytesIO(self.data)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+        if self.path:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+            self.path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+async def read_bounded(upload, max_bytes: int):
+    """The upload's bytes, or None once more than `max_bytes` have been read (the rest is left unread)."""
+    chunks, size = [], 0
+    while True:
+        chunk = await upload.read(min(READ_CHUNK, max_bytes - size + 1))
+        if not chunk:
+            return b"".join(chunks)
+        size += len(chunk)
+        if size > max_bytes:
+            return None
+        chunks.append(chunk)
+
+
+async def spool_upload(upload, max_bytes: int = None, threshold: int = None) -> SpooledUpload:
+    """Copy an UploadFile into a SpooledUpload, enforcing size and PDF magic as it reads."""
+    max_bytes = max_bytes or max_upload_bytes()
+    spooled = SpooledUpload(threshold if threshold is not None else spool_threshold_bytes())
+    try:
+        first = True
+        while True:
+            chunk = await upload.read(READ_CHUNK)
+            if not chunk:
+                break
+            if first and not chunk.startswith(PDF_MAGIC):
+                raise InvalidUpload("Only PDF files are accepted")
+            first = False
+            if spooled.size + len(chunk) > max_bytes:
+                raise UploadTooLarge(f"File exceeds {max_bytes // (1024 * 1024)} MB")
+            spooled.write(chunk)
+        if first:
+            raise InvalidUpload("Empty upload")
+        spooled.finish()
+        return spooled
+    except BaseException:
+        spooled.close()
+        raise
+
+
+class MaxBodySizeMiddleware:
+    """
+    ASGI middleware rejecting request bodies over `max_bytes` on exactly the
+    given paths, from Content-Length up front or by counting bytes as they
+    arrive, before the multipart parser buffers the rest.
+    """
+
+    def __init__(self, app, max_bytes: int, paths: tuple):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope, receive, send):
+        # Exact match: a prefix of /api/parse-resume would also catch /api/parse-resumes
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope.get("headers") or [])
+        length = headers.get(b"content-length")
+        if length and length.isdigit() and int(length) > self.max_bytes:
+            return await self._reject(scope, receive, send)
+
+        received = 0
+        rejected = False
+
+        async def limited_receive():
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Answer now and make the app see a disconnect; whatever it
+                    # tries to send afterwards is dropped
+                    rejected = True
+                    await self._reject(scope, receive, send)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            if not rejected:
+                await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not rejected:
+                raise
+
+    async def _reject(self, scope, receive, send):
+        response = JSONResponse({"detail": "Upload too large"}, status_code=413, headers={"Connection": "close"})
+        await response(scope, receive, send)
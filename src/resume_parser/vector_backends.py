@@ -0,0 +1,407 @@
+# vector_backends.py
+# Storage behind RAG retrieval. Routes talk to a VectorStore; the Weaviate
+# backend keeps the Cloud + Cohere setup, the local backend embeds in-process
+# and searches a float32 matrix per collection (memory-mapped when a data
+# directory is configured). Selected with VECTOR_BACKEND=weaviate|local.
+import importlib
+import json
+import os
+import re
+import uuid as uuid_lib
+import zlib
+from typing import NamedTuple
+
+import numpy as np
+
+from telemetry import get_logger
+
+logger = get_logger("vectors")
+
+# collection -> (property names, property that gets embedded)
+COLLECTIONS = {
+    # One object per resume / feedback section chunk (see rag_context.chunk_feedback)
+    "Feedback": (("user_id", "text", "rating", "kind", "section"), "text"),
+    # role is filled in after insert, so it must stay out of the vector
+    "JobDescription": (("user_id", "job_text", "role"), "job_text"),
+}
+
+
+class VectorHit(NamedTuple):
+    uuid: str
+    properties: dict
+    score: float = None  # cosine similarity, higher is closer; None for plain fetches
+
+
+class InsertResult(NamedTuple):
+    # Both keyed by the object's index in the batch, like Weaviate's insert_many
+    uuids: dict
+    errors: dict
+
+
+class VectorStore:
+    """Async interface every backend implements."""
+
+    name = "base"
+
+    async def connect(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def insert_many(self, collection: str, objects: list) -> InsertResult:
+        raise NotImplementedError
+
+    async def update(self, collection: str, uuid, properties: dict):
+        raise NotImplementedError
+
+    async def search(self, collection: str, query: str, user_id: str = None, limit: int = 3) -> list:
+        """Top `limit` objects by similarity to `query`, optionally for one user."""
+        raise NotImplementedError
+
+    async def fetch(self, collection: str, user_id: str = None, limit: int = 1) -> list:
+        """The newest `limit` objects, optionally for one user."""
+        raise NotImplementedError
+
+
+# ----------------- WEAVIATE -----------------
+class WeaviateStore(VectorStore):
+    name = "weaviate"
+
+    def __init__(self, url: str, api_key: str, cohere_key: str = None):
+        self.url = url
+        self.api_key = api_key
+        self.cohere_key = cohere_key
+        self.client = None
+
+    @classmethod
+    def from_env(cls):
+        url = os.getenv("WEAVIATE_URL")
+        api_key = os.getenv("WEAVIATE_API_KEY")
+        if not url or not api_key:
+            raise RuntimeError("Missing Weaviate credentials")
+        return cls(url, api_key, os.getenv("COHERE_APIKEY"))
+
+    async def connect(self):
+        from weaviate import use_async_with_weaviate_cloud
+        from weaviate.classes.config import Configure, DataType, Property
+        from weaviate.classes.init import AdditionalConfig, Auth, Timeout
+
+        # One async client for the whole app; connected on startup, closed on shutdown
+        self.client = use_async_with_weaviate_cloud(
+            cluster_url=self.url,
+            auth_credentials=Auth.api_key(self.api_key),
+            headers={"X-Cohere-Api-Key": self.cohere_key},
+            additional_config=AdditionalConfig(timeout=Timeout(init=10, query=30, insert=90)),
+        )
+        await self.client.connect()
+        logger.info("[✅ WEAVIATE] Connected successfully")
+
+        existing_schemas = await self.client.collections.list_all()  # Keyed by collection name
+        for name, (properties, embedded) in COLLECTIONS.items():
+            if name in existing_schemas:
+                continue
+            await self.client.collections.create(
+                name=name,
+                properties=[
+                    # Only the embedded property feeds the vector, as in the local engine
+                    Property(name=prop, data_type=DataType.TEXT, skip_vectorization=(prop != embedded))
+                    for prop in properties
+                ],
+                vectorizer_config=Configure.Vectorizer.text2vec_cohere(),
+            )
+            logger.info("[📄 WEAVIATE] '%s' class created.", name)
+
+    async def close(self):
+        if self.client:
+            await self.client.close()
+            self.client = None
+
+    def _collection(self, name: str):
+        if not self.client:
+            raise RuntimeError("Weaviate client not initialized")
+        return self.client.collections.get(name)
+
+    @staticmethod
+    def _user_filter(user_id):
+        from weaviate.classes.query import Filter
+        return Filter.by_property("user_id").equal(user_id) if user_id else None
+
+    @staticmethod
+    def _hits(result) -> list:
+        hits = []
+        for obj in result.objects:
+            distance = getattr(obj.metadata, "distance", None)
+            # Cohere vectors use cosine distance; report similarity like the local engine
+            hits.append(VectorHit(str(obj.uuid), obj.properties, None if distance is None else 1.0 - distance))
+        return hits
+
+    async def insert_many(self, collection: str, objects: list) -> InsertResult:
+        result = await self._collection(collection).data.insert_many(objects)
+        return InsertResult(dict(result.uuids or {}), dict(result.errors or {}))
+
+    async def update(self, collection: str, uuid, properties: dict):
+        await self._collection(collection).data.update(uuid=uuid, properties=properties)
+
+    async def search(self, collection: str, query: str, user_id: str = None, limit: int = 3) -> list:
+        from weaviate.classes.query import MetadataQuery
+        result = await self._collection(collection).query.near_text(
+            query=query, filters=self._user_filter(user_id), limit=limit,
+            return_metadata=MetadataQuery(distance=True),
+        )
+        return self._hits(result)
+
+    async def fetch(self, collection: str, user_id: str = None, limit: int = 1) -> list:
+        from weaviate.classes.query import Sort
+        # Newest first, so limit=1 is the user's latest object
+        result = await self._collection(collection).query.fetch_objects(
+            filters=self._user_filter(user_id), limit=limit, sort=Sort.by_creation_time(ascending=False)
+        )
+        return self._hits(result)
+
+
+# ----------------- LOCAL EMBEDDERS -----------------
+_TOKEN_RE = re.compile(r"[a-z0-9+#.]+")
+
+
+class HashingEmbedder:
+    """
+    Dependency-free bag of words + bigrams, feature-hashed into `dim` buckets
+    with a sign bit and sublinear term frequency. L2-normalized, so a dot
+    product is cosine similarity.
+    """
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text: str):
+        tokens = _TOKEN_RE.findall(text.lower())
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    def embed(self, texts: list) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in self._features(text)), dtype=np.uint64)
+            if not hashes.size:
+                continue
+            signs = np.where(hashes & 1, 1.0, -1.0).astype(np.float32)
+            np.add.at(out[row], (hashes >> 1) % self.dim, signs)
+        out = np.sign(out) * np.log1p(np.abs(out))
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        np.divide(out, norms, out=out, where=norms > 0)
+        return out
+
+
+def load_embedder(spec: str = None):
+    """
+    "hashing" / "hashing:<dim>" for the built-in embedder, or
+    "package.module:factory" for anything exposing .name, .dim and
+    .embed(texts) -> float32 array.
+    """
+    spec = spec or os.getenv("LOCAL_EMBEDDER", "hashing")
+    kind, _, arg = spec.partition(":")
+    if kind == "hashing":
+        return HashingEmbedder(int(arg) if arg else 512)
+    factory = getattr(importlib.import_module(kind), arg)
+    return factory()
+
+
+# ----------------- LOCAL ENGINE -----------------
+class LocalCollection:
+    """
+    Rows live in one contiguous (capacity, dim) float32 matrix; metadata and
+    a user_id -> rows index sit alongside. With a directory, vectors are a
+    memory-mapped file and metadata an append-only JSONL log replayed on open.
+    """
+
+    def __init__(self, name: str, embedder, directory: str = None, initial_capacity: int = 1024):
+        self.name = name
+        self.embedder = embedder
+        self.dim = embedder.dim
+        self.embedded_property = COLLECTIONS.get(name, ((), "text"))[1]
+        self.uuids = []
+        self.properties = []
+        self.rows_by_uuid = {}
+        self.rows_by_user = {}
+        self.count = 0
+
+        self.vectors_path = self.log_path = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self.vectors_path = os.path.join(directory, f"{name}.f32")
+            self.log_path = os.path.join(directory, f"{name}.jsonl")
+            self._check_header(os.path.join(directory, f"{name}.json"))
+        self.matrix = self._allocate(max(initial_capacity, 1))
+        if self.log_path and os.path.exists(self.log_path):
+            self._replay()
+
+    # ----------------- STORAGE -----------------
+    def _check_header(self, header_path: str):
+        header = {"embedder": self.embedder.name, "dim": self.dim}
+        if os.path.exists(header_path):
+            with open(header_path, encoding="utf-8") as f:
+                stored = json.load(f)
+            if stored != header:
+                raise RuntimeError(f"{self.name} was built with {stored}, current embedder is {header}")
+        else:
+            with open(header_path, "w", encoding="utf-8") as f:
+                json.dump(header, f)
+
+    def _allocate(self, capacity: int):
+        if not self.vectors_path:
+            matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+            if self.count:
+                matrix[:self.count] = self.matrix[:self.count]
+            return matrix
+
+        if self.count:
+            self.matrix.flush()
+        existing_rows = 0
+        if os.path.exists(self.vectors_path):
+            existing_rows = os.path.getsize(self.vectors_path) // (4 * self.dim)
+        capacity = max(capacity, existing_rows)
+        # Growing the file in place keeps rows where they are; remap at the new size
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(capacity * self.dim * 4)
+        return np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def _ensure_capacity(self, extra: int):
+        needed = self.count + extra
+        if needed > self.matrix.shape[0]:
+            self.matrix = self._allocate(max(needed, 2 * self.matrix.shape[0]))
+
+    def _log(self, records: list):
+        if self.log_path:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(r) + "\n" for r in records)
+
+    def _replay(self):
+        with open(self.log_path, encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                if record["op"] == "insert":
+                    self._index_row(record["uuid"], record["properties"])
+                elif record["op"] == "update":
+                    self.properties[self.rows_by_uuid[record["uuid"]]].update(record["properties"])
+        # A crash between the vector write and the log append leaves extra rows
+        # in the file; the log is authoritative, so they are simply ignored
+        self._ensure_capacity(0)
+
+    def _index_row(self, object_uuid: str, properties: dict):
+        row = self.count
+        self.uuids.append(object_uuid)
+        self.properties.append(properties)
+        self.rows_by_uuid[object_uuid] = row
+        self.rows_by_user.setdefault(properties.get("user_id"), []).append(row)
+        self.count += 1
+        return row
+
+    def flush(self):
+        if isinstance(self.matrix, np.memmap):
+            self.matrix.flush()
+
+    # ----------------- OPERATIONS -----------------
+    def insert_many(self, objects: list) -> list:
+        vectors = self.embedder.embed([str(obj.get(self.embedded_property, "")) for obj in objects])
+        self._ensure_capacity(len(objects))
+        start = self.count
+        self.matrix[start:start + len(objects)] = vectors
+
+        records = []
+        for properties in objects:
+            object_uuid = str(uuid_lib.uuid4())
+            self._index_row(object_uuid, dict(properties))
+            records.append({"op": "insert", "uuid": object_uuid, "properties": properties})
+        self._log(records)
+        return self.uuids[start:]
+
+    def update(self, object_uuid, properties: dict):
+        object_uuid = str(object_uuid)
+        row = self.rows_by_uuid.get(object_uuid)
+        if row is None:
+            raise KeyError(f"{object_uuid} not found in {self.name}")
+        if "user_id" in properties and properties["user_id"] != self.properties[row].get("user_id"):
+            raise ValueError("user_id cannot be changed in place")
+        self.properties[row].update(properties)
+        if self.embedded_property in properties:
+            self.matrix[row] = self.embedder.embed([str(properties[self.embedded_property])])[0]
+        self._log([{"op": "update", "uuid": object_uuid, "properties": properties}])
+
+    def _candidate_rows(self, user_id):
+        if user_id is None:
+            return None
+        return np.asarray(self.rows_by_user.get(user_id, ()), dtype=np.int64)
+
+    def search(self, query: str, user_id: str = None, limit: int = 3) -> list:
+        rows = self._candidate_rows(user_id)
+        if not self.count or (rows is not None and not rows.size):
+            return []
+        q = self.embedder.embed([query])[0]
+        # One matrix-vector product over the candidate rows; vectors are unit length
+        scores = (self.matrix[:self.count] if rows is None else self.matrix[rows]) @ q
+        k = min(limit, scores.shape[0])
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        row_ids = top if rows is None else rows[top]
+        return [
+            VectorHit(self.uuids[r], dict(self.properties[r]), float(scores[i]))
+            for i, r in zip(top, row_ids)
+        ]
+
+    def fetch(self, user_id: str = None, limit: int = 1) -> list:
+        # Newest first, like the Weaviate backend: rows are in insertion order
+        rows = range(self.count) if user_id is None else self.rows_by_user.get(user_id, ())
+        return [VectorHit(self.uuids[r], dict(self.properties[r])) for r in list(reversed(rows))[:limit]]
+
+
+class LocalVectorStore(VectorStore):
+    name = "local"
+
+    def __init__(self, embedder=None, directory: str = None):
+        self.embedder = embedder or load_embedder()
+        self.directory = directory
+        self.collections = {}
+
+    @classmethod
+    def from_env(cls):
+        return cls(load_embedder(), os.getenv("VECTOR_STORE_DIR") or None)
+
+    def collection(self, name: str) -> LocalCollection:
+        if name not in self.collections:
+            self.collections[name] = LocalCollection(name, self.embedder, self.directory)
+        return self.collections[name]
+
+    async def connect(self):
+        for name in COLLECTIONS:
+            self.collection(name)
+        where = self.directory or "memory"
+        logger.info("[✅ VECTORS] Local store ready (%s, %s)", self.embedder.name, where)
+
+    async def close(self):
+        for collection in self.collections.values():
+            collection.flush()
+
+    # Everything below is in-process numpy work measured in microseconds, so
+    # it runs inline on the event loop rather than hopping to a thread
+    async def insert_many(self, collection: str, objects: list) -> InsertResult:
+        uuids = self.collection(collection).insert_many(objects)
+        return InsertResult(dict(enumerate(uuids)), {})
+
+    async def update(self, collection: str, uuid, properties: dict):
+        self.collection(collection).update(uuid, properties)
+
+    async def search(self, collection: str, query: str, user_id: str = None, limit: int = 3) -> list:
+        return self.collection(collection).search(query, user_id, limit)
+
+    async def fetch(self, collection: str, user_id: str = None, limit: int = 1) -> list:
+        return self.collection(collection).fetch(user_id, limit)
+
+
+def create_vector_store(backend: str = None) -> VectorStore:
+    backend = backend or os.getenv("VECTOR_BACKEND", "weaviate")
+    if backend == "local":
+        return LocalVectorStore.from_env()
+    if backend == "weaviate":
+        return WeaviateStore.from_env()
+    raise ValueError(f"Unknown VECTOR_BACKEND: {backend}")
@@ -1,24 +1,30 @@
 # weaviate_server.py
+import asyncio
 import os
 import re
-import traceback
-from dotenv import load_dotenv
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-import requests
 
-from weaviate import connect_to_weaviate_cloud as connect_to_wcs
-from weaviate.classes.init import Auth
-from weaviate.classes.config import Configure, Property, DataType
-from weaviate.collections.classes.filters import Filter
-
-from langchain_core.prompts import PromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
-load_dotenv() # Loads .env file once for everything
+from global_state import GlobalState
+from ingestion import IngestionQueue, IngestionQueueFull
+from jobs import job_handler
+from latex_compile import CompileFailed, CompilePoolSaturated, CompileTimeout, CompilerUnavailable, LatexSourceTooLarge
+from publish import PublishClosed, PublishDispatcher, PublishQueueFull
+from llm_cache import CacheMode, cached_result, cached_run_chain, cached_stream_chain, get_llm_cache
+from llm_scheduler import Priority, SchedulerSaturated, get_scheduler, run_chain
+from sse import SSE_HEADERS, GenerationTimer, SectionStreamParser, sse_event
+from rag_context import ContextAssembler, chunk_feedback, prompt_tokens
+from resume_versions import section_feedback, section_inputs
+from rag_context import stats as context_stats
+from telemetry import get_logger, span
+from vector_backends import create_vector_store
 
 router = APIRouter()
-client = None # Initialize Weaviate client as None , this gets updated through backend
+logger = get_logger("api")
+store = None # VectorStore backend, set up on startup by init_vector_store()
+ingestion = None # Batched vector writer, started alongside the store
+publisher = None # Debounced Jenkins trigger, see publish.py
 
 # Helper Functions (I am losing my mind its 3.18am here UTC +5.30)
 def sanitize_filename(s: str) -> str:
@@ -28,17 +34,19 @@ def sanitize_filename(s: str) -> str:
     # Replace unsafe characters and whitespace
     return re.sub(r'[\\/*?:"<>| ]', "_", s)
 
-def save_tex_to_file(user_id: str, role: str, tex_content: str) -> str:
-    resume_dir = os.getenv("RESUME_OUTPUT_DIR", "Resumes")
-    os.makedirs(resume_dir, exist_ok=True)
+def tex_file_path(user_id: str, role: str) -> str:
     safe_role = sanitize_filename(role)
     filename = f"{user_id}_{safe_role.replace(' ', '-')}.tex"
-    file_path = os.path.join(resume_dir, filename)
+    return os.path.join(os.getenv("RESUME_OUTPUT_DIR", "Resumes"), filename)
+
+def save_tex_to_file(user_id: str, role: str, tex_content: str) -> str:
+    file_path = tex_file_path(user_id, role)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
 
     with open(file_path, "w", encoding="utf-8") as file:
         file.write(tex_content)
 
-    print(f"[✅] LaTeX file saved at: {file_path}")
+    logger.info("[✅] LaTeX file saved at: %s", file_path)
     return file_path
 
 
@@ -51,155 +59,120 @@ class TriggerPayload(BaseModel):
     texContent: str
 
 
-# ----------------- INIT WEAVIATE CONNECTION -----------------
-def init_weaviate_client():
-    global client
+# ----------------- INIT VECTOR STORE -----------------
+async def init_vector_store():
+    global store
+    # VECTOR_BACKEND=weaviate (Cloud + Cohere) or local (in-process numpy engine).
+    # Published only once connected: routes treat a missing store as "skip vectors"
+    vector_store = create_vector_store()
+    try:
+        await vector_store.connect()
+    except BaseException:
+        # Failed or timed out mid-connect: don't leak a half-open client
+        await vector_store.close()
+        raise
+    store = vector_store
 
-    
-    WEAVIATE_URL = os.getenv("WEAVIATE_URL")
-    WEAVIATE_API_KEY = os.getenv("WEAVIATE_API_KEY")
-    COHERE_KEY = os.getenv("COHERE_APIKEY")
-    
-    headers = { "X-Cohere-Api-Key": COHERE_KEY,}
-    
-    if not WEAVIATE_URL or not WEAVIATE_API_KEY:
-        raise RuntimeError("Missing Weaviate credentials")
-   
-    client = connect_to_wcs(
-        cluster_url=WEAVIATE_URL,
-        auth_credentials=Auth.api_key(WEAVIATE_API_KEY),
-        headers=headers
-    )
 
-    print("[✅ WEAVIATE] Connected successfully")
+async def close_vector_store():
+    global store
+    if store:
+        await store.close()
+        store = None
 
-    # Init schema
-    existing_schemas = client.collections.list_all()  # Returns list of strings
 
-    if "Feedback" not in existing_schemas:
-        client.collections.create(
-            name="Feedback",
-            properties=[
-                Property(name="user_id", data_type=DataType.TEXT),
-                Property(name="text", data_type=DataType.TEXT),
-                Property(name="rating", data_type=DataType.TEXT),
-            ],
-            vectorizer_config=Configure.Vectorizer.text2vec_cohere(),  
-        )
+# ----------------- VECTOR STORAGE -----------------
+async def get_job_role(job_text: str) -> str:
+    # Memoized through the LLM response cache, which is keyed by the normalized
+    # job text, so each distinct job description costs one Gemini call.
+    # Nobody is waiting on the role directly, so it yields to interactive calls.
+    result, _ = await cached_run_chain("role", {"job_text": job_text}, priority=Priority.BACKGROUND)
+    return result.content.strip()
 
-    if "JobDescription" not in existing_schemas:
-        client.collections.create(
-            name="JobDescription",
-            properties=[
-                Property(name="user_id", data_type=DataType.TEXT),
-                Property(name="job_text", data_type=DataType.TEXT),
-                Property(name="role", data_type=DataType.TEXT),
-            ],
-            vectorizer_config=Configure.Vectorizer.text2vec_cohere(),
-        )
-        print("[📄 WEAVIATE] 'JobDescription' class created.")
 
-print("[📦 WEAVIATE] 'Feedback' and 'JobDescripton' class created with Cohere vectorizer.")
+async def enqueue_job_description(user_id: str, job_text: str) -> bool:
+    """
+    Queue a job description for batched ingestion. If its role is already
+    known it is stored inline; otherwise the object is written with an empty
+    role and fill_job_role() runs once the insert lands, off the response path.
+    """
+    known = await cached_result("role", {"job_text": job_text})
+    properties = {
+        "user_id": user_id,
+        "job_text": job_text,
+        "role": known.strip() if known else ""
+    }
+    on_inserted = None if known else (lambda job_uuid: fill_job_role(job_uuid, job_text))
+    return ingestion.enqueue("JobDescription", properties, on_inserted=on_inserted)
 
-# ----------------- GEMINI AGENT (FOR FEEDBACK) -----------------
-def build_feedback_agent():
-    load_dotenv()
-    gemini_key = os.getenv("GOOGLE_GEMINI_API_KEY")
 
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-2.0-flash",
-        temperature=0.7,
-        convert_system_message_to_human=True,
-        google_api_key=gemini_key
-    )
+async def fill_job_role(job_uuid, job_text: str):
+    try:
+        role = await get_job_role(job_text)
+        await store.update("JobDescription", job_uuid, {"role": role})
+        logger.info("[📄 JOB] Role extracted: %s", role)
+    except Exception as e:
+        logger.warning("[⚠️ JOB ROLE] Failed to extract role for %s: %s", job_uuid, e)
 
-    prompt = PromptTemplate(
-        input_variables=["resume_text"],
-        template="""
-You are an expert technical hiring manager, you have a lot of experience in interviewing candidates and understand how the current tech market works, based on that you are to provide feedback. Given the following resume, analyze it and provide:
-
-1. Concise 5-6 points for improvement  
-2. Core strengths  
-3. Key areas for improvement  
-4. Recommended roles based on the profile (simply suggest 2-3 roles compliant with candidate resume).
-5. Make improvements on the tech corporate jargon, language used in the resume. The improved resume must not have any copy-pasted segments from previous resume.
-6. Make sure that the resume generated here is ATS-friendly and can by-pass AI checks and all the points written in the resume adhere to the Situation-Task-Action-Report + XYZ methodology but do no explicitly mention these terms in the resume, the points themselves should fit the context.
-7. Make sure that the resume is long enough to cover ONE A4 PAGE for candidate's experience from 0 years to 5 years.
-8. 2-3 project ideas aligned with current job trends (2024-2025)
-9. Your output must always be in plain text format. Do not use Markdown but bullet points,italics, headings, or code blocks are allowed. Write clean text lines only, exactly as they should appear in a resume.
-
-Resume:
-{resume_text}
-"""
-    )
 
-    return prompt | llm
+async def store_feedback_vector(user_id: str, resume_text: str, feedback: str, job_text: str, rating: str = "unrated"):
+    if not store or not ingestion:
+        logger.warning("[⚠️ WEAVIATE] Skipping vector storage — store not initialized")
+        return
 
+    # Section-level chunks; retrieval packs the relevant ones into a token budget.
+    # If the queue fills part-way, a retry re-enqueues only what is missing (dedupe)
+    chunks = chunk_feedback(resume_text, feedback)
+    for chunk in chunks:
+        ingestion.enqueue("Feedback", {
+            "user_id": user_id,
+            "text": chunk["text"],
+            "rating": rating,
+            "kind": chunk["kind"],
+            "section": chunk["section"],
+        })
+    if job_text:
+        await enqueue_job_description(user_id, job_text)
+    logger.info("[🧠 WEAVIATE] Feedback queued for ingestion (%s chunks).", len(chunks))
 
-# ----------------- VECTOR STORAGE -----------------
 
-GOOGLE_GEMINI_API_KEY = os.getenv("GOOGLE_GEMINI_API_KEY")
-if not GOOGLE_GEMINI_API_KEY: print("[❗] GOOGLE_GEMINI_API_KEY not set. Please set it in your .env file.")
-def get_job_role(job_text: str) -> str:
-    prompt = PromptTemplate(
-        input_variables=["job_text"],
-        template="""
-        You are a professional job description analyzer. Given the following job description, extract the primary role or position being advertised.
-        Job description is given as:
-        {job_text}
-        """
-    )
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-2.0-flash",
-        temperature=0.2,
-        convert_system_message_to_human=True,
-        google_api_key=os.getenv("GOOGLE_GEMINI_API_KEY")
-    )
+# ----------------- INGESTION LIFECYCLE -----------------
+def start_ingestion():
+    global ingestion
+    ingestion = IngestionQueue.from_env(store)
+    ingestion.start()
+    logger.info("[✅ INGEST] Batched ingestion running (batch %s, every %ss)", ingestion.batch_size, ingestion.flush_interval_s)
 
-    agent = prompt | llm
-    result = agent.invoke({"job_text": job_text})
-    return result.content.strip() if hasattr(result, "content") else str(result)
-    
-    
-    
 
-def store_feedback_vector(user_id: str, resume_text: str, feedback: str, job_text: str, rating: str = "unrated" ):
-    if not client:
-        print("[⚠️ WEAVIATE] Skipping vector storage — client not initialized")
-        return
+async def stop_ingestion():
+    if ingestion:
+        await ingestion.close()
+        logger.info("[✅ INGEST] Ingestion queue drained")
 
-    combined_text = f"Resume:\n{resume_text}\n\nFeedback:\n{feedback}"
-    collection = client.collections.get("Feedback")
-    collection.data.insert({
-        "user_id": user_id,
-        "text": combined_text,
-        "rating": rating
-    })
-    print("[🧠 WEAVIATE] Vector stored.")
-    role = get_job_role(job_text)
-    collection = client.collections.get("JobDescription")
-    collection.data.insert({
-        "user_id": user_id,
-        "job_text": job_text,
-        "role": role
-    })
-    print("[📄 JOB] Job description stored.")
+
+def start_publisher():
+    global publisher
+    publisher = PublishDispatcher.from_env(write_source=save_tex_to_file)
+    publisher.start()
+    if not publisher.configured:
+        logger.warning("[⚠️ PUBLISH] JENKINS_URL / JENKINS_USER / JENKINS_TOKEN not set; publishing disabled")
+
+
+async def stop_publisher():
+    if publisher:
+        await publisher.close()
+        logger.info("[✅ PUBLISH] Publish dispatcher closed")
 
 
 # ----------------- RAG RETRIEVAL -----------------
-def retrieve_user_feedback(user_id: str, top_k: int = 3) -> list:
-    if not client:
+async def retrieve_user_feedback(user_id: str, top_k: int = 3) -> list:
+    if not store:
         return []
 
-    collection = client.collections.get("Feedback")
-    results = collection.query.near_text(
-        query="resume improvement",
-        filters={"path": ["user_id"], "operator": "Equal", "valueText": user_id},
-        limit=top_k
-    )
+    results = await store.search("Feedback", "resume improvement", user_id=user_id, limit=top_k)
 
-    print(f"[🔍 WEAVIATE] Retrieved {len(results.objects)} past entries")
-    return [obj.properties["text"] for obj in results.objects]
+    logger.info("[🔍 WEAVIATE] Retrieved %s past entries", len(results))
+    return [obj.properties["text"] for obj in results]
 
 
 # ----------------- FASTAPI ROUTES -----------------
@@ -210,24 +183,22 @@ async def generate_feedback(payload: dict):
         raise HTTPException(status_code=400, detail="Missing resume text")
 
     try:
-        agent = build_feedback_agent()
-        feedback = agent.invoke({"resume_text": resume_text})
-        return {"feedback": feedback}
+        feedback, cached = await cached_run_chain(
+            "feedback", {"resume_text": resume_text}, CacheMode.from_payload(payload), priority=Priority.INTERACTIVE
+        )
+        return {"feedback": feedback, "cached": cached}
+    except SchedulerSaturated:
+        raise HTTPException(status_code=429, detail="Too many AI requests in flight, please retry shortly")
     except Exception as e:
-        print(f"[❌ AGENT ERROR] {str(e)}")
+        logger.error("[❌ AGENT ERROR] %s", e)
         raise HTTPException(status_code=500, detail="Agent error")
 
 
 @router.post("/api/improve-resume")
 async def retrieve_user_job_descriptions(user_id: str, top_k: int = 1) -> str:
     try:
-        collection = client.collections.get("JobDescription")
-        results = collection.query.near_text(
-            query="job requirement",
-            filters={"path": ["user_id"], "operator": "Equal", "valueText": user_id},
-            limit=top_k
-        )
-        return "\n\n---\n\n".join([obj.properties["job_text"] for obj in results.objects])
+        results = await store.search("JobDescription", "job requirement", user_id=user_id, limit=top_k)
+        return "\n\n---\n\n".join([obj.properties["job_text"] for obj in results])
     except Exception:
         return ""
 
@@ -240,57 +211,12 @@ async def improve_resume(payload: dict):
         raise HTTPException(status_code=400, detail="Missing required data")
 
     try:
-        past_contexts = retrieve_user_feedback(user_id)
-        joined_context = "\n\n---\n\n".join(past_contexts)
-
-        agent = build_feedback_agent()
-        improvement_prompt = PromptTemplate(
-            input_variables=["latest_resume", "past_context", "job_text"],
-            template="""
-You're a career assistant. Improve the resume using past resume versions and feedback.
-
-### Current Resume:
-{latest_resume}
-
-### Past Attempts (Resume + Feedback):
-{past_context}
-
-### Take into consideration the job descriptions provided by the user:
-{job_text}
-
-Now generate:
-- An improved resume with proper line breaks.
-- Do not generate markdown, simple text will do but make it formatted.
-- The text resume should have proper emboldening of tech stack names, numbers, etc. and proper italicisation of dates and links. Extract the links from the resume generated and if that is not possible, keep space for them in accurate positions.
-- 2-3 project ideas relevant to last 2 year job trends.
-"""
-        )
-        job_collection = client.collections.get("JobDescription")
-        job_query = job_collection.query.fetch_objects(
-            filters=Filter.by_property("user_id").equal(user_id),
-            limit=1
-        )
-        if job_query.objects:
-            job_text = job_query.objects[0].properties["job_text"]
-        else:
-            job_text = "No job description available."
-            
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash",
-            temperature=0.65,
-            convert_system_message_to_human=True,
-            google_api_key=os.getenv("GOOGLE_GEMINI_API_KEY")
-        )
-        improved_agent = improvement_prompt | llm
-        improved_resume = improved_agent.invoke({
-            "latest_resume": latest_resume,
-            "past_context": joined_context,
-            "job_text": job_text,
-        })
+        context, _ = await fetch_rewrite_context(user_id, latest_resume, prompt="improve")
+        improved_resume = await run_chain("improve", context, priority=Priority.INTERACTIVE)
 
         return {"improvedResume": improved_resume}
     except Exception as e:
-        print(f"[❌ AGENT ERROR] {str(e)}")
+        logger.error("[❌ AGENT ERROR] %s", e)
         raise HTTPException(status_code=500, detail="Resume improvement failed")
 
 
@@ -305,126 +231,289 @@ async def store_feedback(payload: dict):
     if not resume_text or not feedback:
         raise HTTPException(status_code=400, detail="Missing data")
 
-    store_feedback_vector(user_id, resume_text, feedback, job_text, rating)
+    try:
+        await store_feedback_vector(user_id, resume_text, feedback, job_text, rating)
+    except IngestionQueueFull:
+        raise HTTPException(status_code=503, detail="Feedback storage is busy, please retry shortly")
     return {"message": "Feedback stored"}
 
-@router.post("/api/rewrite-resume")
-async def rewrite_resume(payload: dict):
-    user_id = payload.get("userId")
-    resume_text = payload.get("resumeText")
+# ----------------- INCREMENTAL FEEDBACK -----------------
+def enqueue_section_vectors(user_id: str, sections: list) -> int:
+    """Queue resume + feedback chunks for freshly analysed sections only."""
+    count = 0
+    for section in sections:
+        for kind, text in (("resume", section["text"]), ("feedback", section["feedback"])):
+            ingestion.enqueue("Feedback", {
+                "user_id": user_id,
+                "text": text,
+                "rating": "unrated",
+                "kind": kind,
+                "section": section["name"],
+            })
+            count += 1
+    return count
+
+
+@router.post("/api/resumes/{resume_id}/feedback")
+async def generate_section_feedback(resume_id: str, payload: dict = None):
+    """
+    Section-by-section feedback for an uploaded resume. Sections unchanged
+    since the version it was linked to reuse their stored feedback; only the
+    changed ones go to Gemini and get embedded.
+    """
+    payload = payload or {}
+    mode = CacheMode.from_payload(payload)
 
-    if not resume_text or not user_id:
-        raise HTTPException(status_code=400, detail="Missing userId or resumeText")
+    async def generate(section):
+        result, _ = await cached_run_chain("section_feedback", section_inputs(section), mode,
+                                           priority=Priority.INTERACTIVE)
+        return result.content.strip()
 
     try:
-        if not client:
-            raise RuntimeError("Weaviate client not initialized")
+        result, fresh = await section_feedback(GlobalState.collection, GlobalState.blobs, resume_id, generate)
+    except SchedulerSaturated:
+        raise HTTPException(status_code=429, detail="Too many AI requests in flight, please retry shortly")
+    except Exception as e:
+        logger.error("[❌ AGENT ERROR] %s", e)
+        raise HTTPException(status_code=500, detail="Agent error")
+    if result is None:
+        raise HTTPException(status_code=404, detail="Resume not found")
 
-        print(f"[🔁 REWRITE] Fetching vectors for user: {user_id}")
-        collection = client.collections.get("Feedback")
+    report = result["report"]
+    logger.info("[🧩 SECTIONS] %s/%s sections analysed, ~%s prompt tokens saved",
+                report["generated"], report["sections"], report["prompt_tokens_saved"])
+    if fresh and ingestion:
+        try:
+            enqueue_section_vectors(result["userId"], fresh)
+        except IngestionQueueFull:
+            logger.warning("[⚠️ INGEST] Queue full, section vectors not stored")
+    return result
 
-        if not collection:
-            raise RuntimeError("Feedback class not found in Weaviate")
 
-        # RAG: Search past feedback
-        query_result = collection.query.near_text(
-            query=f"Resume: {resume_text}",
-            filters=Filter.by_property("user_id").equal(user_id),
-            limit=3
-        )
+# ----------------- REWRITE -----------------
+NO_PAST_FEEDBACK = "No past feedback found for this user."
+NO_JOB_DESCRIPTION = "No job description available."
+
+
+def _query_timeout_s() -> float:
+    return float(os.getenv("WEAVIATE_QUERY_TIMEOUT_MS", "3000")) / 1000
+
+
+async def _search_past_feedback(user_id: str, resume_text: str):
+    limit = int(os.getenv("RAG_CANDIDATES", "12"))
+    with span("vector_search"):
+        query_result = await store.search("Feedback", f"Resume: {resume_text}", user_id=user_id, limit=limit)
+    if not query_result:
+        logger.warning("[❗] No similar past feedback found.")
+        return NO_PAST_FEEDBACK, None
+    return ContextAssembler.from_env().assemble(query_result)
+
+
+async def _fetch_job_text(user_id: str) -> str:
+    with span("vector_fetch"):
+        job_query = await store.fetch("JobDescription", user_id=user_id, limit=1)
+    return job_query[0].properties.get("job_text") if job_query else NO_JOB_DESCRIPTION
 
-        if not query_result.objects:
-            print("[❗] No similar past feedback found.")
-            past_context = "No past feedback found for this user."
-        else:
-            past_context = "\n\n---\n\n".join([obj.properties["text"] for obj in query_result.objects])
-
-        # Get job description
-        job_collection = client.collections.get("JobDescription")
-        job_query = job_collection.query.fetch_objects(
-            filters=Filter.by_property("user_id").equal(user_id),
-            limit=1
-        )
-        job_text = job_query.objects[0].properties.get("job_text") if job_query.objects else "No job description available."
 
-        # Prompt
-        improvement_prompt = PromptTemplate(
-    input_variables=["latest_resume", "past_context", "job_text"],
-    template="""
-You're a career assistant. Improve the resume using past resume versions and feedback.
+async def _with_fallback(label: str, query, fallback, timeout_s: float):
+    # A slow or failing lookup degrades the prompt context instead of failing the request
+    try:
+        return await asyncio.wait_for(query, timeout=timeout_s)
+    except asyncio.TimeoutError:
+        logger.warning("[⚠️ WEAVIATE] %s lookup timed out after %ss, continuing without it", label, timeout_s)
+    except Exception as e:
+        logger.warning("[⚠️ WEAVIATE] %s lookup failed, continuing without it: %s", label, e)
+    return fallback
 
-### Current Resume:
-{latest_resume}
 
-### Past Attempts (Resume + Feedback):
-{past_context}
+async def fetch_rewrite_context(user_id: str, resume_text: str, prompt: str = "rewrite"):
+    """Returns (chain inputs, prompt report with estimated token counts)."""
+    if not store:
+        raise RuntimeError("Vector store not initialized")
 
-### Job Description:
-{job_text}
+    logger.info("[🔁 REWRITE] Fetching vectors for user: %s", user_id)
+    timeout_s = _query_timeout_s()
+
+    # RAG search over past feedback and the job description lookup are independent
+    (past_context, context_report), job_text = await asyncio.gather(
+        _with_fallback("Feedback", _search_past_feedback(user_id, resume_text), (NO_PAST_FEEDBACK, None), timeout_s),
+        _with_fallback("JobDescription", _fetch_job_text(user_id), NO_JOB_DESCRIPTION, timeout_s),
+    )
+
+    inputs = {
+        "latest_resume": resume_text,
+        "past_context": past_context,
+        "job_text": job_text,
+    }
+    report = {"context": context_report, "prompt_tokens": prompt_tokens(prompt, inputs)}
+    context_stats.prompt_tokens += report["prompt_tokens"]
+    if context_report:
+        logger.info("[📏 RAG] %s/%s chunks, %s/%s context tokens, ~%s prompt tokens",
+                    context_report["packed"], context_report["candidates"], context_report["context_tokens"],
+                    context_report["candidate_tokens"], report["prompt_tokens"])
+    return inputs, report
+
+
+# Safe parser
+def extract_section(response_text: str, tag: str) -> str:
+    try:
+        start = f"---{tag.upper()}---"
+        end = f"---END{tag.upper()}---"
+        return response_text.split(start)[1].split(end)[0].strip()
+    except IndexError:
+        logger.warning("[⚠️ Missing Section] %s not found in AI response.", tag)
+        return ""
 
-### Instructions:
-Provide your output in TWO sections:
 
----TEXT---
-A cleaned, ATS-friendly plain text version of the resume.  
-- Use **bold** for tech stacks, numbers, and achievements.  
-- Use *italics* for dates and links.  
-- Ensure this text is human-readable and fits on ONE A4 page.  
----ENDTEXT---
+@router.post("/api/rewrite-resume")
+async def rewrite_resume(payload: dict):
+    user_id = payload.get("userId")
+    resume_text = payload.get("resumeText")
 
----LATEX---
-A LaTeX formatted version of the improved resume (ready to compile).  
-- Use proper LaTeX syntax.  
-- Ensure formatting fits one A4 page.  
-- Do not leave any placeholder commands unresolved.  
----ENDLATEX---
-"""
-)
+    if not resume_text or not user_id:
+        raise HTTPException(status_code=400, detail="Missing userId or resumeText")
 
+    try:
+        inputs, prompt_report = await fetch_rewrite_context(user_id, resume_text)
 
         # Run agent
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash",
-            temperature=0.65,
-            convert_system_message_to_human=True,
-            google_api_key=os.getenv("GOOGLE_GEMINI_API_KEY")
+        result, cached = await cached_run_chain(
+            "rewrite", inputs, CacheMode.from_payload(payload), priority=Priority.INTERACTIVE
         )
-        improved_agent = improvement_prompt | llm
-        result = improved_agent.invoke({
-            "latest_resume": resume_text,
-            "past_context": past_context,
-            "job_text": job_text,
-        })
 
         response_text = result.content if hasattr(result, "content") else str(result)
 
-        # Safe parser
-        def extract_section(tag: str) -> str:
-            try:
-                start = f"---{tag.upper()}---"
-                end = f"---END{tag.upper()}---"
-                return response_text.split(start)[1].split(end)[0].strip()
-            except IndexError:
-                print(f"[⚠️ Missing Section] {tag} not found in AI response.")
-                return ""
-
         # now only TEXT section is expected
-        text_resume = extract_section("TEXT")
+        text_resume = extract_section(response_text, "TEXT")
 
         if not text_resume:
-            print("[⚠️ FORMAT WARNING] Resume text is missing.")
+            logger.warning("[⚠️ FORMAT WARNING] Resume text is missing.")
 
-        print("[✅ REWRITE DONE]")
+        logger.info("[✅ REWRITE DONE]")
         return {
-            "text": text_resume
+            "text": text_resume,
+            "cached": cached,
+            "prompt": prompt_report
         }
 
+    except SchedulerSaturated:
+        raise HTTPException(status_code=429, detail="Too many AI requests in flight, please retry shortly")
     except Exception as e:
-        print("[❌ REWRITE ERROR]", str(e))
-        traceback.print_exc()
+        logger.exception("[❌ REWRITE ERROR] %s", e)
         raise HTTPException(status_code=500, detail="Agent rewrite failed")
 
 
+# ----------------- STREAMING (SSE) ROUTES -----------------
+@router.post("/api/get-feedback/stream")
+async def generate_feedback_stream(payload: dict):
+    resume_text = payload.get("resumeText")
+    if not resume_text:
+        raise HTTPException(status_code=400, detail="Missing resume text")
+
+    async def events():
+        timer = GenerationTimer("get-feedback")
+        parts = []
+        cached = False
+        try:
+            pieces = cached_stream_chain("feedback", {"resume_text": resume_text}, CacheMode.from_payload(payload))
+            async for text, cached in pieces:
+                timer.mark_token()
+                parts.append(text)
+                yield sse_event("token", {"text": text})
+        except SchedulerSaturated:
+            yield sse_event("error", {"detail": "Too many AI requests in flight, please retry shortly", "status": 429})
+            return
+        except Exception as e:
+            logger.error("[❌ AGENT ERROR] %s", e)
+            yield sse_event("error", {"detail": "Agent error"})
+            return
+        yield sse_event("done", {"feedback": "".join(parts), "cached": cached, **timer.finish()})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@router.post("/api/rewrite-resume/stream")
+async def rewrite_resume_stream(payload: dict):
+    user_id = payload.get("userId")
+    resume_text = payload.get("resumeText")
+
+    if not resume_text or not user_id:
+        raise HTTPException(status_code=400, detail="Missing userId or resumeText")
+
+    async def events():
+        timer = GenerationTimer("rewrite-resume")
+        sections = SectionStreamParser()
+        cached = False
+        try:
+            inputs, prompt_report = await fetch_rewrite_context(user_id, resume_text)
+            pieces = cached_stream_chain("rewrite", inputs, CacheMode.from_payload(payload))
+            async for text, cached in pieces:
+                timer.mark_token()
+                for event, data in sections.feed(text):
+                    yield sse_event(event, data)
+            for event, data in sections.close():
+                yield sse_event(event, data)
+        except SchedulerSaturated:
+            yield sse_event("error", {"detail": "Too many AI requests in flight, please retry shortly", "status": 429})
+            return
+        except Exception as e:
+            logger.exception("[❌ REWRITE ERROR] %s", e)
+            yield sse_event("error", {"detail": "Agent rewrite failed"})
+            return
+
+        text_resume = sections.sections.get("text", "").strip()
+        if not text_resume:
+            logger.warning("[⚠️ FORMAT WARNING] Resume text is missing.")
+        yield sse_event("done", {"text": text_resume, "cached": cached, "prompt": prompt_report, **timer.finish()})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+# ----------------- BACKGROUND JOBS -----------------
+# Same chains as the routes above, run by jobs.JobWorkerPool; submit with
+# POST /api/jobs {"kind": "feedback" | "rewrite", "payload": {...}}
+@job_handler("feedback", required=("resumeText",))
+async def feedback_job(payload: dict, reporter):
+    await reporter.update(stage="generating")
+    parts, cached = [], False
+    pieces = cached_stream_chain("feedback", {"resume_text": payload["resumeText"]},
+                                 CacheMode.from_payload(payload), priority=Priority.STANDARD)
+    async for text, cached in pieces:
+        parts.append(text)
+        await reporter.update(partial="".join(parts))
+    return {"feedback": "".join(parts), "cached": cached}
+
+
+@job_handler("rewrite", required=("userId", "resumeText"))
+async def rewrite_job(payload: dict, reporter):
+    await reporter.update(stage="retrieving")
+    inputs, prompt_report = await fetch_rewrite_context(payload["userId"], payload["resumeText"])
+    await reporter.update(stage="generating")
+    parts, cached = [], False
+    pieces = cached_stream_chain("rewrite", inputs, CacheMode.from_payload(payload), priority=Priority.STANDARD)
+    async for text, cached in pieces:
+        parts.append(text)
+        await reporter.update(partial="".join(parts))
+    text_resume = extract_section("".join(parts), "TEXT")
+    if not text_resume:
+        logger.warning("[⚠️ FORMAT WARNING] Resume text is missing.")
+    return {"text": text_resume, "cached": cached, "prompt": prompt_report}
+
+
+@router.get("/api/ingestion/stats")
+async def ingestion_stats():
+    return ingestion.stats() if ingestion else {"running": False}
+
+
+@router.get("/api/llm/stats")
+async def llm_stats():
+    return {
+        "scheduler": get_scheduler().stats(),
+        "cache": get_llm_cache().stats(),
+        "context": context_stats.as_dict(),
+    }
+
+
 
 @router.post("/api/store-job-description")
 async def store_job_description(payload: dict):
@@ -435,74 +524,92 @@ async def store_job_description(payload: dict):
         raise HTTPException(status_code=404, detail="Missing job description")
 
     try:
-        role = get_job_role(job_text)
-        collection = client.collections.get("JobDescription")
-        collection.data.insert({
-            "user_id": user_id,
-            "job_text": job_text,
-            "role": role
-        })
+        await enqueue_job_description(user_id, job_text)
         return {"message": "Job description stored successfully"}
+    except IngestionQueueFull:
+        raise HTTPException(status_code=503, detail="Job description storage is busy, please retry shortly")
     except Exception as e:
-        print("[❌ JOB STORE ERROR]", str(e))
+        logger.error("[❌ JOB STORE ERROR] %s", e)
         raise HTTPException(status_code=500, detail="Failed to store job description")
     
-@router.post("/api/trigger-publish")
+@router.post("/api/trigger-publish", status_code=202)
 async def trigger_publish(payload: TriggerPayload):
+    # Use default/fallback values if any field is missing
+    user_id = payload.userId or "anonymous"
+    role = "resume"  # fixed role to ensure Jenkins can always run
+    mode = payload.mode or "latex"
+    tex_content = payload.texContent or ""
+
+    if not publisher or not publisher.configured:
+        raise HTTPException(status_code=500, detail="Missing Jenkins credentials or URL in environment.")
+
+    # Written before queueing, so no publish is ever queued for a source that
+    # failed to save; the dispatcher writes the latest source again just before
+    # triggering, so a merged publish still wins
     try:
-        # Use default/fallback values if any field is missing
-        user_id = payload.userId or "anonymous"
-        role = "resume"  # fixed role to ensure Jenkins can always run
-        mode = payload.mode or "latex"
-        tex_content = payload.texContent or ""
-
-        print(f"🚀 Triggering Jenkins pipeline for user: {user_id}, role: {role}")
-
-        # Jenkins Credentials
-        if not all([JENKINS_URL, JENKINS_USER, JENKINS_TOKEN]):
-            raise HTTPException(status_code=500, detail="Missing Jenkins credentials or URL in environment.")
-
-        # Jenkins Parameters
-        params = {
-            "user_id": user_id,
-            "role": role,
-            "mode": mode,
-        }
-
-        res = requests.post(
-            JENKINS_URL,
-            params=params,
-            auth=(JENKINS_USER, JENKINS_TOKEN)
-        )
+        file_path = await asyncio.to_thread(save_tex_to_file, user_id, role, tex_content) if tex_content else None
+    except Exception as e:
+        logger.error("[❌] Error saving LaTeX file: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to save LaTeX file")
 
-        if res.status_code in [200, 201]:
-            print("[✅] Jenkins triggered successfully.")
-            # Optionally save LaTeX if provided
-            file_path = None
-            if tex_content:
-                file_path = save_tex_to_file(user_id, role, tex_content)
-            return {
-                "success": True,
-                "message": f"✅ Jenkins pipeline triggered for user `{user_id}` and role `{role}`",
-                "file_path": file_path
-            }
-        else:
-            print(f"[❌ Jenkins Error] Status: {res.status_code} - {res.text}")
-            raise HTTPException(status_code=500, detail=f"Jenkins error: {res.text}")
+    try:
+        publish, coalesced = publisher.submit(user_id, role, mode, tex_content)
+    except (PublishQueueFull, PublishClosed):
+        raise HTTPException(status_code=503, detail="Publishing is busy, please retry shortly",
+                            headers={"Retry-After": "5"})
+    logger.info("🚀 Publish %s for user: %s, role: %s (%s)", publish["publishId"], user_id, role,
+                "merged into the queued one" if coalesced else "queued")
+    return {
+        "success": True,
+        "message": f"✅ Jenkins pipeline queued for user `{user_id}` and role `{role}`",
+        "publishId": publish["publishId"],
+        "status": publish["status"],
+        "coalesced": coalesced,
+        "file_path": file_path,
+    }
+
+
+@router.get("/api/publish/stats")
+async def publish_stats():
+    return publisher.stats() if publisher else {"configured": False}
+
+
+@router.get("/api/publish/{publish_id}")
+async def publish_status(publish_id: str):
+    publish = publisher.status(publish_id) if publisher else None
+    if publish is None:
+        raise HTTPException(status_code=404, detail="Publish not found")
+    return publish
+
+
+def _compiled_pdf_response(digest: str, pdf: bytes, cache: str) -> Response:
+    return Response(pdf, media_type="application/pdf", headers={
+        "Content-Disposition": f"inline; filename={digest[:16]}.pdf",
+        "ETag": f'"{digest}"',
+        "X-Resume-Id": digest,
+        "X-Compile-Cache": cache,
+    })
 
-    except Exception as e:
-        print(f"[❌ PIPELINE TRIGGER ERROR] {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to trigger Jenkins pipeline: {str(e)}")
 
+def _latex_compiler():
+    if GlobalState.latex_compiler is None:
+        raise HTTPException(status_code=503, detail="LaTeX compiler is not available on this server")
+    return GlobalState.latex_compiler
 
 
 @router.get("/get-resume")
-def get_resume(resume_id: str):
-    file_path = f"/path/to/resumes/{resume_id}.tex"
-    return FileResponse(path=file_path, media_type='application/x-tex')   
+async def get_resume(resume_id: str, request: Request):
+    # resume_id is the X-Resume-Id returned by /api/compile-latex (a hash of the source)
+    compiler = _latex_compiler()
+    if request.headers.get("if-none-match") == f'"{resume_id}"':
+        return Response(status_code=304, headers={"ETag": f'"{resume_id}"'})
+    pdf = await compiler.lookup(resume_id)
+    if pdf is None:
+        raise HTTPException(status_code=404, detail="Compiled resume not found")
+    return _compiled_pdf_response(resume_id, pdf, "hit")
 
 @router.post("/api/compile-latex")
-async def save_tex(payload: dict):
+async def save_tex(payload: dict, request: Request):
     user_id = payload.get("userId", "anonymous")
     role = payload.get("role")
     tex_content = payload.get("texContent")
@@ -511,43 +618,65 @@ async def save_tex(payload: dict):
     if not user_id or not role or not tex_content:
         raise HTTPException(status_code=400, detail="Missing userId, role, or texContent in payload")
 
+    compiler = _latex_compiler()
+    # Rejected and unchanged sources are answered before anything touches the disk
     try:
-        resume_dir = os.getenv("RESUME_OUTPUT_DIR", "Resumes")
-        os.makedirs(resume_dir, exist_ok=True)
-        safe_role = sanitize_filename(role)
-        filename = f"{user_id}_{safe_role.replace(' ', '-')}.tex"
-        file_path = os.path.join(resume_dir, filename)
-        print("[DEBUG] Final file path:", file_path)
-        with open(file_path, "w", encoding="utf-8") as file:
-            file.write(tex_content)
-
-        print(f"[✅] LaTeX file saved at: {file_path}")
-        return {"message": "LateX file saved successfully", "file_path": file_path}
+        compiler.check_size(tex_content)
+    except LatexSourceTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    # The ETag is the source hash: an unchanged resume needs neither a compile nor a download
+    etag = f'"{compiler.source_hash(tex_content)}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
 
+    try:
+        # Still written out: the Jenkins publish pipeline picks the source up from here
+        await asyncio.to_thread(save_tex_to_file, user_id, role, tex_content)
     except Exception as e:
-        print(f"[❌] Error saving LaTeX file: {str(e)}")
+        logger.error("[❌] Error saving LaTeX file: %s", e)
         raise HTTPException(status_code=500, detail="Failed to save LaTeX file")
 
+    try:
+        digest, pdf, cache = await compiler.compile(tex_content)
+    except CompilePoolSaturated:
+        raise HTTPException(status_code=503, detail="LaTeX compiler is busy, please retry shortly",
+                            headers={"Retry-After": "2"})
+    except CompileTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except CompileFailed as e:
+        raise HTTPException(status_code=422, detail={"message": str(e), "log": e.log})
+    except CompilerUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    logger.info("[✅] Compiled LaTeX for user %s (%s bytes, cache: %s)", user_id, len(pdf), cache or "miss")
+    return _compiled_pdf_response(digest, pdf, cache or "miss")
+
     
 @router.get("/api/get-role/{user_id}")
 async def get_role(user_id: str):
     try:
-        collection = client.collections.get("JobDescription")
-        results = collection.query.fetch_objects(
-            filters=Filter.by_property("user_id").equal(user_id),
-            limit=1
-        )
+        results = await store.fetch("JobDescription", user_id=user_id, limit=1)
 
-        if not results or not results.objects:
+        if not results:
             raise HTTPException(status_code=404, detail="No job description found for this user")
 
-        job_text = results.objects[0].properties.get("job_text")
+        job = results[0]
+        role = job.properties.get("role")
+        if role:
+            # Extracted once when the job description was stored
+            return {"role": role}
+
+        # Legacy object, or extraction still pending: derive it once and backfill
+        job_text = job.properties.get("job_text")
         if not job_text:
             raise HTTPException(status_code=404, detail="Job description is empty")
 
-        role = get_job_role(job_text)
+        role = await get_job_role(job_text)
+        await store.update("JobDescription", job.uuid, {"role": role})
         return {"role": role}
 
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"[❌] Error fetching role: {str(e)}")
+        logger.error("[❌] Error fetching role: %s", e)
         raise HTTPException(status_code=500, detail="Failed to fetch user role")